@@ -5,6 +5,8 @@ from typing import AsyncGenerator
 import logging
 
 from inference_pipeline import NewsPipeline
+from utils.model_registry import warmup
+from utils.stream_render import render_stream
 
 logging.basicConfig(
     level=logging.INFO,
@@ -504,6 +506,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner="Loading embedding model...")
+def warmup_models():
+    """Load shared model weights once per process, before any session needs them"""
+    return warmup()
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'page' not in st.session_state:
@@ -585,18 +592,18 @@ async def generate_summary():
             st.markdown('<div class="message-content">', unsafe_allow_html=True)
 
             text_placeholder = st.empty()
-            current_text = ""
+
+            def render(text: str, done: bool):
+                text_placeholder.markdown(text if done else text + "▊")
 
             news_pipeline = st.session_state.news_pipeline
-            async for chunk in news_pipeline.run_pipeline(
+            stats = await render_stream(news_pipeline.run_pipeline(
                 st.session_state.news_topic,
                 "Provide a comprehensive summary of the latest news"
-            ):
-                current_text += chunk
-                text_placeholder.markdown(current_text + "▊")
-                await asyncio.sleep(0.01)
-
-            text_placeholder.markdown(current_text)
+            ), render)
+            current_text = stats.text
+            logger.info("Rendered summary: %d chunks at %.0f/s in %d render calls",
+                        stats.chunks, stats.chunks_per_second, stats.render_calls)
             st.markdown('</div></div>', unsafe_allow_html=True)
 
         st.session_state.current_summary = current_text
@@ -610,28 +617,24 @@ async def generate_summary():
 async def generate_response(user_question: str, response_placeholder):
     """Generate response to user question with streaming in the provided placeholder"""
     try:
-        current_text = ""
         news_pipeline = st.session_state.news_pipeline
 
-        async for chunk in news_pipeline.run_follow_up(
-            user_request=user_question,
-            task=f"Answer this question based on the news about {st.session_state.news_topic}"
-        ):
-            current_text += chunk
-            # Update the placeholder with typing cursor effect
+        def render(text: str, done: bool):
+            # Typing cursor until the answer is complete
+            cursor = "" if done else "▊"
             response_placeholder.markdown(f"""
             <div class="message bot-message">
-                <div class="message-content">{current_text}▊</div>
+                <div class="message-content">{text}{cursor}</div>
             </div>
             """, unsafe_allow_html=True)
-            await asyncio.sleep(0.01)
 
-        # Final update without cursor
-        response_placeholder.markdown(f"""
-        <div class="message bot-message">
-            <div class="message-content">{current_text}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        stats = await render_stream(news_pipeline.run_follow_up(
+            user_request=user_question,
+            task=f"Answer this question based on the news about {st.session_state.news_topic}"
+        ), render)
+        current_text = stats.text
+        logger.info("Rendered answer: %d chunks at %.0f/s in %d render calls",
+                    stats.chunks, stats.chunks_per_second, stats.render_calls)
 
         return current_text
 
@@ -751,6 +754,7 @@ def display_chat_page():
 
 def main():
     """Main application entry point"""
+    warmup_models()
     initialize_session_state()
 
     if st.session_state.page == 'home':
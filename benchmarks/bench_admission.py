@@ -0,0 +1,63 @@
+'''
+Burst test of server.AdmissionController.
+
+Fires --burst requests at once at a controller with --max-active slots and
+--max-queue waiting places; each admitted request holds its slot for
+--hold seconds. Requests beyond max_active + max_queue should be rejected
+(429) right away instead of after --queue-timeout, and queued ones should
+be admitted as slots free up. Reports how many were admitted, rejected
+right away and rejected on timeout, with the latency of each group.
+
+    python -m benchmarks.bench_admission --burst 20 --max-active 2 --max-queue 2
+'''
+import argparse
+import asyncio
+import statistics
+import time
+
+from server import AdmissionController, Overloaded
+
+
+async def request(admission: AdmissionController, hold: float):
+    start = time.perf_counter()
+    try:
+        async with admission:
+            waited = time.perf_counter() - start
+            await asyncio.sleep(hold)
+            return "admitted", waited
+    except Overloaded as error:
+        return ("timed out" if "timed out" in str(error) else "rejected"), time.perf_counter() - start
+
+
+async def burst(size: int, max_active: int, max_queue: int, queue_timeout: float, hold: float):
+    admission = AdmissionController(max_active, max_queue, queue_timeout)
+    results = await asyncio.gather(*(request(admission, hold) for _ in range(size)))
+    return results, admission.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst test of the server's admission control.")
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--max-active", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=2)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    parser.add_argument("--hold", type=float, default=0.2, help="seconds each admitted request runs")
+    args = parser.parse_args()
+
+    print(f"{'max_active':>10}{'max_queue':>10}{'burst':>6}{'admitted':>9}{'rejected':>9}{'reject ms':>10}"
+          f"{'timed out':>10}{'wait max s':>11}")
+    for max_queue in sorted({args.max_queue, 0}):
+        results, stats = asyncio.run(burst(args.burst, args.max_active, max_queue, args.queue_timeout, args.hold))
+        groups = {outcome: [seconds for kind, seconds in results if kind == outcome]
+                  for outcome in ("admitted", "rejected", "timed out")}
+        reject_ms = statistics.median(groups["rejected"]) * 1000 if groups["rejected"] else 0.0
+        print(f"{args.max_active:>10}{max_queue:>10}{args.burst:>6}{len(groups['admitted']):>9}"
+              f"{len(groups['rejected']):>9}{reject_ms:>10.2f}{len(groups['timed out']):>10}"
+              f"{max(groups['admitted'], default=0.0):>11.2f}")
+        expected = min(args.burst, args.max_active + max_queue)
+        if len(groups["admitted"]) != expected or stats["active"] or stats["waiting"]:
+            print(f"  expected {expected} admitted and no request left active or waiting, got {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+'''
+Recall/latency benchmark for the index factory in utils.embedding.
+
+Builds flat, IVF and HNSW indexes over synthetic clustered, unit-length
+384-dimensional vectors (the shape of all-MiniLM-L6-v2 embeddings) and reports,
+per corpus size, build time, single-query latency and recall@k against the
+exact flat baseline. The kind "auto" would pick is marked with *.
+
+    python -m benchmarks.bench_ann --sizes 10000 100000 1000000 --k 10
+'''
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from utils.embedding import build_index, choose_index_kind
+
+DIM = 384
+
+
+def synthetic_embeddings(n: int, rng: np.random.Generator, n_clusters: int = 1000) -> np.ndarray:
+    centers = rng.standard_normal((n_clusters, DIM), dtype=np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)]
+    vectors += 0.6 * rng.standard_normal((n, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def bench(kind: str, corpus: np.ndarray, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    index = build_index(corpus, kind)
+    index.add(corpus)
+    build_seconds = time.perf_counter() - start
+
+    found = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        found[i] = index.search(query[None, :], k)[1][0]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return build_seconds, latency_ms, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark flat/IVF/HNSW index selection.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=0, help="FAISS OpenMP threads (0 = default)")
+    args = parser.parse_args()
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    rng = np.random.default_rng(42)
+    print(f"{'chunks':>9} {'index':<6}{'build s':>9}{'query ms':>10}{f'recall@{args.k}':>11}")
+    for size in args.sizes:
+        data = synthetic_embeddings(size + args.queries, rng)
+        corpus, queries = data[:size], data[size:]
+        auto_kind = choose_index_kind(size)
+
+        results = {}
+        for kind in ("flat", "ivf", "hnsw"):
+            results[kind] = bench(kind, corpus, queries, args.k)
+        truth = results["flat"][2]
+
+        for kind, (build_seconds, latency_ms, found) in results.items():
+            marker = "*" if kind == auto_kind else " "
+            print(f"{size:>9} {kind + marker:<6}{build_seconds:>9.2f}{latency_ms:>10.3f}"
+                  f"{recall_at_k(found, truth):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
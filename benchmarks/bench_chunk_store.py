@@ -0,0 +1,114 @@
+'''
+Benchmark of utils.chunk_store.ChunkStore against the dicts TopicIndex used
+before (chunk id -> text, chunk id -> link and link -> article dict with
+the chunk texts, saved as meta.json).
+
+Articles are synthesised from NEWS_data sentences and chunked with
+utils.chunking. Reports the Python heap used by each layout (tracemalloc),
+also for a store opened from disk, where the columns are memory-mapped,
+save and open time and the cost of a random chunk lookup.
+
+    python -m benchmarks.bench_chunk_store --articles 2000 20000
+'''
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+from benchmarks.bench_e2e import synthesize_corpus
+from utils.chunk_store import ChunkStore
+from utils.chunking import chunk_spans
+
+
+def build_dicts(corpus: List[Dict], spans) -> Tuple[dict, dict, dict]:
+    chunks, sources, articles = {}, {}, {}
+    for chunk_id, (i, start, end) in enumerate(spans):
+        link = f"https://news.example/{i}"
+        chunks[chunk_id] = corpus[i]["text"][start:end]
+        sources[chunk_id] = link
+        article = articles.setdefault(link, {"title": corpus[i]["title"], "first_seen": time.time(),
+                                             "chunk_ids": [], "chunks": [], "alternates": []})
+        article["chunk_ids"].append(chunk_id)
+        article["chunks"].append(chunks[chunk_id])
+    return chunks, sources, articles
+
+
+def build_store(corpus: List[Dict], spans) -> ChunkStore:
+    store = ChunkStore()
+    by_article: Dict[int, List[Tuple[int, int]]] = {}
+    for i, start, end in spans:
+        by_article.setdefault(i, []).append((start, end))
+    chunk_id = 0
+    for i, article_spans in by_article.items():
+        store.add_article(f"https://news.example/{i}", corpus[i]["title"], corpus[i]["text"], article_spans,
+                          chunk_id, time.time(), "1 day ago")
+        chunk_id += len(article_spans)
+    return store
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, used
+
+
+def lookup_us(mapping, ids: List[int]) -> float:
+    start = time.perf_counter()
+    for chunk_id in ids:
+        mapping[chunk_id]
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chunk store against per-chunk dicts.")
+    parser.add_argument("--articles", type=int, nargs="+", default=[2000, 20000])
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="bench-chunk-store-")
+    print(f"{'articles':>8} {'chunks':>8} {'layout':>6} {'heap MB':>8} {'file MB':>8} "
+          f"{'save ms':>8} {'open ms':>8} {'lookup us':>9}")
+    for size in args.articles:
+        corpus = synthesize_corpus(size, seed=size)
+        spans = chunk_spans([article["text"] for article in corpus])
+        ids = random.Random(0).choices(range(len(spans)), k=20000)
+
+        (chunks, sources, articles), dict_bytes = measure(lambda: build_dicts(corpus, spans))
+        path = os.path.join(folder, f"meta-{size}.json")
+        start = time.perf_counter()
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"articles": articles}, file)
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(path, encoding="utf-8") as file:
+            loaded = json.load(file)["articles"]
+        reopened = {chunk_id: text for article in loaded.values()
+                    for chunk_id, text in zip(article["chunk_ids"], article["chunks"])}
+        opened = time.perf_counter() - start
+        print(f"{size:8d} {len(spans):8d} {'dicts':>6} {dict_bytes / 2 ** 20:8.1f} "
+              f"{os.path.getsize(path) / 2 ** 20:8.1f} {save * 1000:8.1f} {opened * 1000:8.1f} "
+              f"{lookup_us(reopened, ids):9.2f}")
+        del chunks, sources, articles, loaded, reopened
+
+        store, store_bytes = measure(lambda: build_store(corpus, spans))
+        path = os.path.join(folder, f"chunks-{size}.store")
+        start = time.perf_counter()
+        store.save(path)
+        save = time.perf_counter() - start
+        del store
+        start = time.perf_counter()
+        reopened, mapped_bytes = measure(lambda: ChunkStore.load(path))
+        opened = time.perf_counter() - start
+        print(f"{size:8d} {len(spans):8d} {'store':>6} {store_bytes / 2 ** 20:8.1f} "
+              f"{os.path.getsize(path) / 2 ** 20:8.1f} {save * 1000:8.1f} {opened * 1000:8.1f} "
+              f"{lookup_us(reopened, ids):9.2f}")
+        print(f"{'':>8} {'':>8} {'mapped':>6} {mapped_bytes / 2 ** 20:8.1f}   (store after open, file pages in the page cache)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+'''
+Benchmark of the sentence-aligned span chunker in utils.chunking against
+LangChain's RecursiveCharacterTextSplitter (chunk_size=1600,
+chunk_overlap=200), which chunk_doc used before.
+
+The corpus is NEWS_data as scraped, including the "Failed to retrieve the
+webpage." placeholders and near-empty pages, repeated --copies times. For
+each chunker it reports documents/s and MB/s, how many chunks (and
+characters) would be sent to the embedder, how many of those come from
+failed or too-short documents, and the share of chunks that end mid-sentence.
+
+    python -m benchmarks.bench_chunking --copies 50 --repeat 5
+'''
+import argparse
+import re
+import time
+from typing import Callable, List, Tuple
+
+from benchmarks.news_server import load_articles
+from utils.chunking import CHUNK_OVERLAP, CHUNK_SIZE, chunk_spans, is_usable
+
+Chunker = Callable[[List[str]], List[Tuple[int, str]]]
+
+# Same sentence ending as utils.chunking, checked on the last characters of a chunk.
+_ENDS_SENTENCE = re.compile(r"""[.!?…]+["'”’)\]]*$""")
+
+
+def langchain_chunker() -> Chunker:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    def chunk(documents: List[str]) -> List[Tuple[int, str]]:
+        return [(i, text) for i, doc in enumerate(documents) for text in splitter.split_text(doc)]
+    return chunk
+
+
+def span_chunker(documents: List[str]) -> List[Tuple[int, str]]:
+    # Slices only to measure what would be embedded; the spans themselves are offsets.
+    return [(article_id, documents[article_id][start:end]) for article_id, start, end in chunk_spans(documents)]
+
+
+def ends_mid_sentence(document: str, text: str) -> bool:
+    if _ENDS_SENTENCE.search(text.rstrip()):
+        return False
+    end = document.find(text) + len(text)
+    # The end of the document or of a line is a boundary too.
+    return bool(document[end:].strip()) and "\n" not in document[end:end + 2]
+
+
+def run(name: str, chunker: Chunker, documents: List[str], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunker(documents)
+        best = min(best, time.perf_counter() - start)
+
+    megabytes = sum(len(doc.encode("utf-8")) for doc in documents) / 2 ** 20
+    unusable = sum(not is_usable(documents[i]) for i, _ in chunks)
+    mid_sentence = sum(ends_mid_sentence(documents[i], text) for i, text in chunks)
+    chars = sum(len(text) for _, text in chunks)
+    print(f"{name:20s} {len(documents) / best:9.0f} {megabytes / best:7.1f} {len(chunks):8d} "
+          f"{chars / 2 ** 20:8.1f} {unusable:9d} {100 * mid_sentence / max(len(chunks), 1):11.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the span chunker against the LangChain splitter.")
+    parser.add_argument("--copies", type=int, default=50, help="times NEWS_data is repeated")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes; the best is reported")
+    args = parser.parse_args()
+
+    articles = load_articles()
+    documents = articles * args.copies
+    print(f"{len(documents)} documents ({sum(not is_usable(doc) for doc in documents)} failed or too short), "
+          f"best of {args.repeat} passes")
+    print(f"{'chunker':20s} {'docs/s':>9s} {'MB/s':>7s} {'chunks':>8s} {'MB embed':>8s} "
+          f"{'from junk':>9s} {'mid-sentence':>12s}")
+    run("langchain recursive", langchain_chunker(), documents, args.repeat)
+    run("spans", span_chunker, documents, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+'''
+Benchmark of the near-duplicate stage in utils.dedup.
+
+Synthesises a corpus the way Google News results look: every NEWS_data
+article is republished by several outlets with a different headline,
+byline and a few edited sentences. Reports how long MinHash/LSH takes over
+the corpus, how many clusters it finds and how much chunking/embedding work
+the dropped copies would have cost.
+
+    python -m benchmarks.bench_dedup --copies 5 --repeat 10
+'''
+import argparse
+import random
+import re
+import time
+
+from benchmarks.news_server import load_articles
+from utils.dedup import NearDuplicateIndex
+
+
+def syndicate(text: str, outlet: int, rng: random.Random, edits: int = 2) -> str:
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text) if s]
+    for _ in range(min(edits, len(sentences))):
+        i = rng.randrange(len(sentences))
+        sentences[i] = f"Outlet {outlet} adds that {sentences[i][:1].lower()}{sentences[i][1:]}"
+    return f"By staff reporter, News Outlet {outlet}. " + " ".join(sentences)
+
+
+def build_corpus(repeat: int, copies: int, seed: int = 0):
+    rng = random.Random(seed)
+    originals = [text for text in load_articles() if len(text) > 100]
+    corpus = []
+    for r in range(repeat):
+        for i, text in enumerate(originals):
+            # Tag every word so repeats are distinct stories rather than new duplicates.
+            story = re.sub(r"\w+", lambda m: f"{m.group()}{r}", text) if r else text
+            corpus.append((f"{r}-{i}", story))
+            corpus.extend((f"{r}-{i}", syndicate(story, c, rng)) for c in range(copies))
+    rng.shuffle(corpus)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate article elimination.")
+    parser.add_argument("--copies", type=int, default=5, help="syndicated copies per story")
+    parser.add_argument("--repeat", type=int, default=10, help="how many times to reuse NEWS_data")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.repeat, args.copies)
+    total_chars = sum(len(text) for _, text in corpus)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    start = time.perf_counter()
+    canonical_story = {}
+    dropped_chars = wrong = 0
+    for key, (story, text) in enumerate(corpus):
+        duplicate_of = index.add(key, text)
+        if duplicate_of is None:
+            canonical_story[key] = story
+        else:
+            dropped_chars += len(text)
+            wrong += canonical_story[duplicate_of] != story
+    elapsed = time.perf_counter() - start
+
+    stories = len({story for story, _ in corpus})
+    print(f"{len(corpus)} articles ({total_chars / 1e6:.1f}M chars), {stories} distinct stories")
+    print(f"dedup time      {elapsed:.3f}s ({len(corpus) / elapsed:.0f} articles/s)")
+    print(f"clusters        {len(index)} (merged into the wrong story: {wrong})")
+    print(f"dropped         {len(corpus) - len(index)} articles, {dropped_chars / total_chars:.0%} of the text")
+    print(f"chunks saved    ~{dropped_chars / 1400:.0f} of ~{total_chars / 1400:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+'''
+Offline end-to-end benchmark of NewsPipeline.
+
+Everything external is replaced by a local stand-in: Google News by
+FakeGoogleNews, the news sites by LocalNewsServer and Groq by
+FakeLLMServer (through the real async client, via GROQ_BASE_URL). Articles
+are synthesised from the sentences in NEWS_data, or replayed from a
+recording made with --record (results.json plus one HTML page per result).
+
+For every corpus size it times each stage on its own (listing, fetch,
+extract, dedupe, chunk, embed, index, retrieve+pack, LLM) and the pipeline
+end to end: time to first token of the summary, time until the topic is
+fully indexed and a follow-up answer. The results are printed as JSON, so
+runs can be compared across commits.
+
+    python -m benchmarks.bench_e2e --sizes 20 100 500 --output bench.json
+    python -m benchmarks.bench_e2e --embedder model   # real all-MiniLM-L6-v2
+    python -m benchmarks.bench_e2e --record /tmp/corpus --sizes 200
+    python -m benchmarks.bench_e2e --replay /tmp/corpus --sizes 50 200
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.fake_google_news import FakeGoogleNews
+from benchmarks.fake_llm_server import serve_llm
+from benchmarks.news_server import load_articles, render_article, serve_news
+
+TOPIC = "operation sindoor benchmark"
+QUERIES = [
+    "What happened during Operation Sindoor?",
+    "How did Pakistan respond?",
+    "What did the Chief of Defence Staff say?",
+    "Which aircraft were involved?",
+]
+
+
+class HashEmbedder:
+    '''
+    Deterministic bag-of-words hashing encoder with the SentenceTransformer
+    methods the pipeline uses. Stands in for the model where it cannot be
+    downloaded; its timings say nothing about real embedding cost.
+    '''
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model_id = f"hash-{dim}"  # see utils.model_registry.model_id_of
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: List[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-6)
+
+
+def synthesize_corpus(size: int, seed: int) -> List[Dict]:
+    '''
+    size distinct articles built from NEWS_data sentences, with the lengths of
+    the NEWS_data articles, so chunking and embedding see realistic text.
+    '''
+    originals = [text for text in load_articles() if len(text) > 100]
+    sentences = [s for text in originals for s in re.split(r"(?<=[.!?])\s+", text) if len(s) > 20]
+    lengths = [len(text) for text in originals]
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        target, parts, chars = rng.choice(lengths), [], 0
+        while chars < target:
+            parts.append(rng.choice(sentences))
+            chars += len(parts[-1]) + 1
+        corpus.append({"title": f"Story {seed}-{i}", "text": " ".join(parts)})
+    return corpus
+
+
+def record_corpus(folder_name: str, corpus: List[Dict]) -> None:
+    os.makedirs(folder_name, exist_ok=True)
+    for i, article in enumerate(corpus):
+        with open(os.path.join(folder_name, f"page_{i}.html"), "w", encoding="utf-8") as file:
+            file.write(render_article(article["text"], article["title"]))
+    with open(os.path.join(folder_name, "results.json"), "w", encoding="utf-8") as file:
+        json.dump([{"title": a["title"], "page": f"page_{i}.html"} for i, a in enumerate(corpus)], file)
+
+
+def replay_corpus(folder_name: str, size: int) -> List[Dict]:
+    with open(os.path.join(folder_name, "results.json"), encoding="utf-8") as file:
+        results = json.load(file)[:size]
+    corpus = []
+    for result in results:
+        with open(os.path.join(folder_name, result["page"]), encoding="utf-8") as file:
+            corpus.append({"title": result["title"], "html": file.read()})
+    return corpus
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def stream_timing(stream) -> Dict[str, float]:
+    start = time.perf_counter()
+    first = None
+    chars = 0
+    async for text in stream:
+        if first is None:
+            first = time.perf_counter() - start
+        chars += len(text)
+    return {"ttft": first or 0.0, "total": time.perf_counter() - start, "chars": chars}
+
+
+def make_search(corpus: List[Dict], links: List[str], args) -> FakeGoogleNews:
+    search = FakeGoogleNews(total=len(corpus), page_size=10, latency=args.search_latency,
+                            duplicate_rate=0, links=links)
+    for result, article in zip(search.results, corpus):
+        result["title"] = article["title"]
+    return search
+
+
+def bench_stages(corpus: List[Dict], links: List[str], embedder, args) -> Dict[str, float]:
+    import asyncio
+
+    from utils.chunking import chunk_spans
+    from utils.context_packer import pack_context
+    from utils.dedup import NearDuplicateIndex
+    from utils.embedding import encode_chunks
+    from utils.encode_query import encode_query
+    from utils.extract_document import search_batch
+    from utils.model import get_model_response
+    from utils.news_fetcher import iter_google_news
+    from utils.scraper import FAILED_DESCRIPTION, HostThrottle, extract_page, fetch_page, make_session
+    from utils.topic_index import TopicIndex
+
+    stages = {}
+    search = make_search(corpus, links, args)
+    batches, stages["list"] = timed(lambda: list(iter_google_news(TOPIC, limit=len(corpus), backend=search)))
+    listed = [link for batch in batches for link in batch["link"]]
+
+    session, throttle = make_session(16), HostThrottle(args.host_delay, args.host_delay)
+    with ThreadPoolExecutor(16) as pool:
+        pages, stages["fetch"] = timed(
+            lambda: list(pool.map(lambda link: fetch_page(link, session, throttle, None), listed)))
+    session.close()
+    texts, stages["extract"] = timed(lambda: [extract_page(page, None) for page in pages])
+    texts = [text for text in texts if text != FAILED_DESCRIPTION]
+
+    def dedupe():
+        index = NearDuplicateIndex()
+        return [text for i, text in enumerate(texts) if index.add(i, text) is None]
+    texts, stages["dedupe"] = timed(dedupe)
+    spans, stages["chunk"] = timed(chunk_spans, texts)
+    all_chunks = [texts[i][start:end] for i, start, end in spans]
+    embeddings, stages["embed"] = timed(encode_chunks, all_chunks, embedder, None)
+
+    def index():
+        topic_index = TopicIndex(TOPIC, tempfile.mkdtemp())
+        by_article = [[] for _ in texts]
+        for i, start, end in spans:
+            by_article[i].append((start, end))
+        offset = 0
+        for i, article_spans in enumerate(by_article):
+            topic_index.add_article(f"article-{i}", f"Article {i}", texts[i], article_spans,
+                                    embeddings[offset:offset + len(article_spans)])
+            offset += len(article_spans)
+        topic_index.save()
+        return topic_index
+    topic_index, stages["index"] = timed(index)
+
+    def retrieve():
+        for query in QUERIES:
+            hits = search_batch(topic_index, encode_query(query, embedder), topic_index.chunks, 10,
+                                sources=topic_index.chunk_sources, dedupe=False)[0]
+            pack_context(hits)
+    _, elapsed = timed(retrieve)
+    stages["retrieve_pack_per_query"] = elapsed / len(QUERIES)
+
+    async def llm_text():
+        async for chunk in get_model_response([{"role": "user", "content": "Summarize"}]):
+            yield chunk.choices[0].delta.content or ""
+    llm = asyncio.run(stream_timing(llm_text()))
+    stages["llm_ttft"], stages["llm_total"] = llm["ttft"], llm["total"]
+    stages["chunks"] = len(all_chunks)
+    return stages
+
+
+def bench_end_to_end(corpus: List[Dict], links: List[str], embedder, args) -> Dict[str, float]:
+    import asyncio
+
+    from inference_pipeline import NewsPipeline
+    from utils.answer_cache import AnswerCache
+    from utils.topic_manager import TopicManager
+
+    topics = TopicManager(root=tempfile.mkdtemp(), news_backend=make_search(corpus, links, args),
+                          host_delay=(args.host_delay, args.host_delay))
+    pipeline = NewsPipeline(ready_after=args.ready_after, deadline=args.deadline, topics=topics,
+                            answer_cache=AnswerCache(), embed_model=embedder)
+
+    async def run():
+        start = time.perf_counter()
+        summary = await stream_timing(pipeline.run_pipeline(TOPIC))
+        indexed_at = None
+        if pipeline.ingestion is not None:
+            await asyncio.wrap_future(pipeline.ingestion)
+            indexed_at = time.perf_counter() - start
+        follow_up = await stream_timing(pipeline.run_follow_up(QUERIES[1], task="Answer the question."))
+        return {
+            "summary_ttft": summary["ttft"],
+            "summary_total": summary["total"],
+            "fully_indexed": indexed_at,
+            "follow_up_ttft": follow_up["ttft"],
+            "follow_up_total": follow_up["total"],
+            "articles_indexed": len(pipeline.index.articles),
+            "chunks_indexed": pipeline.index.ntotal,
+        }
+    return asyncio.run(run())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of NewsPipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--hosts", type=int, default=20, help="local news sites to spread articles over")
+    parser.add_argument("--fetch-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.1, help="per Google News page")
+    parser.add_argument("--host-delay", type=float, default=0.0, help="per-host politeness delay")
+    parser.add_argument("--llm-ttft", type=float, default=0.2)
+    parser.add_argument("--llm-tokens", type=int, default=200)
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--ready-after", type=int, default=10)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--record", help="write the synthesised corpus of the largest size here and exit")
+    parser.add_argument("--replay", help="serve a corpus recorded with --record")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        record_corpus(args.record, synthesize_corpus(max(args.sizes), seed=0))
+        return
+
+    # Caches must be fresh, and utils reads NEWS_CACHE_DIR at import time.
+    os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-e2e-")
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    if args.embedder == "model":
+        from utils.model_registry import get_embedding_model
+        embedder = get_embedding_model()
+    else:
+        embedder = HashEmbedder()
+
+    report = {
+        "commit": git_commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+        "argv": sys.argv[1:], "params": vars(args), "results": [],
+    }
+    with serve_llm(tokens=args.llm_tokens, ttft=args.llm_ttft, token_delay=args.llm_token_delay) as llm:
+        os.environ["GROQ_BASE_URL"] = llm.base_url
+        for size in args.sizes:
+            corpus = replay_corpus(args.replay, size) if args.replay else synthesize_corpus(size, seed=size)
+            html = "html" in corpus[0]
+            pages = [article["html"] if html else article["text"] for article in corpus]
+            with serve_news(pages, latency=args.fetch_latency, hosts=args.hosts, html=html) as servers:
+                links = [servers[i % len(servers)].links()[i] for i in range(len(corpus))]
+                # End to end first, while the article and embedding caches are cold.
+                end_to_end = bench_end_to_end(corpus, links, embedder, args)
+                stages = bench_stages(corpus, links, embedder, args)
+            report["results"].append({"articles": len(corpus), "stages": stages, "end_to_end": end_to_end})
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+'''
+Benchmark of the HTML text-extraction backends in utils.html_extract.
+
+Runs every extractor over a directory of saved HTML pages (*.html) and reports
+pages/sec and extracted bytes. Without --fixtures, pages are generated from
+NEWS_data with typical boilerplate around the article: cookie banner,
+navigation, "related stories", newsletter box and footer paragraphs.
+
+    python -m benchmarks.bench_extract --fixtures path/to/html --repeat 5
+    python -m benchmarks.bench_extract --save-fixtures /tmp/news_html
+'''
+import argparse
+import os
+import re
+import time
+from html import escape
+from typing import List
+
+from benchmarks.news_server import load_articles
+from utils.html_extract import EXTRACTORS, get_extractor
+
+
+def render_noisy_article(text: str, title: str) -> str:
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text) if s]
+    body = "".join(
+        f"<p>{escape(' '.join(sentences[i:i + 3]))}</p>" for i in range(0, len(sentences), 3)
+    )
+    related = "".join(
+        f"<li><a href='/story/{i}'><p>Related story number {i} you may have missed</p></a></li>"
+        for i in range(8)
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{escape(title)}</title><script>window.dataLayer = [];</script>"
+        "<style>body { font-family: sans-serif; }</style></head><body>"
+        "<div class='cookie-consent'><p>We use cookies to improve your experience. By continuing "
+        "to browse you agree to our use of cookies and our privacy policy.</p></div>"
+        "<header><nav><a href='/'>Home</a><a href='/world'>World</a><a href='/india'>India</a></nav></header>"
+        f"<main><article><h1>{escape(title)}</h1><p class='byline'>By Staff Reporter</p>{body}"
+        "<div class='newsletter-signup'><p>Get the day's top stories in your inbox. "
+        "Subscribe to our free newsletter today.</p></div></article>"
+        f"<aside class='related-stories'><ul>{related}</ul></aside></main>"
+        "<footer><p>Copyright 2025 Example News Network. All rights reserved.</p>"
+        "<p><a href='/about'>About us</a> <a href='/contact'>Contact</a></p></footer>"
+        "</body></html>"
+    )
+
+
+def generated_fixtures() -> List[str]:
+    # Skip the near-empty files (failed downloads) in NEWS_data.
+    return [render_noisy_article(text, f"Article {i}")
+            for i, text in enumerate(load_articles()) if len(text) > 100]
+
+
+def load_fixtures(folder_name: str) -> List[str]:
+    pages = []
+    for filename in sorted(os.listdir(folder_name)):
+        if filename.endswith((".html", ".htm")):
+            with open(os.path.join(folder_name, filename), "r", encoding="utf-8", errors="replace") as file:
+                pages.append(file.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extractors.")
+    parser.add_argument("--fixtures", help="directory of saved .html pages")
+    parser.add_argument("--save-fixtures", help="write the generated pages to this directory and exit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for i, page in enumerate(generated_fixtures()):
+            with open(os.path.join(args.save_fixtures, f"article_{i}.html"), "w", encoding="utf-8") as file:
+                file.write(page)
+        return
+
+    pages = load_fixtures(args.fixtures) if args.fixtures else generated_fixtures()
+    html_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    print(f"{len(pages)} pages, {html_bytes / 1024:.0f} KiB of HTML, {args.repeat} passes")
+    print(f"{'extractor':<10}{'pages/s':>10}{'text KiB':>10}{'bytes/page':>12}")
+
+    for name in EXTRACTORS:
+        extractor = get_extractor(name)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            texts = [extractor.extract(page) for page in pages]
+        elapsed = time.perf_counter() - start
+        text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+        print(f"{name:<10}{len(pages) * args.repeat / elapsed:>10.0f}"
+              f"{text_bytes / 1024:>10.0f}{text_bytes / max(len(pages), 1):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+'''
+Import-time and cold-start benchmark of the entry points.
+
+Every measurement runs in a fresh interpreter, as a new Streamlit script
+run, server process or container would. For each module (by default
+inference_pipeline, server and main; app needs streamlit) it runs
+`python -X importtime -c "import <module>"` --repeat times and reports the
+median import time, the packages that cost most (self time of all their
+modules, summed per top-level package) and which heavy dependencies were
+imported on the way, none of which should be until they are first used.
+
+Cold start is the time from interpreter start until a NewsPipeline is
+constructed; with --warmup, until the embedding model is loaded too.
+
+    python -m benchmarks.bench_import --repeat 5
+    python -m benchmarks.bench_import --modules inference_pipeline app --warmup --output import.json
+'''
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.bench_e2e import git_commit
+
+# Dependencies that only some requests need; importing an entry point should load none of them.
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "sklearn", "faiss", "langchain",
+                 "groq", "httpx", "pandas", "bs4", "GoogleNews"]
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+COLD_START = '''
+import json, sys, time
+start = time.perf_counter()
+from inference_pipeline import NewsPipeline
+imported = time.perf_counter()
+NewsPipeline()
+constructed = time.perf_counter()
+if {warmup}:
+    from utils.model_registry import warmup
+    warmup()
+print(json.dumps({{"import": imported - start, "construct": constructed - imported,
+                  "warmup": time.perf_counter() - constructed,
+                  "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def _timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def run_python(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def import_profile(module: str, env: Dict[str, str]) -> dict:
+    '''
+    Wall time of `import module` in a new interpreter, its cumulative import
+    time and the self time per top-level package, from -X importtime.
+    '''
+    code = f"import sys; import {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    start = time.perf_counter()
+    result = run_python(["-X", "importtime", "-c", code], env)
+    wall = time.perf_counter() - start
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+        if not indent and name == module:
+            total = int(cumulative_us) / 1e6
+    heavy = result.stdout.strip()
+    return {"wall": wall, "import": total, "packages": dict(packages),
+            "heavy": heavy.split(",") if heavy else []}
+
+
+def bench_module(module: str, repeat: int, top: int, env: Dict[str, str]) -> dict:
+    runs = [import_profile(module, env) for _ in range(repeat)]
+    packages = {name: statistics.median(run["packages"].get(name, 0.0) for run in runs)
+                for name in set().union(*(run["packages"] for run in runs))}
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "module": module,
+        "import_median": statistics.median(run["import"] for run in runs),
+        "wall_median": statistics.median(run["wall"] for run in runs),
+        "heaviest": [{"package": name, "seconds": seconds} for name, seconds in heaviest],
+        "heavy_imported": sorted(set().union(*(run["heavy"] for run in runs))),
+    }
+
+
+def bench_cold_start(repeat: int, warmup: bool, env: Dict[str, str]) -> dict:
+    code = COLD_START.format(warmup=warmup, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = json.loads(run_python(["-c", code], env).stdout)
+        result["wall"] = time.perf_counter() - start
+        runs.append(result)
+    report = {key: statistics.median(run[key] for run in runs) for key in ("wall", "import", "construct", "warmup")}
+    report["heavy_imported"] = sorted(set().union(*(run["heavy"] for run in runs)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and cold-start benchmark of the entry points.")
+    parser.add_argument("--modules", nargs="+", default=["inference_pipeline", "server", "main"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages listed per module")
+    parser.add_argument("--warmup", action="store_true", help="include loading the embedding model in cold start")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    # A throwaway cache, so opening the caches measures the empty state.
+    env = dict(os.environ, NEWS_CACHE_DIR=tempfile.mkdtemp(prefix="bench-import-"),
+               PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    interpreter = statistics.median(
+        _timed(lambda: run_python(["-c", "pass"], env)) for _ in range(args.repeat))
+    report = {
+        "commit": git_commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+        "argv": sys.argv[1:], "interpreter_seconds": interpreter, "modules": [], "cold_start": None,
+    }
+    print(f"interpreter start: {interpreter * 1000:.0f} ms (median of {args.repeat})")
+    for module in args.modules:
+        try:
+            result = bench_module(module, args.repeat, args.top, env)
+        except subprocess.CalledProcessError as e:
+            print(f"{module}: import failed\n{e.stderr.strip().splitlines()[-1]}")
+            continue
+        report["modules"].append(result)
+        print(f"\nimport {module}: {result['import_median'] * 1000:.0f} ms "
+              f"({result['wall_median'] * 1000:.0f} ms wall)")
+        print(f"  heavy dependencies imported: {', '.join(result['heavy_imported']) or 'none'}")
+        for item in result["heaviest"]:
+            print(f"  {item['package']:<24} {item['seconds'] * 1000:8.1f} ms")
+
+    cold = bench_cold_start(args.repeat, args.warmup, env)
+    report["cold_start"] = cold
+    print(f"\ncold start to NewsPipeline(): {cold['wall'] * 1000:.0f} ms wall "
+          f"(import {cold['import'] * 1000:.0f} ms, construct {cold['construct'] * 1000:.1f} ms"
+          + (f", model warmup {cold['warmup'] * 1000:.0f} ms" if args.warmup else "") + ")")
+    print(f"  heavy dependencies imported: {', '.join(cold['heavy_imported']) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+'''
+Memory/latency/recall benchmark for the index modes in utils.embedding
+(float32, float16, int8 and pq), with the exact re-ranking TopicIndex does
+for the lossy ones.
+
+Uses the synthetic 384-dimensional vectors of bench_ann. The exact vectors
+used for re-ranking are read from a memory-mapped .npy file, as TopicIndex
+reads them from its memory-mapped ChunkStore. Per mode and index kind it
+reports the bytes per vector the index keeps in RAM, what that means for a
+million chunks (RAM, plus the re-rank vectors on disk), training time (what
+a TopicIndex rebuild spends in the background before it can swap the new
+index in), total build time, single-query latency and recall@k against the
+exact float32 flat index.
+
+    python -m benchmarks.bench_index_modes --size 100000 --kinds flat hnsw --k 10
+'''
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import DIM, recall_at_k, synthetic_embeddings
+from utils.embedding import INDEX_MODES, RERANK_FACTOR, build_index, code_size, effective_mode, needs_rerank, rerank_exact
+
+
+def bench(kind: str, mode: str, corpus: np.ndarray, exact: np.ndarray, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    index = build_index(corpus, kind, mode=mode)
+    train_seconds = time.perf_counter() - start
+    index.add(corpus)
+    build_seconds = time.perf_counter() - start
+
+    found = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        query = query[None, :]
+        if needs_rerank(mode):
+            _, candidates = index.search(query, k * RERANK_FACTOR)
+            found[i] = rerank_exact(query, candidates, lambda ids: exact[ids], k)[1][0]
+        else:
+            found[i] = index.search(query, k)[1][0]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return train_seconds, build_seconds, latency_ms, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float32/float16/int8/pq index modes.")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", nargs="+", default=["flat", "hnsw"], choices=["flat", "ivf", "hnsw"])
+    parser.add_argument("--threads", type=int, default=0, help="FAISS OpenMP threads (0 = default)")
+    args = parser.parse_args()
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    rng = np.random.default_rng(42)
+    data = synthetic_embeddings(args.size + args.queries, rng)
+    corpus, queries = data[:args.size], data[args.size:]
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-index-modes-"), "vectors.npy")
+    np.save(path, corpus)
+    exact = np.load(path, mmap_mode="r")
+
+    truth = bench("flat", "float32", corpus, exact, queries, args.k)[3]
+    print(f"{args.size} chunks, {args.queries} queries, lossy modes re-rank {RERANK_FACTOR}*k candidates")
+    print(f"{'mode':<8}{'index':<6}{'B/vector':>9}{'RAM MB/1M':>10}{'disk MB/1M':>11}"
+          f"{'train s':>9}{'build s':>9}{'query ms':>10}{f'recall@{args.k}':>11}")
+    for kind in args.kinds:
+        for mode in INDEX_MODES:
+            train_seconds, build_seconds, latency_ms, found = bench(kind, mode, corpus, exact, queries, args.k)
+            built = effective_mode(mode, args.size)  # pq below PQ_MIN_TRAIN vectors is int8
+            per_vector = code_size(built, DIM)
+            rerank_bytes = DIM * 4 if needs_rerank(built) else 0
+            print(f"{built:<8}{kind:<6}{per_vector:>9}{per_vector * 1e6 / 2 ** 20:>10.0f}"
+                  f"{rerank_bytes * 1e6 / 2 ** 20:>11.0f}{train_seconds:>9.2f}{build_seconds:>9.2f}{latency_ms:>10.3f}"
+                  f"{recall_at_k(found, truth):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
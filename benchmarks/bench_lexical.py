@@ -0,0 +1,108 @@
+'''
+Benchmark of the BM25 index in utils.lexical_index at 100k+ chunks.
+
+Articles are synthesised from NEWS_data sentences and chunked with
+utils.chunking; --needles of them get a made-up codename ("Operation
+Kestrel-17") appended to one chunk. The chunks are added article by article,
+as ingestion does. Reports indexing throughput and memory, BM25 query
+latency (p50/p95) for short news queries, the extra latency of fusing BM25
+into a TopicIndex search over the same chunks, and how often a codename
+query finds its chunk within the top k.
+
+    python -m benchmarks.bench_lexical --articles 30000 --queries 200 --k 10
+'''
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_e2e import synthesize_corpus
+from utils.chunking import chunk_spans
+from utils.lexical_index import LexicalIndex
+from utils.topic_index import TopicIndex
+
+QUERIES = ["operation sindoor india pakistan", "army chief statement on the border", "missile strike airbase",
+           "prime minister modi", "ceasefire talks", "stock market reaction", "drone attack jammu",
+           "what did the foreign ministry say"]
+
+
+def percentile_ms(seconds, q: float) -> float:
+    return float(np.percentile(seconds, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 indexing and hybrid search.")
+    parser.add_argument("--articles", type=int, default=30000)
+    parser.add_argument("--needles", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus = synthesize_corpus(args.articles, seed=7)
+    texts = [article["text"] for article in corpus]
+    by_article = {}
+    for article_id, start, end in chunk_spans(texts):
+        by_article.setdefault(article_id, []).append(texts[article_id][start:end])
+    rng = random.Random(0)
+    needles = {}  # codename -> chunk id
+    chunk_id, batches = 0, []
+    for article_id, chunks in by_article.items():
+        ids = list(range(chunk_id, chunk_id + len(chunks)))
+        chunk_id += len(chunks)
+        if len(needles) < args.needles and rng.random() < 2 * args.needles / len(by_article):
+            codename = f"Operation Kestrel-{len(needles)}"
+            position = rng.randrange(len(chunks))
+            chunks[position] += f" Officials confirmed {codename} was under way."
+            needles[codename] = ids[position]
+        batches.append((ids, chunks))
+    n_chunks = chunk_id
+
+    lexical = LexicalIndex()
+    start = time.perf_counter()
+    for ids, chunks in batches:
+        lexical.add(ids, chunks)
+    indexing = time.perf_counter() - start
+    print(f"{len(by_article)} articles, {n_chunks} chunks: indexed in {indexing:.1f}s "
+          f"({n_chunks / indexing:.0f} chunks/s), {lexical.nbytes() / 2 ** 20:.1f} MB, "
+          f"{len(lexical.vocabulary)} terms")
+
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    for label in ("as ingested", "compacted"):
+        if label == "compacted":
+            lexical.compact()
+        times = []
+        for query in queries:
+            start = time.perf_counter()
+            lexical.search(query, 2 * args.k)
+            times.append(time.perf_counter() - start)
+        print(f"BM25 query ({label}): p50 {percentile_ms(times, 50):.2f} ms, p95 {percentile_ms(times, 95):.2f} ms")
+
+    found = sum(chunk in lexical.search(codename, args.k)[0] for codename, chunk in needles.items())
+    print(f"codename queries with their chunk in the BM25 top {args.k}: {found}/{len(needles)}")
+
+    # Fusion cost inside TopicIndex.search, with random unit vectors standing in for embeddings.
+    topic = TopicIndex("bench lexical", root=tempfile.mkdtemp(prefix="bench-lexical-"))
+    vectors = np.random.default_rng(0).standard_normal((n_chunks, 384), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    for article_id, (ids, chunks) in enumerate(batches):
+        text = " ".join(chunks)
+        spans, offset = [], 0
+        for chunk in chunks:
+            spans.append((offset, offset + len(chunk)))
+            offset += len(chunk) + 1
+        topic.add_article(f"https://news.example/{article_id}", "", text, spans, vectors[ids[0]:ids[-1] + 1])
+    query_vectors = vectors[:len(queries)] + 0.1
+    for label, texts in (("dense", None), ("hybrid", queries)):
+        times = []
+        for i, query in enumerate(queries):
+            start = time.perf_counter()
+            topic.search(query_vectors[i:i + 1], args.k, [query] if texts else None)
+            times.append(time.perf_counter() - start)
+        print(f"TopicIndex.search {label:6s}: p50 {percentile_ms(times, 50):.2f} ms, "
+              f"p95 {percentile_ms(times, 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+'''
+Benchmark of the LLM client in utils.model against benchmarks.fake_llm_server.
+
+Runs `--sessions` generations concurrently on one event loop, first with the
+previous client (a new synchronous Groq client per request, iterated inside
+an async function) and then with get_model_response. Reports wall time,
+time to first token and how many connections the server saw. It also checks
+that failed requests are retried and that a consumer that stops early
+cancels the upstream request.
+
+    python -m benchmarks.bench_llm_client --sessions 8 --tokens 50
+'''
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.fake_llm_server import serve_llm
+
+MESSAGES = [{"role": "user", "content": "Summarize the news."}]
+
+
+async def legacy_model_response(messages, model_id="llama3-70b-8192"):
+    # The client before this change: blocks the loop for the whole stream.
+    from groq import Groq
+    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    for chunk in client.chat.completions.create(model=model_id, messages=messages, stream=True):
+        yield chunk
+
+
+async def session(stream):
+    start = time.perf_counter()
+    ttft = None
+    async for chunk in stream(messages=MESSAGES):
+        if ttft is None and chunk.choices[0].delta.content:
+            ttft = time.perf_counter() - start
+    return ttft
+
+
+async def run_sessions(stream, sessions: int):
+    start = time.perf_counter()
+    ttfts = await asyncio.gather(*(session(stream) for _ in range(sessions)))
+    return time.perf_counter() - start, ttfts
+
+
+async def stop_early(get_model_response, after: int):
+    seen = 0
+    stream = get_model_response(messages=MESSAGES)
+    async for _ in stream:
+        seen += 1
+        if seen >= after:
+            break
+    await stream.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async LLM client.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with serve_llm(tokens=args.tokens, ttft=args.ttft, token_delay=args.token_delay) as server:
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ.setdefault("GROQ_API_KEY", "fake")
+        from utils.model import get_model_response
+
+        print(f"{args.sessions} concurrent sessions, {args.tokens} tokens each, "
+              f"ttft {args.ttft}s, {args.token_delay}s/token")
+        print(f"{'client':<10}{'wall s':>8}{'ttft p50':>10}{'ttft max':>10}{'connections':>13}")
+        for name, stream in [("legacy", legacy_model_response), ("async", get_model_response)]:
+            connections = server.connections
+            wall, ttfts = asyncio.run(run_sessions(stream, args.sessions))
+            print(f"{name:<10}{wall:>8.2f}{statistics.median(ttfts):>10.3f}{max(ttfts):>10.3f}"
+                  f"{server.connections - connections:>13}")
+
+        # A second round on a fresh loop, as Streamlit does per request.
+        connections = server.connections
+        asyncio.run(run_sessions(get_model_response, args.sessions))
+        print(f"new connections on a second round: {server.connections - connections}")
+
+        server.fail_first = server.requests + 2
+        completed = server.completed
+        asyncio.run(run_sessions(get_model_response, 1))
+        print(f"after 2 failed attempts: {server.completed - completed} completed")
+
+        aborted = server.aborted
+        asyncio.run(stop_early(get_model_response, after=3))
+        time.sleep(args.token_delay * 5)
+        print(f"stopped after 3 chunks: upstream aborted {server.aborted - aborted}")
+
+
+if __name__ == "__main__":
+    main()
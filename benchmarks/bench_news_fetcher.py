@@ -0,0 +1,46 @@
+'''
+Offline benchmark for the Google News paginator in utils.news_fetcher.
+
+Runs iter_google_news against FakeGoogleNews with one page in flight at a time
+(the old sequential walk) and with concurrent page fetches, and reports time to
+the first batch of links, total time, pages fetched and unique results.
+
+    python -m benchmarks.bench_news_fetcher --total 150 --latency 0.3
+'''
+import argparse
+import time
+
+from benchmarks.fake_google_news import FakeGoogleNews
+from utils.news_fetcher import iter_google_news
+
+
+def run(args, concurrency: int):
+    backend = FakeGoogleNews(args.total, args.page_size, args.latency, args.duplicate_rate)
+    start = time.perf_counter()
+    first_batch = None
+    unique = 0
+    for batch in iter_google_news("benchmark", limit=args.limit, concurrency=concurrency, backend=backend):
+        if first_batch is None:
+            first_batch = time.perf_counter() - start
+        unique += len(batch)
+    return first_batch or 0.0, time.perf_counter() - start, backend.pages_fetched, unique
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Google News pagination offline.")
+    parser.add_argument("--total", type=int, default=150, help="results the fake search has")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per page")
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'concurrency':<12}{'first s':>9}{'total s':>9}{'pages':>7}{'unique':>8}")
+    for concurrency in (1, args.concurrency):
+        first, total, pages, unique = run(args, concurrency)
+        print(f"{concurrency:<12}{first:>9.2f}{total:>9.2f}{pages:>7}{unique:>8}")
+
+
+if __name__ == "__main__":
+    main()
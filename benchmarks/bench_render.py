@@ -0,0 +1,89 @@
+'''
+Benchmark of streaming answer rendering in the Streamlit chat.
+
+Feeds a synthetic token stream (`--tokens` at `--rate` tokens/s, roughly
+what Groq streams) through two render loops and reports tokens/s, render
+calls and bytes sent to the renderer per answer:
+
+  before  re-render the whole message on every token, then sleep 10 ms
+  after   utils.stream_render.render_stream (frame-rate / byte-threshold flushes)
+
+The renderer stands in for st.empty().markdown: it wraps the text in the
+chat message HTML and serialises it as a Streamlit delta would be, plus a
+fixed per-call cost (`--call-ms`).
+
+    python -m benchmarks.bench_render --tokens 800 --rate 400
+'''
+import argparse
+import asyncio
+import json
+import time
+
+from utils.stream_render import render_stream
+
+
+async def token_stream(tokens: int, rate: float):
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for i in range(tokens):
+        # Paced against the start time so slow consumers don't slow the producer down.
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield f"word{i % 97} "
+
+
+class Renderer:
+    def __init__(self, call_ms: float):
+        self.call_seconds = call_ms / 1000
+        self.calls = 0
+        self.bytes = 0
+
+    def __call__(self, text: str, done: bool = False):
+        html = f'<div class="message bot-message"><div class="message-content">{text}{"" if done else "▊"}</div></div>'
+        delta = json.dumps({"markdown": {"body": html, "allow_html": True}}).encode("utf-8")
+        self.calls += 1
+        self.bytes += len(delta)
+        time.sleep(self.call_seconds)
+
+
+async def before(stream, render):
+    # The loop app.generate_response used before render_stream.
+    current_text = ""
+    async for chunk in stream:
+        current_text += chunk
+        render(current_text)
+        await asyncio.sleep(0.01)
+    render(current_text, True)
+    return current_text
+
+
+async def measure(loop_fn, args):
+    render = Renderer(args.call_ms)
+    start = time.perf_counter()
+    await loop_fn(token_stream(args.tokens, args.rate), render)
+    elapsed = time.perf_counter() - start
+    return elapsed, render
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming answer rendering.")
+    parser.add_argument("--tokens", type=int, default=800)
+    parser.add_argument("--rate", type=float, default=400, help="tokens/s produced by the LLM")
+    parser.add_argument("--call-ms", type=float, default=1.0, help="fixed cost of one render call")
+    parser.add_argument("--fps", type=float, default=15)
+    args = parser.parse_args()
+
+    async def after(stream, render):
+        return await render_stream(stream, render, fps=args.fps)
+
+    print(f"{args.tokens} tokens streamed at {args.rate:.0f}/s, {args.call_ms} ms per render call")
+    print(f"{'loop':<8}{'wall s':>8}{'tokens/s':>10}{'renders':>9}{'rendered KB':>13}")
+    for name, loop_fn in [("before", before), ("after", after)]:
+        elapsed, render = asyncio.run(measure(loop_fn, args))
+        print(f"{name:<8}{elapsed:>8.2f}{args.tokens / elapsed:>10.0f}{render.calls:>9}"
+              f"{render.bytes / 1024:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+'''
+Benchmark of the latency-budgeted cross-encoder reranking in utils.rerank.
+
+Replays a stream of questions, a third of them repeated (follow-ups and
+retries that hit the score cache), each with a shortlist of --candidates
+chunks of synthetic NEWS_data articles, through a Reranker per budget.
+Reports how often reranking ran, was shrunk or skipped, the pairs scored,
+cache hits, mean and p95 cost and how many queries went over budget.
+
+By default the real cross-encoder (utils.model_registry.RERANK_MODEL_ID) is
+used. --fake-ms-per-pair swaps in a stand-in that sleeps that long per pair
+(plus a fixed overhead and jitter) and scores by word overlap, to check the
+budget logic without downloading the model.
+
+    python -m benchmarks.bench_rerank --budgets 25 50 100 200 --candidates 30
+    python -m benchmarks.bench_rerank --fake-ms-per-pair 3
+'''
+import argparse
+import random
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.bench_e2e import synthesize_corpus
+from utils.chunking import chunk_spans
+from utils.extract_document import Hit
+from utils.rerank import Reranker
+
+QUESTIONS = ["What happened in Operation Sindoor?", "How did Pakistan respond to the strikes?",
+             "What did the Indian army say about the border?", "Were civilians affected by the shelling?",
+             "What is the status of the ceasefire?", "How did markets react to the conflict?",
+             "Which airbases were targeted?", "What did world leaders say?"]
+
+
+class FakeCrossEncoder:
+    '''
+    Sleeps overhead_ms + ms_per_pair per pair (±20%) and scores by word overlap.
+    '''
+
+    def __init__(self, ms_per_pair: float, overhead_ms: float = 5.0, seed: int = 0):
+        self.ms_per_pair = ms_per_pair
+        self.overhead_ms = overhead_ms
+        self.rng = random.Random(seed)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, show_progress_bar: bool = False):
+        cost = self.overhead_ms + self.ms_per_pair * len(pairs)
+        time.sleep(cost * self.rng.uniform(0.8, 1.2) / 1000)
+        return [len(set(query.lower().split()) & set(text.lower().split())) for query, text in pairs]
+
+
+def shortlists(n_queries: int, candidates: int, seed: int = 0) -> List[Tuple[str, List[Hit]]]:
+    corpus = synthesize_corpus(400, seed=seed)
+    texts = [article["text"] for article in corpus]
+    chunks = [texts[i][start:end] for i, start, end in chunk_spans(texts)]
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(n_queries):
+        if stream and rng.random() < 1 / 3:
+            stream.append(rng.choice(stream))  # a repeated question sees the same shortlist
+            continue
+        ids = rng.sample(range(len(chunks)), candidates)
+        hits = [Hit(chunk_id, float(rank), None, chunks[chunk_id]) for rank, chunk_id in enumerate(ids)]
+        stream.append((rng.choice(QUESTIONS) + f" ({len(stream)})", hits))
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark budgeted cross-encoder reranking.")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[25, 50, 100, 200])
+    parser.add_argument("--candidates", type=int, default=30)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--fake-ms-per-pair", type=float, default=0.0,
+                        help="use a stand-in model with this cost instead of the real cross-encoder")
+    args = parser.parse_args()
+
+    stream = shortlists(args.queries, args.candidates)
+    model = None
+    if args.fake_ms_per_pair:
+        model = FakeCrossEncoder(args.fake_ms_per_pair)
+    else:
+        from utils.model_registry import get_cross_encoder
+        model = get_cross_encoder()
+        model.predict([("warmup", "warmup")], show_progress_bar=False)
+
+    print(f"{args.queries} queries, {args.candidates} candidates each, top {args.k} kept")
+    print(f"{'budget ms':>9} {'ran':>6} {'shrunk':>6} {'skipped':>7} {'pairs':>6} {'cached':>6} "
+          f"{'mean ms':>8} {'p95 ms':>7} {'over':>5} {'ms/pair':>8}")
+    for budget in args.budgets:
+        reranker = Reranker(model, budget_ms=budget, candidates=args.candidates)
+        costs = []
+        for query, hits in stream:
+            start = time.perf_counter()
+            reranker.rerank(query, hits, args.k)
+            costs.append((time.perf_counter() - start) * 1000)
+        stats = reranker.stats()
+        print(f"{budget:9.0f} {stats['run_rate']:6.0%} {stats['shrunk']:6d} {stats['skipped']:7d} "
+              f"{stats['pairs_scored']:6d} {stats['cache_hits']:6d} {np.mean(costs):8.1f} "
+              f"{np.percentile(costs, 95):7.1f} {sum(cost > budget for cost in costs):5d} {stats['ms_per_pair']:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
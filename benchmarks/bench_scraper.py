@@ -0,0 +1,79 @@
+'''
+Offline throughput benchmark for utils.scraper.download_latest_news.
+
+Downloads the NEWS_data articles from local stand-in servers, once with a single
+worker (the old one-at-a-time behaviour) and once concurrently, and checks both
+runs produce the same description column. Then repeats the concurrent run
+through a fresh ArticleCache (cold, warm and expired-TTL revalidation) and
+counts the requests that reached the servers.
+
+    python -m benchmarks.bench_scraper --articles 100 --hosts 10 --latency 0.2
+'''
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.news_server import load_articles, serve_news
+from utils.article_cache import ArticleCache
+from utils.scraper import download_latest_news
+
+
+def build_data(servers, n_articles: int) -> pd.DataFrame:
+    links = []
+    for i in range(n_articles):
+        server = servers[i % len(servers)]
+        links.append(server.links()[i % len(server.pages)])
+    return pd.DataFrame({"title": [f"Article {i}" for i in range(n_articles)], "link": links})
+
+
+def run(servers, n_articles: int, workers: int, min_delay: float, max_delay: float, cache=None):
+    data = build_data(servers, n_articles)
+    hits_before = sum(s.hits for s in servers)
+    start = time.perf_counter()
+    data = download_latest_news(data, max_workers=workers, min_host_delay=min_delay,
+                                max_host_delay=max_delay, cache=cache)
+    elapsed = time.perf_counter() - start
+    return elapsed, list(data["description"]), sum(s.hits for s in servers) - hits_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the article downloader offline.")
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument("--hosts", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per response")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--min-delay", type=float, default=0.05, help="per-host politeness delay")
+    parser.add_argument("--max-delay", type=float, default=0.15)
+    args = parser.parse_args()
+
+    articles = load_articles()
+    rows = []
+    with serve_news(articles, args.latency, args.hosts) as servers, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        serial = run(servers, args.articles, 1, args.min_delay, args.max_delay)
+        pooled = run(servers, args.articles, args.workers, args.min_delay, args.max_delay)
+        rows += [("serial", serial), ("concurrent", pooled)]
+
+        cache = ArticleCache(os.path.join(cache_dir, "articles.sqlite"))
+        for mode in ("cache cold", "cache warm"):
+            rows.append((mode, run(servers, args.articles, args.workers,
+                                   args.min_delay, args.max_delay, cache)))
+        cache.ttl = 0
+        rows.append(("revalidate", run(servers, args.articles, args.workers,
+                                       args.min_delay, args.max_delay, cache)))
+        cache.close()
+
+    for mode, (_, description, _) in rows:
+        assert description == serial[1], f"{mode} run changed the description column"
+
+    print(f"{'mode':<12}{'seconds':>10}{'articles/s':>12}{'requests':>10}")
+    for mode, (elapsed, _, hits) in rows:
+        print(f"{mode:<12}{elapsed:>10.2f}{args.articles / elapsed:>12.1f}{hits:>10}")
+    print(f"speedup: {serial[0] / pooled[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
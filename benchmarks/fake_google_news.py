@@ -0,0 +1,44 @@
+'''
+Offline stand-in for GoogleNews, usable as the `backend` of
+utils.news_fetcher.iter_google_news / get_google_news.
+
+Serves `total` results in pages of `page_size` with a fixed latency per page.
+Like the real service, some results repeat across pages (syndicated stories
+with the same title) and pages past the last result come back empty.
+'''
+from typing import Dict, List, Optional
+import random
+import threading
+import time
+
+
+class FakeGoogleNews:
+    def __init__(self, total: int = 150, page_size: int = 10, latency: float = 0.3,
+                 duplicate_rate: float = 0.2, links: Optional[List[str]] = None, seed: int = 0):
+        rng = random.Random(seed)
+        self.page_size = page_size
+        self.latency = latency
+        self.results: List[Dict] = []
+        for i in range(total):
+            # A duplicate reuses an earlier title under a different outlet's link.
+            n = rng.randrange(i) if i and rng.random() < duplicate_rate else i
+            link = links[i % len(links)] if links else f"https://news{i % 25}.example.com/story/{i}"
+            self.results.append({
+                'title': f"Story {n}", 'media': f"Outlet {i % 25}", 'date': "1 day ago",
+                'datetime': None, 'desc': f"Summary of story {n}", 'link': link, 'img': "",
+            })
+        self.pages_fetched = 0
+        self._lock = threading.Lock()
+
+    def _page(self, page: int) -> List[Dict]:
+        time.sleep(self.latency)
+        with self._lock:
+            self.pages_fetched += 1
+        start = page * self.page_size
+        return [dict(r) for r in self.results[start:start + self.page_size]]
+
+    def search(self, user_request: str) -> List[Dict]:
+        return self._page(0)
+
+    def page(self, page: int) -> List[Dict]:
+        return self._page(page)
@@ -0,0 +1,152 @@
+'''
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+
+Answers POST /openai/v1/chat/completions with a server-sent event stream of
+chat.completion.chunk objects (or one chat.completion when "stream" is
+false), over keep-alive HTTP/1.1. Time to first token, the delay between
+tokens and the answer length are configurable, and the first `fail_first`
+requests can be answered with an error status to exercise retries. Point
+the client at it with GROQ_BASE_URL=<server.base_url> and any GROQ_API_KEY.
+'''
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+import json
+import threading
+import time
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+class _CompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send_json(self, status: int, payload: dict, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != COMPLETIONS_PATH:
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+
+        with server.lock:
+            server.requests += 1
+            failing = server.requests <= server.fail_first
+        if failing:
+            self._send_json(server.fail_status,
+                            {"error": {"message": "try again later", "type": "server_error"}},
+                            headers=[("Retry-After", "0")])
+            return
+
+        model = request.get("model", "fake")
+        tokens = [f"token{i} " for i in range(server.tokens)]
+        created = int(time.time())
+        time.sleep(server.ttft)
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens + [None]):
+                if i:
+                    time.sleep(server.token_delay)
+                delta = {"role": "assistant", "content": token} if token is not None else {}
+                chunk = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta,
+                                 "finish_reason": None if token is not None else "stop"}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+            with server.lock:
+                server.completed += 1
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (cancelled generation).
+            with server.lock:
+                server.aborted += 1
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, tokens: int = 50, ttft: float = 0.2, token_delay: float = 0.02,
+                 fail_first: int = 0, fail_status: int = 503, port: int = 0):
+        super().__init__(("127.0.0.1", port), _CompletionsHandler)
+        self.tokens = tokens
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = 0
+        self.completed = 0
+        self.aborted = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@contextmanager
+def serve_llm(**options) -> Iterator[FakeLLMServer]:
+    '''
+    Runs a FakeLLMServer in a background thread for the duration of the block.
+    '''
+    server = FakeLLMServer(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.tokens, args.ttft, args.token_delay, args.fail_first, port=args.port)
+    print(f"Serving chat completions at {server.base_url}{COMPLETIONS_PATH}")
+    print(f"Use GROQ_BASE_URL={server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,134 @@
+'''
+Local HTTP stand-in for the news sites the scraper downloads from.
+
+Serves the articles in NEWS_data/ as HTML pages (one <p> per paragraph,
+wrapped in some navigation/footer markup) over keep-alive HTTP/1.1, with an
+optional artificial latency per response and ETag revalidation (304 Not
+Modified). Every server is a separate host as far as the scraper's per-host
+throttle is concerned, so several servers can be started to mimic a Google
+News result list spread over many sites.
+'''
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+from typing import Iterator, List
+import hashlib
+import os
+import threading
+import time
+
+NEWS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "NEWS_data")
+
+
+def load_articles(folder_name: str = NEWS_DIR) -> List[str]:
+    files = sorted(
+        (f for f in os.listdir(folder_name) if f.endswith(".txt")),
+        key=lambda f: int(f.rsplit("_", 1)[-1].split(".")[0]),
+    )
+    articles = []
+    for filename in files:
+        with open(os.path.join(folder_name, filename), "r", encoding="utf-8") as file:
+            articles.append(file.read())
+    return articles
+
+
+def render_article(text: str, title: str = "News") -> str:
+    '''
+    Wraps article text in a page whose <p> elements join back to exactly text.
+    '''
+    body = f"<p>{escape(text)}</p>" if text else ""
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{escape(title)}</title></head><body>"
+        "<header><nav><a href='/'>Home</a> <a href='/world'>World</a></nav></header>"
+        f"<main><article><h1>{escape(title)}</h1>{body}</article></main>"
+        "<footer><span>Local news stand-in</span></footer>"
+        "</body></html>"
+    )
+
+
+class _NewsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        parts = self.path.strip("/").split("/")
+        etag = None
+        if len(parts) == 2 and parts[0] == "article" and parts[1].isdigit() \
+                and int(parts[1]) < len(server.pages):
+            status, payload = 200, server.pages[int(parts[1])]
+            etag = server.etags[int(parts[1])]
+            if self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+        else:
+            status, payload = 404, b"not found"
+
+        with server.lock:
+            server.hits += 1
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalNewsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, articles: List[str], latency: float = 0.0, port: int = 0, html: bool = False):
+        super().__init__(("127.0.0.1", port), _NewsHandler)
+        # With html, articles are complete (e.g. recorded) pages served as they are.
+        self.pages = [
+            (text if html else render_article(text, f"Article {i}")).encode("utf-8")
+            for i, text in enumerate(articles)
+        ]
+        self.etags = [f'"{hashlib.sha1(page).hexdigest()}"' for page in self.pages]
+        self.latency = latency
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def links(self) -> List[str]:
+        return [f"{self.base_url}/article/{i}" for i in range(len(self.pages))]
+
+
+@contextmanager
+def serve_news(articles: List[str], latency: float = 0.0, hosts: int = 1,
+               html: bool = False) -> Iterator[List[LocalNewsServer]]:
+    '''
+    Starts `hosts` local news servers in background threads for the duration of the block.
+    '''
+    servers = [LocalNewsServer(articles, latency, html=html) for _ in range(hosts)]
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+    for thread in threads:
+        thread.start()
+    try:
+        yield servers
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = LocalNewsServer(load_articles(), args.latency, args.port)
+    print(f"Serving {len(server.pages)} articles at {server.base_url}/article/<n>")
+    server.serve_forever()
@@ -1,15 +1,21 @@
+import asyncio
 import logging
-from typing import AsyncGenerator
-
-from utils.news_fetcher import get_google_news
-from utils.scraper import download_latest_news
-from utils.save_news import save_news
-from utils.chunking import chunk_doc
-from utils.embedding import embed_documents
-from utils.encode_query import encode_query
-from utils.extract_document import extract_documents
+import time
+from concurrent.futures import Future
+from typing import AsyncGenerator, List, Optional
+
+from utils.answer_cache import AnswerCache, get_answer_cache
+from utils.model_registry import get_embedding_model
+from utils.topic_manager import TopicHandle, TopicManager, get_topic_manager
+from utils.encode_query import encode_queries, encode_query
+from utils.extract_document import Hit, search_batch
+from utils.context_packer import estimate_tokens, pack_context
+from utils.lexical_index import HYBRID_SEARCH
+from utils.rerank import RERANK_ENABLED, Reranker, get_reranker
 from utils.setup_prompt import get_prompt
 from utils.model import get_model_response
+from utils.metrics import observe, span
+from utils.profiler import profile_if_slow
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,10 +25,162 @@ logger = logging.getLogger(__name__)
 
 
 class NewsPipeline:
-    def __init__(self):
+    def __init__(self, refresh_interval: float = 15 * 60, ready_after: int = 10, deadline: float = 10.0,
+                 context_tokens: int = 2000, candidates: int = 10,
+                 answer_cache: Optional[AnswerCache] = None, topics: Optional[TopicManager] = None,
+                 embed_model=None, hybrid: bool = HYBRID_SEARCH, reranker: Optional[Reranker] = None):
+        """
+        refresh_interval: seconds during which a topic's stored index is used
+            without listing Google News again (and expiring old articles);
+            follow-ups refresh a topic that has become stale, too.
+        ready_after, deadline: retrieval and streaming start once this many
+            articles are indexed or this many seconds have passed; the rest
+            keep indexing in the background.
+        context_tokens: budget for the retrieved context in each prompt, filled
+            from the `candidates` closest chunks.
+        answer_cache: where answers are replayed from for near-identical
+            questions on an unchanged topic; defaults to the process-wide cache.
+        topics: where topic indexes are shared between sessions; defaults to
+            the process-wide manager.
+        embed_model: query/chunk encoder; defaults to the shared all-MiniLM-L6-v2.
+            Embeddings are cached, and topics indexed, per model (see
+            model_registry.model_id_of), so give a custom encoder a model_id.
+        hybrid: fuse BM25 matches of the query text with the dense results, so
+            exact names and codenames the embedding misses are still retrieved.
+        reranker: re-orders an over-fetched shortlist with a cross-encoder
+            before the prompt is built; defaults to the shared one with
+            NEWS_RERANK=1, and to none otherwise.
+        """
         self.index = None
-        self.embed_model = None
-        self.chunks = []
+        self.embed_model = embed_model
+        self.chunks = {}
+        self.refresh_interval = refresh_interval
+        self.ready_after = ready_after
+        self.deadline = deadline
+        self.ingestion: Optional[Future] = None
+        self.context_tokens = context_tokens
+        self.candidates = candidates
+        self.answer_cache = answer_cache or get_answer_cache()
+        self.topic: Optional[str] = None
+        self.user_request: Optional[str] = None  # the request the topic was opened with
+        self.topics = topics or get_topic_manager()
+        self.hybrid = hybrid
+        self.reranker = reranker or (get_reranker() if RERANK_ENABLED else None)
+
+    async def open_topic(self, user_request: str) -> TopicHandle:
+        """
+        Gets the topic's shared index and, unless it was refreshed within
+        refresh_interval seconds, has new articles indexed in the background
+        (or joins the refresh another session already started).
+        Returns as soon as the index is good enough to answer from.
+        """
+        opened = await self.topics.open(user_request, self.embed_model, self.refresh_interval,
+                                        self.ready_after, self.deadline)
+        if opened.progress is None:
+            return opened.handle
+
+        self.ingestion = opened.ingestion
+        ready = asyncio.wrap_future(opened.progress.ready)
+        await asyncio.wait({ready})
+        if ready.cancelled() or ready.exception() is not None:
+            # Ingestion stopped before it was ready; what was indexed so far may do.
+            if not opened.handle.ntotal:
+                if ready.cancelled():
+                    raise RuntimeError(f"Ingestion of '{user_request}' was cancelled")
+                raise ready.exception()
+            logger.warning("Ingestion of '%s' failed, answering from the %d chunks indexed",
+                           user_request, opened.handle.ntotal)
+        return opened.handle
+
+    def retrieve(self, queries: List[str], k: int = 3, dedupe: bool = True) -> List[List[Hit]]:
+        """
+        Retrieves the top-k chunks for several queries at once (e.g. query
+        expansion or parallel follow-ups) with one encode and one index search.
+        """
+        if self.index is None or self.embed_model is None or not self.chunks:
+            raise RuntimeError(
+                "Pipeline has not been initialized. "
+                "Please call run_pipeline(...) before retrieve(...)."
+            )
+        depth = max(k, self.reranker.candidates) if self.reranker else k
+        with span("retrieve") as stage:
+            query_embeds = encode_queries(queries, self.embed_model)
+            hits = search_batch(self.index, query_embeds, self.chunks, depth,
+                                sources=getattr(self.index, "chunk_sources", None), dedupe=dedupe,
+                                queries=queries if self.hybrid else None)
+            stage.add(items=sum(map(len, hits)))
+        if self.reranker:
+            return [self.reranker.rerank(query, query_hits, k) for query, query_hits in zip(queries, hits)]
+        return hits
+
+    def build_context(self, query_embed, query: Optional[str] = None) -> str:
+        """
+        Packs the closest chunks to the query into context_tokens tokens of
+        labelled, de-duplicated context. query is the text of query_embed,
+        used for hybrid search and reranking.
+        """
+        rerank = self.reranker is not None and query is not None
+        depth = max(self.candidates, self.reranker.candidates) if rerank else self.candidates
+        with span("retrieve") as stage:
+            hits = search_batch(self.index, query_embed[:1], self.chunks, depth,
+                                sources=getattr(self.index, "chunk_sources", None), dedupe=False,
+                                queries=[query] if self.hybrid and query else None)[0]
+            if rerank:
+                hits = self.reranker.rerank(query, hits, self.candidates)
+            articles = getattr(self.index, "articles", {})
+            titles = {hit.source: articles[hit.source].title for hit in hits if hit.source in articles}
+            packed = pack_context(hits, token_budget=self.context_tokens, titles=titles)
+            stage.add(items=len(hits), bytes=len(packed.text), skipped=packed.dropped_duplicates)
+        logger.info("Packed %d of %d chunks into %d pieces, ~%d tokens (%d near-duplicates dropped)",
+                    sum(len(piece.chunk_ids) for piece in packed.pieces), len(hits),
+                    len(packed.pieces), packed.tokens, packed.dropped_duplicates)
+        return packed.text
+
+    def prepare_messages(self, query_embed, task: str, query: Optional[str] = None):
+        context = self.build_context(query_embed, query)
+        with span("prompt") as stage:
+            messages = get_prompt(context=context, task=task)
+            stage.add(items=len(messages), bytes=sum(len(m["content"]) for m in messages))
+        logger.info("Prompt is ~%d tokens", sum(estimate_tokens(m["content"]) for m in messages))
+        return messages
+
+    async def stream_answer(self, query_embed, task: str, query: Optional[str] = None) -> AsyncGenerator[str, None]:
+        """
+        Streams the answer to the query, replaying a cached one when the same
+        (or a near-identical) question was answered on this version of the index.
+        """
+        version = getattr(self.index, "version", None)
+        cacheable = self.topic is not None and version is not None
+        if cacheable:
+            cached = self.answer_cache.lookup(self.topic, version, task, query_embed[0])
+            if cached is not None:
+                logger.info("Replaying cached answer (hit rate %.0f%%)",
+                            100 * self.answer_cache.stats()["hit_rate"])
+                with span("generate") as stage:
+                    stage.add(items=len(cached), bytes=sum(map(len, cached)), cache_hits=1)
+                for content in cached:
+                    yield content
+                return
+
+        logger.info("Extracting relevant documents and preparing prompt messages...")
+        messages = self.prepare_messages(query_embed, task, query)
+
+        logger.info("Streaming model response...")
+        pieces = []
+        with span("generate", topic=self.topic or "") as stage:
+            start = time.perf_counter()
+            async for chunk in get_model_response(messages=messages):
+                content = chunk.choices[0].delta.content
+                if content:
+                    if not pieces:
+                        observe("news_generate_ttft_seconds", "generate", time.perf_counter() - start,
+                                help="Time from sending the prompt to the first answer token")
+                    pieces.append(content)
+                    stage.add(items=1, bytes=len(content))
+                    yield content
+        # Only complete answers are cached; a cancelled stream never gets here.
+        if cacheable:
+            self.answer_cache.store(self.topic, version, task, query_embed[0], pieces)
 
     async def run_pipeline(
         self, user_request: str, task: str = "Summarize this context"
@@ -36,33 +194,16 @@ class NewsPipeline:
         """
         logger.info("Starting training pipeline for user request: '%s'", user_request)
 
-        logger.info("Fetching news data...")
-        data = get_google_news(user_request)
-
-        logger.info("Downloading full news content...")
-        data = download_latest_news(data)
-
-        logger.info("Chunking document...")
-        self.chunks = chunk_doc(data)
-
-        logger.info("Embedding documents...")
-        self.index, self.embed_model = embed_documents(self.chunks)
+        with profile_if_slow(f"run_pipeline {user_request}"):
+            self.embed_model = self.embed_model or get_embedding_model()
+            topic_index = await self.open_topic(user_request)
+            self.index, self.chunks = topic_index, topic_index.chunks
+            self.topic, self.user_request = topic_index.key, user_request
 
-        logger.info("Encoding user query...")
-        query_embed = encode_query(query=user_request, embedding_model=self.embed_model)
+            logger.info("Encoding user query...")
+            query_embed = encode_query(query=user_request, embedding_model=self.embed_model)
 
-        logger.info("Extracting relevant documents...")
-        extracted_docs = extract_documents(
-            index=self.index, query_embedding=query_embed, all_chunks=self.chunks
-        )
-
-        logger.info("Preparing prompt messages...")
-        messages = get_prompt(context=extracted_docs, task=task)
-
-        logger.info("Streaming model response...")
-        async for chunk in get_model_response(messages=messages):
-            content = chunk.choices[0].delta.content
-            if content:
+            async for content in self.stream_answer(query_embed, task, user_request):
                 yield content
 
     async def run_follow_up(
@@ -79,18 +220,13 @@ class NewsPipeline:
             )
 
         logger.info("Encoding user query for follow-up: '%s'", user_request)
-        query_embed = encode_query(query=user_request, embedding_model=self.embed_model)
-
-        logger.info("Extracting relevant documents (follow-up)...")
-        extracted_docs = extract_documents(
-            index=self.index, query_embedding=query_embed, all_chunks=self.chunks
-        )
-
-        logger.info("Preparing prompt messages (follow-up)...")
-        messages = get_prompt(context=extracted_docs, task=task)
-
-        logger.info("Streaming model response (follow-up)...")
-        async for chunk in get_model_response(messages=messages):
-            content = chunk.choices[0].delta.content
-            if content:
+        with profile_if_slow(f"run_follow_up {user_request}"):
+            if isinstance(self.index, TopicHandle) and self.index.is_stale(self.refresh_interval):
+                # A long session would otherwise answer from its first snapshot of the
+                # news forever: refresh the topic (and expire old articles) as reopening it would.
+                topic_index = await self.open_topic(self.user_request)
+                self.index, self.chunks = topic_index, topic_index.chunks
+            query_embed = encode_query(query=user_request, embedding_model=self.embed_model)
+
+            async for content in self.stream_answer(query_embed, task, user_request):
                 yield content
@@ -1,8 +1,11 @@
 import asyncio
 from inference_pipeline import NewsPipeline
+from utils.model_registry import warmup
 
 
 async def main():
+    stats = warmup()
+    print(f"Embedding model loaded in {stats['load_seconds']:.2f}s, process RSS {stats['process_rss_mb']:.0f} MB")
     news_pipeline = NewsPipeline()
     print(f"Operation Sindoor.")
     async for output in news_pipeline.run_pipeline(user_request="Operation Sindoor"):
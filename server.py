@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from inference_pipeline import NewsPipeline
+from utils.answer_cache import get_answer_cache
+from utils.metrics import render_prometheus
+from utils.model_registry import is_loaded, model_stats, warmup
+from utils.rerank import RERANK_ENABLED, get_reranker
+from utils.topic_manager import get_topic_manager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SUMMARY_TASK = "Provide a comprehensive summary of the latest news"
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionController:
+    """
+    Caps the number of pipelines running at once. Up to max_queue more
+    requests wait for a slot (at most queue_timeout seconds); beyond that
+    requests are rejected straight away so the caller can retry elsewhere.
+    """
+
+    def __init__(self, max_active: int = 8, max_queue: int = 16, queue_timeout: float = 30.0):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_active)
+
+    async def __aenter__(self):
+        # Counted before the first await, so every request of a burst sees the ones before it.
+        if self.active + self.waiting >= self.max_active + self.max_queue:
+            self.rejected += 1
+            raise Overloaded("too many requests in flight")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded("timed out waiting for a free pipeline")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting, "max_active": self.max_active,
+                "max_queue": self.max_queue, "admitted": self.admitted, "rejected": self.rejected}
+
+
+class Session:
+    def __init__(self, topic: str):
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.pipeline = NewsPipeline()
+        self.lock = asyncio.Lock()  # one generation per session at a time
+        self.last_used = time.monotonic()
+
+
+class NewsServer:
+    """
+    Server-Sent-Events API over NewsPipeline.
+
+    POST /v1/sessions                      {"topic": ..., "task"?: ...}
+        starts a session on a topic and streams its summary
+    POST /v1/sessions/{session_id}/ask     {"question": ..., "task"?: ...}
+        streams the answer to a follow-up question
+    GET  /healthz                          the process is up
+    GET  /readyz                           200 once the embedding model is warm
+    GET  /metrics                          per-stage metrics in Prometheus text format
+
+    Streams send an `event: session` with the ids, one `data: {"text": ...}`
+    per chunk and a final `event: done` (or `event: error`).
+    """
+
+    def __init__(self, max_active: int = 8, max_queue: int = 16, queue_timeout: float = 30.0,
+                 session_ttl: float = 30 * 60, max_sessions: int = 1000):
+        self.admission = AdmissionController(max_active, max_queue, queue_timeout)
+        self.sessions: Dict[str, Session] = {}
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.warm = False
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/v1/sessions", self.start_session),
+            web.post("/v1/sessions/{session_id}/ask", self.ask),
+            web.get("/healthz", self.healthz),
+            web.get("/readyz", self.readyz),
+            web.get("/metrics", self.metrics),
+        ])
+        app.on_startup.append(self._warmup)
+        return app
+
+    async def _warmup(self, app: web.Application) -> None:
+        async def load():
+            await asyncio.get_running_loop().run_in_executor(None, warmup)
+            self.warm = True
+        # Serve /healthz right away; /readyz turns 200 once the models are loaded.
+        app["warmup"] = asyncio.ensure_future(load())
+
+    def _expire_sessions(self) -> None:
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if now - session.last_used > self.session_ttl and not session.lock.locked():
+                del self.sessions[session_id]
+
+    @staticmethod
+    async def _json_body(request: web.Request) -> dict:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="request body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="request body must be a JSON object")
+        return body
+
+    async def _stream(self, request: web.Request, session: Session, generate) -> web.StreamResponse:
+        try:
+            async with self.admission:
+                async with session.lock:
+                    session.last_used = time.monotonic()
+                    response = web.StreamResponse(headers={
+                        "Content-Type": "text/event-stream",
+                        "Cache-Control": "no-cache",
+                        "X-Accel-Buffering": "no",
+                    })
+                    await response.prepare(request)
+                    await self._send(response, {"session_id": session.id, "topic": session.topic},
+                                     event="session")
+                    stream = generate()
+                    chars = 0
+                    start = time.perf_counter()
+                    try:
+                        async for chunk in stream:
+                            chars += len(chunk)
+                            await self._send(response, {"text": chunk})
+                    except (ConnectionResetError, asyncio.CancelledError):
+                        logger.info("Client of session %s went away, generation cancelled", session.id)
+                        raise
+                    except Exception as e:
+                        logger.error("Generation failed for session %s: %s", session.id, e)
+                        await self._send(response, {"message": str(e)}, event="error")
+                        return response
+                    finally:
+                        await stream.aclose()
+                        session.last_used = time.monotonic()
+                    await self._send(response, {"chars": chars, "seconds": time.perf_counter() - start},
+                                     event="done")
+                    await response.write_eof()
+                    return response
+        except Overloaded as e:
+            raise web.HTTPTooManyRequests(
+                text=json.dumps({"error": str(e), **self.admission.stats()}),
+                content_type="application/json", headers={"Retry-After": "1"})
+
+    @staticmethod
+    async def _send(response: web.StreamResponse, payload: dict, event: Optional[str] = None) -> None:
+        message = f"event: {event}\n" if event else ""
+        message += f"data: {json.dumps(payload)}\n\n"
+        await response.write(message.encode("utf-8"))
+
+    async def start_session(self, request: web.Request) -> web.StreamResponse:
+        body = await self._json_body(request)
+        topic = str(body.get("topic", "")).strip()
+        if not topic:
+            raise web.HTTPBadRequest(text="'topic' is required")
+        self._expire_sessions()
+        if len(self.sessions) >= self.max_sessions:
+            raise web.HTTPTooManyRequests(text="too many open sessions", headers={"Retry-After": "5"})
+
+        session = Session(topic)
+        self.sessions[session.id] = session
+        task = body.get("task") or SUMMARY_TASK
+        try:
+            return await self._stream(request, session, lambda: session.pipeline.run_pipeline(topic, task))
+        except web.HTTPTooManyRequests:
+            del self.sessions[session.id]
+            raise
+
+    async def ask(self, request: web.Request) -> web.StreamResponse:
+        session = self.sessions.get(request.match_info["session_id"])
+        if session is None:
+            raise web.HTTPNotFound(text="unknown or expired session")
+        body = await self._json_body(request)
+        question = str(body.get("question", "")).strip()
+        if not question:
+            raise web.HTTPBadRequest(text="'question' is required")
+        if session.pipeline.index is None:
+            raise web.HTTPConflict(text="the session's summary has not been generated yet")
+
+        task = body.get("task") or f"Answer this question based on the news about {session.topic}"
+        return await self._stream(request, session,
+                                  lambda: session.pipeline.run_follow_up(question, task))
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def readyz(self, request: web.Request) -> web.Response:
+        ready = self.warm and is_loaded()
+        return web.json_response({
+            "ready": ready,
+            "model": model_stats(),
+            "topics": get_topic_manager().stats(),
+            "answer_cache": get_answer_cache().stats(),
+            "rerank": get_reranker().stats() if RERANK_ENABLED else None,
+            "admission": self.admission.stats(),
+            "sessions": len(self.sessions),
+        }, status=200 if ready else 503)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=render_prometheus().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming HTTP API for the news pipeline.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-active", type=int, default=8, help="pipelines generating at once")
+    parser.add_argument("--max-queue", type=int, default=16, help="requests waiting for a pipeline")
+    parser.add_argument("--queue-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    server = NewsServer(args.max_active, args.max_queue, args.queue_timeout)
+    web.run_app(server.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import itertools
+import threading
+import time
+
+import numpy as np
+
+# Thresholds hit_rate_at is reported for, to help pick `threshold`.
+TUNING_THRESHOLDS = (0.85, 0.9, 0.92, 0.95, 0.98)
+
+
+class CachedAnswer(NamedTuple):
+    topic: str
+    version: int
+    task: str
+    embedding: np.ndarray  # unit-length query embedding
+    pieces: List[str]      # the answer as it was streamed
+    created_at: float
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    '''
+    In-memory cache of streamed answers, keyed by topic, topic index version,
+    task and query embedding.
+
+    lookup() returns the answer of the most similar earlier question (cosine
+    similarity >= threshold) asked against the same version of the topic's
+    index, so rephrased follow-ups are replayed without an LLM call. Entries
+    for older versions are dropped as soon as the topic is looked up again;
+    entries expire after ttl seconds and the least recently used are evicted
+    beyond max_entries.
+    '''
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, ttl: float = 3600,
+                 history: int = 1000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._by_topic: Dict[str, List[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        # Best similarity of every lookup, hit or miss.
+        self._similarities: deque = deque(maxlen=history)
+        self._counters = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0,
+                          "invalidated": 0, "expired": 0, "evicted": 0}
+
+    def _drop(self, entry_id: int, counter: str) -> None:
+        entry = self._entries.pop(entry_id)
+        self._by_topic[entry.topic].remove(entry_id)
+        if not self._by_topic[entry.topic]:
+            del self._by_topic[entry.topic]
+        self._counters[counter] += 1
+
+    def _prune_topic(self, topic: str, version: int) -> None:
+        now = time.time()
+        for entry_id in list(self._by_topic.get(topic, ())):
+            entry = self._entries[entry_id]
+            if entry.version != version:
+                self._drop(entry_id, "invalidated")
+            elif now - entry.created_at > self.ttl:
+                self._drop(entry_id, "expired")
+
+    def lookup(self, topic: str, version: int, task: str, embedding: np.ndarray) -> Optional[List[str]]:
+        query = _unit(embedding)
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._prune_topic(topic, version)
+            candidates = [entry_id for entry_id in self._by_topic.get(topic, ())
+                          if self._entries[entry_id].task == task]
+            best_id, best_sim = None, 0.0
+            if candidates:
+                sims = np.stack([self._entries[entry_id].embedding for entry_id in candidates]) @ query
+                best = int(np.argmax(sims))
+                best_id, best_sim = candidates[best], float(sims[best])
+            self._similarities.append(best_sim)
+
+            if best_id is None or best_sim < self.threshold:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._entries.move_to_end(best_id)
+            return list(self._entries[best_id].pieces)
+
+    def store(self, topic: str, version: int, task: str, embedding: np.ndarray,
+              pieces: Sequence[str]) -> None:
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = CachedAnswer(topic, version, task, _unit(embedding),
+                                                   list(pieces), time.time())
+            self._by_topic.setdefault(topic, []).append(entry_id)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "evicted")
+
+    def invalidate(self, topic: Optional[str] = None) -> None:
+        '''
+        Drops the answers of topic, or of every topic.
+        '''
+        with self._lock:
+            topics = [topic] if topic is not None else list(self._by_topic)
+            for name in topics:
+                for entry_id in list(self._by_topic.get(name, ())):
+                    self._drop(entry_id, "invalidated")
+
+    def stats(self) -> dict:
+        '''
+        Counters, hit rate, and the hit rate each of TUNING_THRESHOLDS would
+        have had over the recent lookups.
+        '''
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["threshold"] = self.threshold
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+            sims = np.array(self._similarities)
+        stats["hit_rate_at"] = {
+            threshold: float(np.mean(sims >= threshold)) if len(sims) else 0.0
+            for threshold in TUNING_THRESHOLDS
+        }
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_cache: Optional[AnswerCache] = None
+_default_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    '''
+    Process-wide answer cache shared by every NewsPipeline.
+    '''
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
@@ -0,0 +1,153 @@
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("NEWS_CACHE_DIR", ".cache")
+
+# Query parameters that only track the click and never change the article.
+_TRACKING_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "ref", "ved", "usg", "smid"}
+
+
+def normalize_url(url: str) -> str:
+    '''
+    Canonical form of an article URL used as cache key: lower-case scheme and
+    host, no default port, no fragment, no tracking parameters, sorted query.
+    '''
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class CachedArticle(NamedTuple):
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    extractor: Optional[str]  # name of the Extractor that produced text, None in old entries
+
+
+class ArticleCache:
+    '''
+    On-disk cache of extracted article text keyed by normalized URL.
+
+    Entries younger than ttl seconds are served without touching the network;
+    older ones keep their ETag/Last-Modified validators so the scraper can
+    revalidate them with a conditional request. Each entry records the
+    extractor that produced its text. The stored text is kept under
+    max_bytes by evicting the least recently used articles.
+    '''
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600.0,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.path = path or os.path.join(CACHE_DIR, "articles.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " url TEXT PRIMARY KEY, text TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+            " fetched_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL, extractor TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        if "extractor" not in columns:  # written before the extractor was recorded
+            self._conn.execute("ALTER TABLE articles ADD COLUMN extractor TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_lru ON articles (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedArticle]:
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, fetched_at, extractor FROM articles WHERE url = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE articles SET last_access = ? WHERE url = ?", (time.time(), key))
+            self._conn.commit()
+        return CachedArticle(*row)
+
+    def is_fresh(self, article: CachedArticle) -> bool:
+        return time.time() - article.fetched_at < self.ttl
+
+    def put(self, url: str, text: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, extractor: Optional[str] = None) -> None:
+        key = normalize_url(url)
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM articles WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles"
+                " (url, text, etag, last_modified, fetched_at, last_access, size, extractor)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, text, etag, last_modified, now, now, size, extractor))
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        '''
+        Marks an entry as fresh again after a 304 Not Modified revalidation.
+        '''
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, normalize_url(url)))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        rows = self._conn.execute(
+            "SELECT url, size FROM articles ORDER BY last_access").fetchall()
+        evicted = []
+        for url, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM articles WHERE url = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[ArticleCache] = None
+_default_lock = threading.Lock()
+
+
+def get_article_cache() -> ArticleCache:
+    '''
+    Process-wide article cache shared by every NewsPipeline.
+    '''
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ArticleCache()
+        return _default_cache
@@ -0,0 +1,29 @@
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+import asyncio
+import threading
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    '''
+    Process-wide event loop running in a daemon thread, for work that has to
+    outlive the caller's loop (Streamlit wraps every request in asyncio.run,
+    which cancels whatever is still pending when the answer is done).
+    '''
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="news-background", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    '''
+    Schedules coro on the background loop; the returned future can be awaited
+    from any loop with asyncio.wrap_future.
+    '''
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
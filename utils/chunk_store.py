@@ -0,0 +1,452 @@
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"NEWSCHK1"
+_ALIGN = 64
+_HEADER = struct.Struct("<8sQ")  # magic, length of the JSON column directory
+
+
+class _Column:
+    '''
+    Growable 1-d numpy array. Loaded columns start as read-only views of the
+    mapped file and are copied into memory on the first append.
+    '''
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, data: Optional[np.ndarray] = None):
+        self.data = data if data is not None else np.empty(16, dtype=dtype)
+        self.size = len(data) if data is not None else 0
+
+    def append(self, values) -> None:
+        values = np.asarray(values, dtype=self.data.dtype)
+        end = self.size + len(values)
+        if end > len(self.data) or not self.data.flags.writeable:
+            grown = np.empty(max(end, 2 * len(self.data), 16), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def writable(self) -> np.ndarray:
+        if not self.data.flags.writeable:
+            self.data = self.data[:self.size].copy()
+        return self.data
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class ArticleMeta:
+    '''
+    Citation data of one stored article, built on demand from the article columns.
+    '''
+    __slots__ = ("link", "title", "date", "first_seen", "published", "chunk_ids")
+
+    def __init__(self, link: str, title: str, date: str, first_seen: float, chunk_ids: range,
+                 published: Optional[float] = None):
+        self.link = link
+        self.title = title
+        self.date = date
+        self.first_seen = first_seen
+        self.published = first_seen if published is None else published  # publication time, when known
+        self.chunk_ids = chunk_ids
+
+    def __repr__(self) -> str:
+        return f"ArticleMeta({self.link!r}, {self.title!r}, {self.date!r}, chunks={len(self.chunk_ids)})"
+
+
+def _utf8_offsets(text: str, encoded: bytes, offsets: Sequence[int]) -> List[int]:
+    if len(encoded) == len(text):  # ASCII: character and byte offsets agree
+        return list(offsets)
+    return [len(text[:offset].encode("utf-8")) for offset in offsets]
+
+
+class _Columns:
+    '''
+    Everything a ChunkStore holds. save() maps a new file into a new instance
+    and swaps it in with one assignment, so a reader that took the store's
+    columns once never mixes the compacted text with the old offsets.
+    '''
+    __slots__ = ("text", "chunk_ids", "chunk_starts", "chunk_ends", "chunk_articles", "strings",
+                 "string_offsets", "article_text", "article_chunks", "article_first_seen", "article_published",
+                 "vectors", "dim", "rows", "live_chunks", "mapped")
+
+    def __init__(self):
+        self.text = _Column(np.uint8)              # article texts, UTF-8
+        self.chunk_ids = _Column(np.int64)
+        self.chunk_starts = _Column(np.int64)      # byte offsets into text
+        self.chunk_ends = _Column(np.int64)
+        self.chunk_articles = _Column(np.int32)    # article row, -1 once removed
+        self.strings = _Column(np.uint8)           # link, title and date of every article, UTF-8
+        self.string_offsets = _Column(np.int64, np.zeros(1, dtype=np.int64))
+        self.article_text = _Column(np.int64)      # start, end in text per article (flattened)
+        self.article_chunks = _Column(np.int64)    # first chunk id, chunk count per article (flattened)
+        self.article_first_seen = _Column(np.float64)
+        self.article_published = _Column(np.float64)  # publication time, first_seen where unknown
+        self.vectors = _Column(np.float32)         # optional exact vector per chunk row (flattened)
+        self.dim = 0                               # vector dimension, 0 without vectors
+        self.rows: Dict[str, int] = {}             # link -> article row of live articles
+        self.live_chunks = 0
+        self.mapped: Optional[mmap.mmap] = None
+
+    def chunk_row(self, chunk_id: int) -> int:
+        ids, size = self.chunk_ids.data, self.chunk_ids.size
+        if not size:
+            raise KeyError(chunk_id)
+        # Ids are dense unless articles were removed, so try the direct offset first.
+        row = chunk_id - int(ids[0])
+        if not (0 <= row < size and ids[row] == chunk_id):
+            row = int(np.searchsorted(ids[:size], chunk_id))
+            if row == size or ids[row] != chunk_id:
+                raise KeyError(chunk_id)
+        if self.chunk_articles.data[row] < 0:
+            raise KeyError(chunk_id)
+        return row
+
+    def string(self, index: int) -> str:
+        start, end = self.string_offsets.data[index:index + 2]
+        return self.strings.data[start:end].tobytes().decode("utf-8")
+
+
+class ChunkStore(Mapping):
+    '''
+    Chunk texts and article metadata of one topic in a few flat arrays.
+
+    Every article's text is appended once to a single UTF-8 buffer; its chunks
+    are (start, end) byte ranges into it, so overlapping chunks share their
+    bytes. Per chunk the store keeps its id, byte range and article row;
+    per article the link, title and date (in a second string buffer), the time
+    it was first seen and published and its text range. Chunk ids are increasing, so a chunk
+    is found by binary search instead of through a dict of Python objects.
+
+    The store is a read-only Mapping of chunk id -> text (what search_batch
+    expects), `sources` maps chunk ids to article links and `articles` maps
+    links to ArticleMeta. save() writes one file that load() maps into memory
+    without copying; removed articles are dropped from the file.
+
+    The store can also hold an exact float32 vector per chunk (for indexes
+    that store lossy codes and re-rank); once saved, those are only paged in
+    for the chunks that are read.
+
+    Writers (add_article, remove_article, the vector methods and save) must
+    be serialized by the caller; readers need no lock, as all columns are
+    replaced at once (see _Columns).
+    '''
+
+    def __init__(self):
+        self._columns = _Columns()
+        self.sources = _SourceView(self)
+        self.articles = _ArticleView(self)
+
+    @property
+    def dim(self) -> int:
+        '''
+        Vector dimension, 0 without vectors.
+        '''
+        return self._columns.dim
+
+    # -- Mapping of chunk id -> text -------------------------------------------------
+
+    def __getitem__(self, chunk_id: int) -> str:
+        columns = self._columns
+        row = columns.chunk_row(chunk_id)
+        start, end = int(columns.chunk_starts.data[row]), int(columns.chunk_ends.data[row])
+        return columns.text.data[start:end].tobytes().decode("utf-8")
+
+    def __contains__(self, chunk_id) -> bool:
+        try:
+            self._columns.chunk_row(chunk_id)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self._columns.live_chunks
+
+    def __iter__(self) -> Iterator[int]:
+        columns = self._columns
+        live = columns.chunk_articles.view() >= 0
+        return iter(columns.chunk_ids.view()[live].tolist())
+
+    # -- articles ---------------------------------------------------------------------
+
+    def _add_string(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        columns = self._columns
+        columns.strings.append(np.frombuffer(encoded, dtype=np.uint8))
+        columns.string_offsets.append([columns.strings.size])
+
+    def article(self, link: str) -> ArticleMeta:
+        columns = self._columns
+        row = columns.rows[link]
+        first_id, count = columns.article_chunks.data[2 * row:2 * row + 2]
+        return ArticleMeta(columns.string(3 * row), columns.string(3 * row + 1), columns.string(3 * row + 2),
+                           float(columns.article_first_seen.data[row]), range(int(first_id), int(first_id + count)),
+                           float(columns.article_published.data[row]))
+
+    def article_text(self, link: str) -> str:
+        columns = self._columns
+        row = columns.rows[link]
+        start, end = columns.article_text.data[2 * row:2 * row + 2]
+        return columns.text.data[start:end].tobytes().decode("utf-8")
+
+    def add_article(self, link: str, title: str, text: str, spans: Sequence[Tuple[int, int]],
+                    first_chunk_id: int, first_seen: float, date: str = "",
+                    vectors: Optional[np.ndarray] = None, published: Optional[float] = None) -> range:
+        '''
+        Appends an article and its chunks text[start:end] (character offsets)
+        under consecutive ids from first_chunk_id; returns the chunk ids.
+        vectors (one row per span) are required once the store holds vectors.
+        published (a timestamp) defaults to, and is capped at, first_seen.
+        '''
+        columns = self._columns
+        if link in columns.rows:
+            raise ValueError(f"Article already stored: {link}")
+        if spans and columns.chunk_ids.size and first_chunk_id <= columns.chunk_ids.data[columns.chunk_ids.size - 1]:
+            raise ValueError("Chunk ids must increase")
+        if vectors is not None and not columns.dim and columns.chunk_ids.size:
+            if columns.live_chunks:
+                raise ValueError("The store has no vectors; add them with set_vectors first")
+            # Only removed chunks so far: give them zero vectors to keep the rows aligned.
+            self.set_vectors([], np.empty((0, vectors.shape[1]), dtype=np.float32))
+        if vectors is None and columns.dim and spans:
+            raise ValueError("The store holds a vector per chunk")
+        encoded = text.encode("utf-8")
+        base = columns.text.size
+        columns.text.append(np.frombuffer(encoded, dtype=np.uint8))
+
+        row = len(columns.article_first_seen.view())
+        offsets = _utf8_offsets(text, encoded, [offset for span in spans for offset in span])
+        ids = range(first_chunk_id, first_chunk_id + len(spans))
+        columns.chunk_ids.append(ids)
+        columns.chunk_starts.append([base + offset for offset in offsets[0::2]])
+        columns.chunk_ends.append([base + offset for offset in offsets[1::2]])
+        columns.chunk_articles.append([row] * len(spans))
+        if vectors is not None and len(spans):
+            columns.dim = vectors.shape[1]
+            columns.vectors.append(np.asarray(vectors, dtype=np.float32).reshape(-1))
+        for value in (link, title, date or ""):
+            self._add_string(value)
+        columns.article_text.append([base, base + len(encoded)])
+        columns.article_chunks.append([first_chunk_id, len(spans)])
+        columns.article_first_seen.append([first_seen])
+        columns.article_published.append([first_seen if published is None else min(published, first_seen)])
+        columns.rows[link] = row
+        columns.live_chunks += len(spans)
+        return ids
+
+    def remove_article(self, link: str) -> range:
+        '''
+        Forgets an article; its bytes are reclaimed by the next save(). Returns its chunk ids.
+        '''
+        columns = self._columns
+        row = columns.rows.pop(link, None)
+        if row is None:
+            return range(0)
+        first_id, count = (int(value) for value in columns.article_chunks.data[2 * row:2 * row + 2])
+        if count:
+            first_row = int(np.searchsorted(columns.chunk_ids.view(), first_id))
+            columns.chunk_articles.writable()[first_row:first_row + count] = -1
+            columns.live_chunks -= count
+        return range(first_id, first_id + count)
+
+    # -- exact vectors ----------------------------------------------------------------
+
+    @staticmethod
+    def _rows_of(columns: _Columns, chunk_ids: np.ndarray) -> np.ndarray:
+        ids = columns.chunk_ids.view()
+        rows = np.searchsorted(ids, chunk_ids)
+        if (rows >= len(ids)).any() or (ids[np.minimum(rows, len(ids) - 1)] != chunk_ids).any():
+            raise KeyError("Unknown chunk ids")
+        return rows
+
+    def vectors(self, chunk_ids: np.ndarray) -> np.ndarray:
+        '''
+        Exact vectors of chunk_ids, one row each.
+        '''
+        columns = self._columns
+        if not columns.dim:
+            raise KeyError("The store holds no vectors")
+        return columns.vectors.view().reshape(-1, columns.dim)[self._rows_of(columns, np.asarray(chunk_ids))]
+
+    def set_vectors(self, chunk_ids: np.ndarray, vectors: np.ndarray) -> None:
+        '''
+        Stores a vector for every chunk (chunk_ids must cover the live chunks).
+        '''
+        columns = self._columns
+        table = np.zeros((columns.chunk_ids.size, vectors.shape[1]), dtype=np.float32)
+        if len(chunk_ids):
+            table[self._rows_of(columns, np.asarray(chunk_ids))] = vectors
+        columns.vectors = _Column(np.float32, table.reshape(-1))
+        columns.dim = vectors.shape[1]
+
+    def clear_vectors(self) -> None:
+        columns = self._columns
+        columns.dim = 0
+        columns.vectors = _Column(np.float32)
+
+    def live_ids(self) -> np.ndarray:
+        columns = self._columns
+        return columns.chunk_ids.view()[columns.chunk_articles.view() >= 0]
+
+    def nbytes(self) -> int:
+        '''
+        Heap memory of the columns: memory-mapped columns live in the page
+        cache and are not counted (nor are the Python objects of the link index).
+        '''
+        c = self._columns
+        arrays = (c.text, c.chunk_ids, c.chunk_starts, c.chunk_ends, c.chunk_articles, c.strings, c.string_offsets,
+                  c.article_text, c.article_chunks, c.article_first_seen, c.article_published, c.vectors)
+        return sum(len(column.data) * column.data.itemsize for column in arrays if column.data.flags.writeable)
+
+    # -- persistence ------------------------------------------------------------------
+
+    def _compacted(self) -> Dict[str, np.ndarray]:
+        c = self._columns
+        rows = sorted(c.rows.values())
+        texts, strings, string_offsets, article_text = [], [], [0], []
+        chunk_rows, chunk_starts, chunk_ends = [], [], []
+        text_size = 0
+        for new_row, row in enumerate(rows):
+            start, end = (int(value) for value in c.article_text.data[2 * row:2 * row + 2])
+            texts.append(c.text.data[start:end])
+            first_id, count = (int(value) for value in c.article_chunks.data[2 * row:2 * row + 2])
+            first_row = int(np.searchsorted(c.chunk_ids.view(), first_id))
+            chunk_rows.append(np.arange(first_row, first_row + count))
+            shift = text_size - start
+            chunk_starts.append(c.chunk_starts.data[first_row:first_row + count] + shift)
+            chunk_ends.append(c.chunk_ends.data[first_row:first_row + count] + shift)
+            article_text.extend((text_size, text_size + end - start))
+            text_size += end - start
+            for index in range(3 * row, 3 * row + 3):
+                s_start, s_end = c.string_offsets.data[index:index + 2]
+                strings.append(c.strings.data[s_start:s_end])
+                string_offsets.append(string_offsets[-1] + int(s_end - s_start))
+        chunk_rows = np.concatenate(chunk_rows) if chunk_rows else np.empty(0, dtype=np.int64)
+        renumber = np.full(max(len(c.article_first_seen.view()), 1), -1, dtype=np.int32)
+        renumber[rows] = np.arange(len(rows), dtype=np.int32)
+
+        def concat(parts, dtype):
+            return np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty(0, dtype=dtype)
+        return {
+            "text": concat(texts, np.uint8),
+            "chunk_ids": c.chunk_ids.view()[chunk_rows],
+            "chunk_starts": concat(chunk_starts, np.int64),
+            "chunk_ends": concat(chunk_ends, np.int64),
+            "chunk_articles": renumber[c.chunk_articles.view()[chunk_rows]],
+            "strings": concat(strings, np.uint8),
+            "string_offsets": np.array(string_offsets, dtype=np.int64),
+            "article_text": np.array(article_text, dtype=np.int64),
+            "article_chunks": c.article_chunks.view().reshape(-1, 2)[rows].reshape(-1),
+            "article_first_seen": c.article_first_seen.view()[rows],
+            "article_published": c.article_published.view()[rows],
+            "vectors": (c.vectors.view().reshape(-1, c.dim)[chunk_rows].reshape(-1) if c.dim
+                        else np.empty(0, dtype=np.float32)),
+            "vector_dim": np.array([c.dim], dtype=np.int64),
+        }
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the live articles to path atomically, then maps the new file in
+        place of the in-memory columns.
+        '''
+        columns = self._compacted()
+        directory, offset = {}, 0
+        for name, array in columns.items():
+            directory[name] = {"dtype": array.dtype.str, "offset": offset, "length": len(array)}
+            offset += -(-array.nbytes // _ALIGN) * _ALIGN
+        header = json.dumps(directory).encode("utf-8")
+        data_start = -(-(_HEADER.size + len(header)) // _ALIGN) * _ALIGN
+        with open(path + ".tmp", "wb") as file:
+            file.write(_HEADER.pack(MAGIC, len(header)) + header)
+            for name, array in columns.items():
+                file.seek(data_start + directory[name]["offset"])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + offset)
+        os.replace(path + ".tmp", path)
+        self._map(path)
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkStore":
+        store = cls()
+        store._map(path)
+        return store
+
+    def _map(self, path: str) -> None:
+        with open(path, "rb") as file:
+            magic, header_size = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a chunk store: {path}")
+            directory = json.loads(file.read(header_size))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data_start = -(-(_HEADER.size + header_size) // _ALIGN) * _ALIGN
+
+        def column(name: str) -> _Column:
+            entry = directory[name]
+            dtype = np.dtype(entry["dtype"])
+            if not entry["length"]:
+                return _Column(dtype, np.empty(0, dtype=dtype))
+            # Zero-copy, read-only view of the mapped file.
+            return _Column(dtype, np.frombuffer(mapped, dtype=dtype, count=entry["length"],
+                                                offset=data_start + entry["offset"]))
+
+        columns = _Columns()
+        for name in ("text", "chunk_ids", "chunk_starts", "chunk_ends", "chunk_articles", "strings",
+                     "string_offsets", "article_text", "article_chunks", "article_first_seen"):
+            setattr(columns, name, column(name))
+        # Stores written before publication times were kept only know when articles were first seen.
+        columns.article_published = column("article_published" if "article_published" in directory
+                                           else "article_first_seen")
+        if "vectors" in directory:
+            columns.vectors = column("vectors")
+            columns.dim = int(column("vector_dim").data[0])
+        columns.rows = {columns.string(3 * row): row for row in range(columns.article_first_seen.size)}
+        columns.live_chunks = columns.chunk_ids.size
+        columns.mapped = mapped
+        # One assignment: readers see either the old columns or the new ones.
+        self._columns = columns
+
+
+class _SourceView(Mapping):
+    '''
+    chunk id -> link of the article the chunk came from.
+    '''
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def __getitem__(self, chunk_id: int) -> str:
+        columns = self._store._columns
+        return columns.string(3 * int(columns.chunk_articles.data[columns.chunk_row(chunk_id)]))
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store)
+
+
+class _ArticleView(Mapping):
+    '''
+    link -> ArticleMeta of the live articles.
+    '''
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def __getitem__(self, link: str) -> ArticleMeta:
+        return self._store.article(link)
+
+    def __contains__(self, link) -> bool:
+        return link in self._store._columns.rows
+
+    def __len__(self) -> int:
+        return len(self._store._columns.rows)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._store._columns.rows))
@@ -1,6 +1,101 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
-import os
+from bisect import bisect_left, bisect_right
+from typing import List, NamedTuple, Sequence, Tuple
+import re
+
+from utils.metrics import span
+from utils.constants import FAILED_DESCRIPTION
+
+# Aim for ~350–450 token chunks ≃ 1 400–1 800 characters each.
+CHUNK_SIZE = 1600        # ≃ 400 tokens × 4 chars/token
+CHUNK_OVERLAP = 200      # ≃ 20% overlap (200 chars ≃ 50 tokens), rounded down to whole sentences
+# Shorter documents are failed downloads or teasers ("Latest Blogs"), not articles.
+MIN_DOCUMENT_CHARS = 200
+
+# A sentence ends after ./!/? (plus closing quotes or brackets) and whitespace, or at a line break.
+_SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*\s+|\n\s*""")
+
+
+class ChunkSpan(NamedTuple):
+    article_id: int  # index of the document in the chunked batch
+    start: int       # chunk text is document[start:end]
+    end: int
+
+
+def is_usable(text: str, min_chars: int = MIN_DOCUMENT_CHARS) -> bool:
+    '''
+    False for the scraper's failure placeholder and near-empty pages.
+    '''
+    return text != FAILED_DESCRIPTION and len(text.strip()) >= min_chars
+
+
+def sentence_starts(text: str) -> List[int]:
+    '''
+    Offsets where a sentence starts, including 0 and len(text).
+    '''
+    return [0] + [match.end() for match in _SENTENCE_END.finditer(text)] + [len(text)]
+
+
+def split_spans(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    '''
+    (start, end) offsets of chunks of at most chunk_size characters that
+    end on sentence boundaries. Consecutive chunks share the whole sentences
+    in their last `overlap` characters. A sentence longer than chunk_size
+    is cut at a space.
+    '''
+    bounds = sentence_starts(text)
+    n = len(text)
+    spans = []
+    start = len(text) - len(text.lstrip())
+    while start < n:
+        end = n
+        if start + chunk_size < n:
+            end = bounds[bisect_right(bounds, start + chunk_size) - 1]
+            if end <= start:
+                # No sentence boundary fits: cut at the last space, or mid-word as a last resort.
+                end = text.rfind(" ", start + 1, start + chunk_size)
+                if end <= start:
+                    end = start + chunk_size
+        stop = end
+        while stop > start and text[stop - 1].isspace():
+            stop -= 1
+        if stop > start:
+            spans.append((start, stop))
+        if end >= n:
+            break
+        following = bounds[bisect_left(bounds, end - overlap)]
+        start = following if start < following < end else end
+        while start < n and text[start].isspace():
+            start += 1
+    return spans
+
+
+def chunk_spans(documents: Sequence[str], chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+                min_chars: int = MIN_DOCUMENT_CHARS) -> List[ChunkSpan]:
+    '''
+    Sentence-aligned chunk offsets into every usable document; failed and
+    too-short documents get no chunks, so they never reach the embedder.
+    '''
+    with span("chunk") as stage:
+        spans = []
+        skipped = 0
+        for article_id, text in enumerate(documents):
+            if not is_usable(text, min_chars):
+                skipped += 1
+                continue
+            spans.extend(ChunkSpan(article_id, start, end) for start, end in split_spans(text, chunk_size, overlap))
+        stage.add(items=len(spans), bytes=sum(map(len, documents)), skipped=skipped)
+    return spans
+
+
+def chunk_articles(descriptions: List[str]) -> List[List[str]]:
+    '''
+    Splits every article separately and keeps its chunks together; failed
+    and too-short articles get an empty list.
+    '''
+    chunked: List[List[str]] = [[] for _ in descriptions]
+    for article_id, start, end in chunk_spans(descriptions):
+        chunked[article_id].append(descriptions[article_id][start:end])
+    return chunked
 
 
 def chunk_doc(documents: List):
@@ -9,15 +104,8 @@ def chunk_doc(documents: List):
     #     if filename.endswith(".txt"):
     #         with open(os.path.join(file_path, filename), 'r', encoding='utf-8') as file:
     #             documents.append(file.read())
-    # Aim for ~350–450 token chunks ≃ 1 400–1 800 characters each.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1600,    # ≃ 400 tokens × 4 chars/token
-        chunk_overlap=200   # ≃ 20% overlap (200 chars ≃ 50 tokens)
-    )
-
     all_chunks = []
-    for doc in documents['description']:
-        chunks = text_splitter.split_text(doc)
+    for chunks in chunk_articles(documents['description']):
         all_chunks.extend(chunks)
 
-    return all_chunks
\ No newline at end of file
+    return all_chunks
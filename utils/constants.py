@@ -0,0 +1,3 @@
+# Shared by the scraper and the stages after it; kept free of imports so
+# that modules like utils.chunking do not pull in requests and lxml.
+FAILED_DESCRIPTION = "Failed to retrieve the webpage."
@@ -0,0 +1,107 @@
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+import math
+
+from utils.dedup import NearDuplicateIndex
+from utils.extract_document import Hit
+
+CHARS_PER_TOKEN = 4      # same heuristic utils.chunking's 1600-char chunk size is based on
+CHUNK_OVERLAP = 200      # utils.chunking.CHUNK_OVERLAP
+PIECE_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int = CHUNK_OVERLAP) -> Optional[str]:
+    '''
+    Joins two consecutive chunks of an article, writing the text they share
+    only once. Returns None when second does not start with a suffix of first.
+    '''
+    for size in range(min(len(first), len(second), max_overlap + 1), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return None
+
+
+class Piece(NamedTuple):
+    source: Optional[str]
+    chunk_ids: List[int]  # consecutive chunks merged into this piece
+    text: str
+    rank: int             # best rank among the piece's hits
+
+
+class PackedContext(NamedTuple):
+    text: str
+    tokens: int           # estimated with CHARS_PER_TOKEN
+    pieces: List[Piece]
+    dropped_duplicates: int
+    over_budget: int      # hits that did not fit
+
+
+def _label(number: int, piece: Piece, titles: Optional[Mapping[str, str]]) -> str:
+    if piece.source is None:
+        return f"[{number}]"
+    title = titles.get(piece.source) if titles else None
+    return f"[{number}] {title} ({piece.source})" if title else f"[{number}] {piece.source}"
+
+
+def _build_pieces(selected: Sequence[Hit], ranks: Mapping[int, int]) -> List[Piece]:
+    pieces: List[Piece] = []
+    for hit in sorted(selected, key=lambda hit: (hit.source or "", hit.chunk_id)):
+        last = pieces[-1] if pieces else None
+        if last is not None and last.source == hit.source and last.chunk_ids[-1] + 1 == hit.chunk_id:
+            merged = merge_overlapping(last.text, hit.text)
+            # Without a source, consecutive ids may belong to different articles.
+            if merged is not None or hit.source is not None:
+                pieces[-1] = Piece(last.source, last.chunk_ids + [hit.chunk_id],
+                                   merged if merged is not None else f"{last.text} {hit.text}",
+                                   min(last.rank, ranks[hit.chunk_id]))
+                continue
+        pieces.append(Piece(hit.source, [hit.chunk_id], hit.text, ranks[hit.chunk_id]))
+    return sorted(pieces, key=lambda piece: piece.rank)
+
+
+def _render(pieces: Sequence[Piece], titles: Optional[Mapping[str, str]]) -> str:
+    return PIECE_SEPARATOR.join(
+        f"{_label(number, piece, titles)}\n{piece.text}" for number, piece in enumerate(pieces, 1)
+    )
+
+
+def pack_context(hits: Sequence[Hit], token_budget: int = 2000,
+                 titles: Optional[Mapping[str, str]] = None,
+                 duplicate_threshold: float = 0.8) -> PackedContext:
+    '''
+    Packs ranked hits (closest first) into at most token_budget tokens of context.
+
+    Hits are taken in rank order while they fit. Consecutive chunks of the same
+    article are merged so their 200-char overlap is sent once, near-duplicate
+    chunks (e.g. the same story from two outlets) are dropped, and every piece
+    is labelled with a number and its source so the answer can cite it. Pieces
+    are ordered by their best hit.
+    '''
+    ranks: Dict[int, int] = {}
+    selected: List[Hit] = []
+    pieces: List[Piece] = []
+    text = ""
+    near_duplicates = NearDuplicateIndex(threshold=duplicate_threshold)
+    dropped = over_budget = 0
+
+    for rank, hit in enumerate(hits):
+        if hit.chunk_id in ranks:
+            continue
+        if near_duplicates.query(hit.text)[0] is not None:
+            dropped += 1
+            continue
+        candidate_pieces = _build_pieces(selected + [hit], {**ranks, hit.chunk_id: rank})
+        candidate_text = _render(candidate_pieces, titles)
+        if estimate_tokens(candidate_text) > token_budget:
+            over_budget += 1
+            continue
+        # Only packed hits rule out their near-duplicates; one that did not fit must not.
+        near_duplicates.add(hit.chunk_id, hit.text)
+        ranks[hit.chunk_id] = rank
+        selected.append(hit)
+        pieces, text = candidate_pieces, candidate_text
+
+    return PackedContext(text, estimate_tokens(text), pieces, dropped, over_budget)
@@ -0,0 +1,131 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_EMPTY_BIN = np.uint64(2 ** 64 - 1)
+
+
+def _word_hashes(text: str) -> np.ndarray:
+    words = text.lower().split()
+    return np.fromiter(map(hash, words), dtype=np.int64, count=len(words)).view(np.uint64)
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> np.ndarray:
+    '''
+    64-bit hashes of every run of shingle_size consecutive words, combined
+    with vectorised polynomial hashing over the words' str hashes. str hashes
+    are salted per process, so signatures are only comparable within one run.
+    '''
+    words = _word_hashes(text)
+    if len(words) < shingle_size:
+        return np.unique(words) if len(words) else np.zeros(1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        shingles = np.zeros(len(words) - shingle_size + 1, dtype=np.uint64)
+        for offset in range(shingle_size):
+            shingles = shingles * np.uint64(1_000_003) + words[offset:offset + len(shingles)]
+        # Fibonacci hashing, so the high bits used for binning are well mixed.
+        shingles *= np.uint64(0x9E3779B97F4A7C15)
+    return np.unique(shingles)
+
+
+class NearDuplicateIndex:
+    '''
+    Incremental MinHash/LSH index of articles.
+
+    Signatures use one-permutation MinHash: the shingle hash space is split
+    into num_hashes bins and the signature holds the smallest hash in each
+    bin, which costs one sort instead of num_hashes passes over the shingles.
+    Signatures are split into
+    `bands` bands and texts sharing any band are compared on the estimated
+    Jaccard similarity of their word shingles. add() returns the key of an
+    earlier article the text is a near-duplicate of (similarity >= threshold),
+    so the first copy of a syndicated story stays canonical.
+    '''
+
+    def __init__(self, threshold: float = 0.8, num_hashes: int = 64, bands: int = 16,
+                 shingle_size: int = 5):
+        if num_hashes % bands or num_hashes & (num_hashes - 1):
+            raise ValueError("num_hashes must be a power of two and a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self.shingle_size = shingle_size
+        shift = 64 - (num_hashes.bit_length() - 1)
+        # First hash of every bin, to find each bin's minimum in sorted shingles.
+        self._bin_starts = np.arange(num_hashes, dtype=np.uint64) << np.uint64(shift)
+        self._shift = np.uint64(shift)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = shingle_hashes(text, self.shingle_size)  # sorted
+        first = np.searchsorted(shingles, self._bin_starts)
+        sig = np.full(len(self._bin_starts), _EMPTY_BIN)
+        found = first < len(shingles)
+        candidates = shingles[first[found]]
+        in_bin = (candidates >> self._shift) == np.arange(len(sig), dtype=np.uint64)[found]
+        sig[np.flatnonzero(found)[in_bin]] = candidates[in_bin]
+        return sig
+
+    def similarity(self, sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        used = (sig_a != _EMPTY_BIN) | (sig_b != _EMPTY_BIN)
+        if not used.any():
+            return 1.0
+        return float(np.mean(sig_a[used] == sig_b[used]))
+
+    def query(self, text: str) -> Tuple[Optional[Hashable], float, np.ndarray]:
+        '''
+        Most similar indexed article at or above the threshold, its estimated
+        similarity, and the signature of text.
+        '''
+        sig = self.signature(text)
+        best_key, best_sim = None, 0.0
+        checked = set()
+        for band, buckets in enumerate(self._buckets):
+            for key in buckets.get(sig[band * self.rows:(band + 1) * self.rows].tobytes(), ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                sim = self.similarity(sig, self._signatures[key])
+                if sim >= self.threshold and sim > best_sim:
+                    best_key, best_sim = key, sim
+        return best_key, best_sim, sig
+
+    def add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        '''
+        Indexes text under key unless it is a near-duplicate of an indexed
+        article, in which case that article's key is returned instead.
+        '''
+        duplicate_of, _, sig = self.query(text)
+        if duplicate_of is not None:
+            return duplicate_of
+        self._signatures[key] = sig
+        for band, buckets in enumerate(self._buckets):
+            buckets.setdefault(sig[band * self.rows:(band + 1) * self.rows].tobytes(), []).append(key)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+def deduplicate(data, threshold: float = 0.8):
+    '''
+    Keeps one article per near-duplicate cluster of data['description'] (the
+    first in result order) and lists the links of the dropped copies in an
+    `alternate_links` column. Returns (deduplicated data, number of dropped articles).
+    '''
+    index = NearDuplicateIndex(threshold)
+    alternates: Dict[int, List[str]] = {}
+    keep = []
+    for row, (link, text) in enumerate(zip(data['link'], data['description'])):
+        duplicate_of = index.add(row, text)
+        if duplicate_of is None:
+            keep.append(row)
+            alternates[row] = []
+        else:
+            alternates[duplicate_of].append(link)
+
+    dropped = len(data) - len(keep)
+    data = data.iloc[keep].copy()
+    data['alternate_links'] = [alternates[row] for row in keep]
+    return data.reset_index(drop=True), dropped
@@ -1,12 +1,208 @@
-from sentence_transformers import SentenceTransformer
-from typing import List,Tuple
-import faiss
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+import logging
+import math
+import os
+import numpy as np
 
+from utils.embedding_cache import EmbeddingCache, embedding_key
+from utils.metrics import span
+from utils.model_registry import EMBEDDING_MODEL_ID, get_embedding_model
 
-def embed_documents(all_chunks: List) -> Tuple[faiss.Index,SentenceTransformer]:
-    embedding_model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight & fast
-    corpus_embeddings = embedding_model.encode(all_chunks, convert_to_numpy=True)
-    embedding_dimension = corpus_embeddings.shape[1]
-    index = faiss.IndexFlatL2(embedding_dimension)  # L2 = Euclidean distance
+if TYPE_CHECKING:  # both are imported on first use, keeping them off the import path
+    import faiss
+    from sentence_transformers import SentenceTransformer
+
+# Corpus sizes at which the index factory switches away from exact search.
+FLAT_MAX_VECTORS = 50_000
+HNSW_MAX_VECTORS = 500_000
+
+# How the index stores vectors: float32 (exact), float16, int8 (per-dimension
+# scalar quantization) or pq (product quantization, PQ_BYTES bytes a vector).
+INDEX_MODES = ("float32", "float16", "int8", "pq")
+INDEX_MODE = os.getenv("NEWS_INDEX_MODE", "float32")
+PQ_BYTES = 48
+PQ_MIN_TRAIN = 10_000   # ~39 training vectors per PQ centroid; below that pq falls back to int8
+RERANK_FACTOR = 4       # lossy modes shortlist RERANK_FACTOR * k and re-rank with exact vectors
+SQ_RANGE_MARGIN = 0.2   # widen the trained int8 range, as later vectors may fall outside it
+
+logger = logging.getLogger(__name__)
+
+
+def choose_index_kind(n_vectors: int, removable: bool = False) -> str:
+    '''
+    Flat (exact) search for small corpora, HNSW up to HNSW_MAX_VECTORS and IVF
+    beyond, where HNSW build time and memory grow too large. HNSW cannot remove
+    vectors, so indexes that must support remove_ids use IVF instead.
+    '''
+    if n_vectors < FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors < HNSW_MAX_VECTORS and not removable:
+        return "hnsw"
+    return "ivf"
+
+
+def effective_mode(mode: str, n_vectors: int) -> str:
+    '''
+    The storage mode an index over n_vectors can use: pq needs PQ_MIN_TRAIN
+    vectors to train its codebooks and uses int8 until then.
+    '''
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown index mode: {mode}, expected one of {INDEX_MODES}")
+    if mode == "pq" and n_vectors < PQ_MIN_TRAIN:
+        return "int8"
+    return mode
+
+
+def needs_rerank(mode: str) -> bool:
+    return mode in ("int8", "pq")
+
+
+def code_size(mode: str, dim: int) -> int:
+    '''
+    Bytes the index stores per vector in mode (ids and graph links aside).
+    '''
+    return {"float32": 4 * dim, "float16": 2 * dim, "int8": dim, "pq": _pq_bytes(dim)}[mode]
+
+
+def _pq_bytes(dim: int) -> int:
+    # Sub-quantizers must divide the dimension; 48 of 8 dims each for MiniLM's 384.
+    return max(m for m in range(1, min(PQ_BYTES, dim) + 1) if dim % m == 0)
+
+
+def _codes(mode: str, dim: int) -> str:
+    return {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8", "pq": f"PQ{_pq_bytes(dim)}"}[mode]
+
+
+def _widen_sq_range(index: "faiss.Index") -> None:
+    import faiss
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    sq = getattr(index, "sq", None)
+    if sq is not None:
+        sq.rangestat = faiss.ScalarQuantizer.RS_minmax
+        sq.rangestat_arg = SQ_RANGE_MARGIN
+
+
+def _training_sample(embeddings: np.ndarray, size: int) -> np.ndarray:
+    if len(embeddings) > size:
+        rng = np.random.default_rng(0)
+        embeddings = embeddings[rng.choice(len(embeddings), size, replace=False)]
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def build_index(embeddings: np.ndarray, kind: str = "auto", removable: bool = False,
+                mode: str = "float32") -> "faiss.Index":
+    '''
+    Creates an L2 index for embeddings (trained where needed, vectors not added yet).
+
+    kind is "flat", "ivf", "hnsw", or "auto" to pick by corpus size. IVF uses
+    ~2·sqrt(n) lists, trained on a 50-per-list sample, and probes 1/16 of them;
+    HNSW uses M=32 with efSearch=64.
+
+    mode is how vectors are stored (see INDEX_MODES and effective_mode). The
+    int8 and pq modes are lossy: search their index for RERANK_FACTOR * k and
+    re-rank with rerank_exact (or use embed_documents, which does it for you).
+    HNSW over pq codes builds its graph from approximate distances and loses
+    recall that re-ranking cannot win back; prefer flat or IVF for pq.
+    '''
+    import faiss
+    n_vectors, dim = embeddings.shape
+    if kind == "auto":
+        kind = choose_index_kind(n_vectors, removable)
+    mode = effective_mode(mode, n_vectors)
+    codes = _codes(mode, dim)
+
+    if kind == "flat":
+        if mode == "float32":
+            return faiss.IndexFlatL2(dim)  # L2 = Euclidean distance
+        index = faiss.index_factory(dim, codes)
+
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32) if mode == "float32" else faiss.index_factory(dim, f"HNSW32,{codes}")
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = 64
+
+    elif kind == "ivf":
+        nlist = max(1, min(int(2 * math.sqrt(n_vectors)), n_vectors // 39))
+        index = faiss.index_factory(dim, f"IVF{nlist},{codes}")  # owns its coarse quantizer
+        index.nprobe = max(8, nlist // 16)
+        # k-means needs ~40 points per list; more only slows training down.
+        sample_size = 50 * nlist
+
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+
+    if not index.is_trained:
+        if kind != "ivf":
+            sample_size = PQ_MIN_TRAIN * 4 if mode == "pq" else 100_000
+        _widen_sq_range(index)
+        index.train(_training_sample(embeddings, sample_size))
+    return index
+
+
+def rerank_exact(query_embeddings: np.ndarray, candidate_ids: np.ndarray,
+                 exact_vectors: Callable[[np.ndarray], np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Re-orders the shortlists a lossy index returned (candidate_ids, -1 for none)
+    by exact L2 distance and keeps k per query, in faiss.Index.search's format.
+    exact_vectors maps an array of ids to their float32 vectors.
+    '''
+    n = len(query_embeddings)
+    distances = np.full((n, k), np.inf, dtype=np.float32)
+    ids = np.full((n, k), -1, dtype=np.int64)
+    for row, (query, candidates) in enumerate(zip(query_embeddings, candidate_ids)):
+        candidates = candidates[candidates >= 0]
+        if not len(candidates):
+            continue
+        exact = ((exact_vectors(candidates) - query) ** 2).sum(axis=1)
+        order = np.argsort(exact, kind="stable")[:k]
+        distances[row, :len(order)] = exact[order]
+        ids[row, :len(order)] = candidates[order]
+    return distances, ids
+
+
+def encode_chunks(all_chunks: List[str], embedding_model: "SentenceTransformer",
+                  cache: Optional[EmbeddingCache] = None, model_id: str = EMBEDDING_MODEL_ID) -> np.ndarray:
+    '''
+    Encodes all_chunks into a float32 matrix. With a cache only chunks that were
+    never embedded by model_id are sent through the model; repeated chunks
+    within the batch are encoded once.
+    '''
+    with span("embed") as stage:
+        stage.add(items=len(all_chunks))
+        if cache is None:
+            stage.add(bytes=sum(map(len, all_chunks)))
+            return embedding_model.encode(all_chunks, convert_to_numpy=True)
+
+        keys = [embedding_key(model_id, chunk) for chunk in all_chunks]
+        vectors = cache.get_many(keys)
+
+        missing = {}
+        for key, chunk in zip(keys, all_chunks):
+            if key not in vectors:
+                missing.setdefault(key, chunk)
+        stage.add(cache_hits=len(all_chunks) - len(missing), bytes=sum(map(len, missing.values())))
+        if missing:
+            new_vectors = embedding_model.encode(list(missing.values()), convert_to_numpy=True)
+            cache.put_many(list(missing), new_vectors)
+            vectors.update(zip(missing, new_vectors))
+
+    if not keys:
+        return np.empty((0, embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+
+def embed_documents(all_chunks: List, embedding_model: Optional["SentenceTransformer"] = None,
+                    cache: Optional[EmbeddingCache] = None, kind: str = "auto",
+                    mode: str = INDEX_MODE) -> Tuple["faiss.Index", "SentenceTransformer"]:
+    import faiss
+    embedding_model = embedding_model or get_embedding_model()  # shared all-MiniLM-L6-v2
+    corpus_embeddings = encode_chunks(all_chunks, embedding_model, cache)
+    index = build_index(corpus_embeddings, kind, mode=mode)
+    if needs_rerank(effective_mode(mode, len(corpus_embeddings))):
+        # Keeps exact copies of the vectors to re-rank RERANK_FACTOR * k candidates.
+        index = faiss.IndexRefineFlat(index)
+        index.k_factor = RERANK_FACTOR
     index.add(corpus_embeddings)
     return index,embedding_model
@@ -1,7 +1,14 @@
 # Query example
-from sentence_transformers import SentenceTransformer
+from typing import TYPE_CHECKING, List
 import numpy as np
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
-def encode_query(query: str, embedding_model: SentenceTransformer) -> np.ndarray:
+
+def encode_query(query: str, embedding_model: "SentenceTransformer") -> np.ndarray:
     return embedding_model.encode([query], convert_to_numpy=True)
+
+
+def encode_queries(queries: List[str], embedding_model: "SentenceTransformer") -> np.ndarray:
+    return embedding_model.encode(queries, convert_to_numpy=True)
@@ -1,12 +1,69 @@
-import faiss
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
 import numpy as np
-import faiss
 
+if TYPE_CHECKING:  # only annotates; callers hand in an index they built
+    import faiss
 
-def extract_documents(index: faiss.Index, query_embedding: np.ndarray, all_chunks: List[str], k: int = 3) -> str:
-    context = ""
-    _, indices = index.search(query_embedding, k)
-    for idx in indices[0]:
-        context += all_chunks[idx]
-    return context
+
+class Hit(NamedTuple):
+    chunk_id: int
+    score: float         # L2 distance to the query (negated RRF or rerank score), lower is closer
+    source: Optional[str]  # link of the article the chunk came from
+    text: str
+
+
+def search_batch(index: "faiss.Index", query_embeddings: np.ndarray,
+                 all_chunks: Union[Sequence[str], Mapping[int, str]], k: int = 3,
+                 sources: Optional[Mapping[int, str]] = None, dedupe: bool = True,
+                 queries: Optional[Sequence[str]] = None) -> List[List[Hit]]:
+    '''
+    Searches all queries with a single index.search call and returns, per
+    query, its hits ordered from closest to farthest.
+
+    queries, the texts of the query embeddings, are passed on to indexes
+    with hybrid (dense + BM25) search such as TopicIndex.
+
+    With dedupe, a chunk retrieved by several queries is only kept for the
+    query it is closest to, so callers merging the lists see each chunk once.
+
+    all_chunks may lose chunks while this runs (a TopicIndex is searched
+    under its lock, but its texts are read after); those hits are dropped.
+    '''
+    query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+    if queries is not None:
+        distances, indices = index.search(query_embeddings, k, queries)
+    else:
+        distances, indices = index.search(query_embeddings, k)
+
+    owner: Dict[int, int] = {}
+    if dedupe:
+        best: Dict[int, float] = {}
+        for query_idx, (row_dist, row_ids) in enumerate(zip(distances, indices)):
+            for dist, idx in zip(row_dist, row_ids):
+                if idx >= 0 and dist < best.get(idx, np.inf):
+                    best[idx] = dist
+                    owner[idx] = query_idx
+
+    results = []
+    for query_idx, (row_dist, row_ids) in enumerate(zip(distances, indices)):
+        hits = []
+        for dist, idx in zip(row_dist, row_ids):
+            if idx < 0:  # fewer than k chunks indexed
+                continue
+            if dedupe and owner[idx] != query_idx:
+                continue
+            idx = int(idx)
+            try:
+                text = all_chunks[idx]
+            except KeyError:
+                # Removed (e.g. expired) by another thread since the index was searched.
+                continue
+            source = sources.get(idx) if sources is not None else None
+            hits.append(Hit(idx, float(dist), source, text))
+        results.append(hits)
+    return results
+
+
+def extract_documents(index: "faiss.Index", query_embedding: np.ndarray, all_chunks: List[str], k: int = 3) -> str:
+    hits = search_batch(index, query_embedding[:1], all_chunks, k, dedupe=False)[0]
+    return "\n\n".join(hit.text for hit in hits)
@@ -0,0 +1,150 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+import logging
+import os
+import re
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:  # lxml is optional; fall back to html.parser
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Containers that never hold article text.
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "nav", "header", "footer",
+                     "aside", "form", "iframe", "svg", "button", "select"]
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "dialog", "alertdialog"}
+# Words in class/id attributes of cookie banners, footers, "related stories" and similar blocks.
+_BOILERPLATE_WORDS = {
+    "ad", "ads", "advert", "advertisement", "banner", "breadcrumb", "breadcrumbs", "comment",
+    "comments", "consent", "cookie", "cookies", "footer", "gdpr", "menu", "modal", "nav",
+    "navigation", "newsletter", "outbrain", "paywall", "popup", "promo", "recommended",
+    "related", "share", "sharing", "sidebar", "signup", "social", "sponsored", "subscribe",
+    "subscription", "taboola", "trending",
+}
+_WORD_SPLIT = re.compile(r"[\s_\-]+")
+
+
+class Extractor(ABC):
+    '''
+    Turns a downloaded page into the article text stored in the description column.
+    '''
+    name = "base"
+
+    @abstractmethod
+    def extract(self, html_content: str) -> str:
+        ...
+
+
+class ParagraphExtractor(Extractor):
+    '''
+    Joins the text of every <p>, parsed with BeautifulSoup's html.parser.
+    The original scraper behaviour and the fallback for the other backends.
+    '''
+    name = "bs4"
+
+    def extract(self, html_content: str) -> str:
+        from bs4 import BeautifulSoup  # only this fallback needs bs4
+        soup = BeautifulSoup(html_content, "html.parser")
+        paragraphs = soup.find_all("p")
+        return " ".join([p.get_text() for p in paragraphs])
+
+
+class LxmlParagraphExtractor(Extractor):
+    '''
+    Same output as ParagraphExtractor, parsed with lxml's C parser.
+    '''
+    name = "lxml"
+
+    def extract(self, html_content: str) -> str:
+        doc = lxml.html.fromstring(html_content)
+        return " ".join(p.text_content() for p in doc.iter("p"))
+
+
+class MainContentExtractor(Extractor):
+    '''
+    Keeps only paragraphs that look like article body: drops navigation,
+    header/footer, asides, forms and blocks whose class/id/role mark them as
+    cookie banners, related stories, newsletters, ads and the like, then
+    discards short or link-heavy paragraphs outside the main text container.
+    '''
+    name = "main"
+
+    def __init__(self, min_paragraph_chars: int = 40, max_link_density: float = 0.5):
+        self.min_paragraph_chars = min_paragraph_chars
+        self.max_link_density = max_link_density
+
+    @staticmethod
+    def _is_boilerplate(element) -> bool:
+        if element.get("role", "").lower() in _BOILERPLATE_ROLES:
+            return True
+        words = _WORD_SPLIT.split(f"{element.get('class', '')} {element.get('id', '')}".lower())
+        return any(word in _BOILERPLATE_WORDS for word in words)
+
+    def extract(self, html_content: str) -> str:
+        doc = lxml.html.fromstring(html_content)
+        for element in list(doc.iter(*_BOILERPLATE_TAGS)):
+            if element.getparent() is not None:
+                element.drop_tree()
+        for element in list(doc.iter()):
+            if isinstance(element.tag, str) and element.getparent() is not None \
+                    and self._is_boilerplate(element):
+                element.drop_tree()
+
+        paragraphs = []
+        text_by_parent: Dict = {}
+        for p in doc.iter("p"):
+            text = " ".join(p.text_content().split())
+            if not text:
+                continue
+            link_chars = sum(len(a.text_content()) for a in p.iter("a"))
+            if link_chars > self.max_link_density * len(text):
+                continue
+            paragraphs.append((p, text))
+            text_by_parent[p.getparent()] = text_by_parent.get(p.getparent(), 0) + len(text)
+
+        main_parent = max(text_by_parent, key=text_by_parent.get, default=None)
+        return " ".join(
+            text for p, text in paragraphs
+            if p.getparent() is main_parent or len(text) >= self.min_paragraph_chars
+        )
+
+
+EXTRACTORS = {
+    "bs4": ParagraphExtractor,
+    "lxml": LxmlParagraphExtractor,
+    "main": MainContentExtractor,
+}
+
+
+class FallbackExtractor(Extractor):
+    '''
+    Runs `primary` and falls back to html.parser when it cannot parse a page.
+    '''
+
+    def __init__(self, primary: Extractor):
+        self.primary = primary
+        self.fallback = ParagraphExtractor()
+        self.name = primary.name
+
+    def extract(self, html_content: str) -> str:
+        try:
+            return self.primary.extract(html_content)
+        except (ParserError, ValueError) as e:
+            logger.debug("%s extractor failed (%s), using html.parser", self.primary.name, e)
+            return self.fallback.extract(html_content)
+
+
+def get_extractor(name: Optional[str] = None) -> Extractor:
+    '''
+    Extractor by name ("bs4", "lxml" or "main"); defaults to NEWS_EXTRACTOR or
+    "lxml". Without lxml installed every name resolves to the bs4 extractor.
+    '''
+    name = name or os.getenv("NEWS_EXTRACTOR", "lxml")
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of {sorted(EXTRACTORS)}")
+    if name == "bs4" or lxml is None:
+        return ParagraphExtractor()
+    return FallbackExtractor(EXTRACTORS[name]())
@@ -0,0 +1,302 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import threading
+import time
+
+from utils.article_cache import get_article_cache
+from utils.chunking import chunk_spans, is_usable
+from utils.dedup import NearDuplicateIndex
+from utils.embedding import encode_chunks
+from utils.embedding_cache import get_embedding_cache
+from utils.metrics import span
+from utils.news_fetcher import iter_google_news
+from utils.scraper import FAILED_DESCRIPTION, HostThrottle, clean_link, extract_page, fetch_page, make_session
+from utils.topic_index import NEWS_WINDOW, TopicIndex
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+def _published(value) -> Optional[float]:
+    '''
+    Timestamp of a GoogleNews 'datetime' (parsed from "2 days ago" and the
+    like); None where it is missing (None, NaN or NaT).
+    '''
+    try:
+        timestamp = value.timestamp()
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+    return timestamp if math.isfinite(timestamp) else None
+
+
+class IngestProgress:
+    '''
+    Counters of a running ingestion plus the `ready` future, which resolves
+    (with the reason) once enough articles are indexed to start answering,
+    or fails with the ingestion's error (is cancelled with it) if it stopped
+    before that.
+    '''
+
+    def __init__(self):
+        self.ready: Future = Future()
+        self.listed = 0
+        self.fetched = 0
+        self.failed = 0
+        self.too_short = 0
+        self.too_old = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.duplicate_chars = 0
+        self.indexed = 0
+        self.started = time.monotonic()
+
+    @property
+    def saved_chunks(self) -> int:
+        # chunk_articles emits ~1400 new characters per 1600-char chunk.
+        return round(self.duplicate_chars / 1400)
+
+    def mark_ready(self, reason: str) -> None:
+        if not self.ready.done():
+            self.ready.set_result(reason)
+            logger.info("Ingestion good enough (%s) after %.2fs: %d articles indexed",
+                        reason, time.monotonic() - self.started, self.existing + self.indexed)
+
+    def fail(self, error: BaseException) -> None:
+        if self.ready.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            self.ready.cancel()
+        else:
+            self.ready.set_exception(error)
+
+
+async def _stage(worker: Callable, workers: int, inbox: asyncio.Queue,
+                 outbox: asyncio.Queue, downstream_workers: int) -> None:
+    '''
+    Runs `workers` copies of worker over inbox; each stops on one None. When
+    all are done, passes one None per downstream worker on.
+    '''
+    await asyncio.gather(*(worker(inbox, outbox) for _ in range(workers)))
+    for _ in range(downstream_workers):
+        await outbox.put(None)
+
+
+async def ingest_topic(topic_index: TopicIndex, user_request: str, progress: IngestProgress,
+                       embed_model: "SentenceTransformer", ready_after: int = 10, deadline: float = 10.0,
+                       fetch_workers: int = 16, queue_size: int = 32, embed_batch: int = 16,
+                       news_backend=None, host_delay: Tuple[float, float] = (1.0, 3.0)) -> IngestProgress:
+    '''
+    Adds the topic's new articles to topic_index through concurrent stages
+    connected by bounded queues:
+
+        links -> fetch -> extract -> dedupe -> chunk -> embed/index
+
+    Links are streamed page by page from iter_google_news. Articles that are
+    near-duplicates of one already in the topic (syndicated copies) are only
+    recorded as alternate sources and never chunked or embedded.
+
+    progress.ready resolves once ready_after articles are indexed (counting
+    those already in the index), deadline seconds have passed, or everything
+    is indexed, whichever comes first. Ingestion keeps going afterwards.
+
+    news_backend is passed to iter_google_news (GoogleNews by default);
+    host_delay is the per-host politeness delay range of the fetch stage.
+
+    Articles that have fallen out of the news window are expired first.
+    Every change to topic_index runs in an executor: it takes the index's
+    lock and saving rewrites its files, which would stall the answers
+    streamed on the same (background) loop.
+    '''
+    loop = asyncio.get_running_loop()
+    try:
+        removed = await loop.run_in_executor(None, topic_index.expire)
+    except BaseException as error:
+        progress.fail(error)
+        raise
+    logger.info("Expired %d chunks older than the news window", removed)
+
+    links_q, pages_q, texts_q, unique_q, chunks_q = (asyncio.Queue(queue_size) for _ in range(5))
+    fetch_pool = ThreadPoolExecutor(fetch_workers, thread_name_prefix="news-fetch")
+    session = make_session(fetch_workers)
+    throttle = HostThrottle(*host_delay)
+    article_cache = get_article_cache()
+    embedding_cache = get_embedding_cache()
+
+    progress.existing = len(topic_index.articles)
+    if progress.existing >= ready_after:
+        progress.mark_ready("cached")
+    deadline_timer = loop.call_later(deadline, progress.mark_ready, "deadline")
+    stopped = threading.Event()  # set once ingestion ends, so list_links gives up
+
+    def hand_over(item) -> bool:
+        # Blocks while links_q is full; False if ingestion stopped meanwhile,
+        # as nothing will empty the queue any more.
+        put = asyncio.run_coroutine_threadsafe(links_q.put(item), loop)
+        while True:
+            try:
+                put.result(timeout=0.5)
+                return True
+            except TimeoutError:
+                if stopped.is_set():
+                    put.cancel()
+                    return False
+
+    def list_links():
+        # Runs in a worker thread and hands each result page to the fetch
+        # stage as soon as it arrives.
+        logger.info("Fetching news data...")
+        known_links = topic_index.known_links()
+        for data in iter_google_news(user_request, backend=news_backend):
+            if stopped.is_set():
+                return
+            dates = data['date'] if 'date' in data else [""] * len(data)
+            published = data['datetime'] if 'datetime' in data else [None] * len(data)
+            cutoff = time.time() - NEWS_WINDOW
+            for link, title, date, published_at in zip(data['link'], data['title'], dates, published):
+                link = clean_link(link)
+                if link in known_links:
+                    continue
+                known_links.add(link)
+                published_at = _published(published_at)
+                if published_at is not None and published_at < cutoff:
+                    # expire() would drop it again straight away.
+                    progress.too_old += 1
+                    continue
+                progress.listed += 1
+                listing = (title, date if isinstance(date, str) else "", published_at)
+                if not hand_over((link, listing)):
+                    return
+        logger.info("Listed %d new articles (%d older than the news window)", progress.listed, progress.too_old)
+
+    async def fetch(inbox, outbox):
+        while (item := await inbox.get()) is not None:
+            link, listing = item
+            page = await loop.run_in_executor(fetch_pool, fetch_page, link, session, throttle, article_cache)
+            progress.fetched += 1
+            await outbox.put((listing, page))
+
+    async def extract(inbox, outbox):
+        while (item := await inbox.get()) is not None:
+            listing, page = item
+            text = await loop.run_in_executor(None, extract_page, page, article_cache)
+            if text == FAILED_DESCRIPTION:
+                # Not recorded, so it is retried on the next refresh.
+                progress.failed += 1
+                continue
+            if not is_usable(text):
+                # Teasers and empty pages: nothing worth deduplicating, chunking or embedding.
+                progress.too_short += 1
+                continue
+            await outbox.put((page.link, listing, text))
+
+    pending_alternates = []
+    near_duplicates = NearDuplicateIndex()
+
+    def seed_near_duplicates():
+        # MinHashes every stored article, which takes a while on large topics.
+        for link in list(topic_index.articles):
+            near_duplicates.add(link, topic_index.store.article_text(link))
+
+    async def dedupe(inbox, outbox):
+        # Off the loop, and while the first pages are still being fetched.
+        await loop.run_in_executor(None, seed_near_duplicates)
+        while (item := await inbox.get()) is not None:
+            link, listing, text = item
+            with span("dedupe") as stage:
+                duplicate_of = await loop.run_in_executor(None, near_duplicates.add, link, text)
+                stage.add(items=1, bytes=len(text), skipped=int(duplicate_of is not None))
+            if duplicate_of is None:
+                await outbox.put(item)
+                continue
+            progress.duplicates += 1
+            progress.duplicate_chars += len(text)
+            if duplicate_of in topic_index.articles:
+                await loop.run_in_executor(None, topic_index.add_alternate, duplicate_of, link)
+            else:
+                # The canonical copy is still on its way through chunk/embed.
+                pending_alternates.append((duplicate_of, link))
+
+    async def chunk(inbox, outbox):
+        while (item := await inbox.get()) is not None:
+            link, listing, text = item
+            spans = await loop.run_in_executor(None, chunk_spans, [text])
+            await outbox.put((link, listing, text, [(start, end) for _, start, end in spans]))
+
+    def add_articles(batch, embeddings):
+        offset = 0
+        for link, (title, date, published_at), text, spans in batch:
+            topic_index.add_article(link, title, text, spans, embeddings[offset:offset + len(spans)], date,
+                                    published_at)
+            offset += len(spans)
+        while pending_alternates and pending_alternates[0][0] in topic_index.articles:
+            topic_index.add_alternate(*pending_alternates.pop(0))
+
+    def finish():
+        for canonical, alternate in pending_alternates:
+            if canonical in topic_index.articles:
+                topic_index.add_alternate(canonical, alternate)
+        topic_index.save()
+
+    async def embed_and_index(inbox, outbox):
+        done = False
+        while not done:
+            item = await inbox.get()
+            if item is None:
+                break
+            batch = [item]
+            # Embed whatever else is already waiting in one model call.
+            while len(batch) < embed_batch and not inbox.empty():
+                item = inbox.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+
+            all_chunks = [text[start:end] for _, _, text, spans in batch for start, end in spans]
+            embeddings = await loop.run_in_executor(
+                None, encode_chunks, all_chunks, embed_model, embedding_cache, topic_index.model_id)
+            await loop.run_in_executor(None, add_articles, batch, embeddings)
+            progress.indexed += len(batch)
+            if progress.existing + progress.indexed >= ready_after:
+                progress.mark_ready("articles")
+
+    async def produce_links():
+        try:
+            await loop.run_in_executor(None, list_links)
+        finally:
+            for _ in range(fetch_workers):
+                await links_q.put(None)
+
+    tasks = [
+        asyncio.ensure_future(produce_links()),
+        asyncio.ensure_future(_stage(fetch, fetch_workers, links_q, pages_q, 2)),
+        asyncio.ensure_future(_stage(extract, 2, pages_q, texts_q, 1)),
+        asyncio.ensure_future(_stage(dedupe, 1, texts_q, unique_q, 1)),
+        asyncio.ensure_future(_stage(chunk, 1, unique_q, chunks_q, 1)),
+        asyncio.ensure_future(_stage(embed_and_index, 1, chunks_q, None, 0)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+        await loop.run_in_executor(None, finish)
+        logger.info("Indexed %d new articles (%d failed, %d too short) in %.2fs", progress.indexed,
+                    progress.failed, progress.too_short, time.monotonic() - progress.started)
+        logger.info("Skipped %d near-duplicate articles: %d chars (~%d chunks) not embedded",
+                    progress.duplicates, progress.duplicate_chars, progress.saved_chunks)
+    except BaseException as error:
+        progress.fail(error)
+        raise
+    finally:
+        # A failed stage would leave the others (and the listing thread) blocked on full queues.
+        stopped.set()
+        for task in tasks:
+            task.cancel()
+        deadline_timer.cancel()
+        progress.mark_ready("complete")
+        fetch_pool.shutdown(wait=False)
+        session.close()
+    return progress
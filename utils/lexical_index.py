@@ -0,0 +1,298 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+import re
+
+import numpy as np
+
+# Fuse BM25 with dense retrieval in NewsPipeline (NEWS_HYBRID_SEARCH=0 turns it off).
+HYBRID_SEARCH = os.getenv("NEWS_HYBRID_SEARCH", "1") != "0"
+# Okapi BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal rank fusion constant: a hit at rank r adds 1 / (RRF_K + r).
+RRF_K = 60
+# New postings are scanned unsorted until there are this many, then sorted into the
+# delta segment, which is merged into the main one once it has MERGE_RATIO of its postings.
+PENDING_POSTINGS = 1 << 16
+MERGE_RATIO = 0.125
+
+# Words, numbers and codenames ("COVID-19", "F-35") as whole tokens, lowercased.
+_TOKEN = re.compile(r"\w+(?:[-'’]\w+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its
+of on or our she so than that the their them then there these they this to was we were
+what when where which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _impacts(tfs: np.ndarray, lengths: np.ndarray, average_length: float) -> np.ndarray:
+    # The BM25 term weight without its idf factor.
+    tfs = tfs.astype(np.float32)
+    return tfs * (BM25_K1 + 1) / (tfs + BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(average_length, 1.0)))
+
+
+class _Segment:
+    '''
+    Postings in CSR form: the rows (documents) containing term t, their
+    term frequencies and BM25 impacts (see _impacts) are
+    rows[offsets[t]:offsets[t + 1]], tfs[...] and impacts[...].
+    '''
+    __slots__ = ("offsets", "rows", "tfs", "impacts")
+
+    def __init__(self, offsets: np.ndarray, rows: np.ndarray, tfs: np.ndarray, impacts: np.ndarray):
+        self.offsets, self.rows, self.tfs, self.impacts = offsets, rows, tfs, impacts
+
+    @classmethod
+    def empty(cls) -> "_Segment":
+        return cls(np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16),
+                   np.empty(0, dtype=np.float32))
+
+    @classmethod
+    def build(cls, terms: np.ndarray, rows: np.ndarray, tfs: np.ndarray, n_terms: int,
+              lengths: np.ndarray, average_length: float) -> "_Segment":
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=offsets[1:])
+        rows, tfs = rows[order].astype(np.int32), tfs[order].astype(np.uint16)
+        return cls(offsets, rows, tfs, _impacts(tfs, lengths[rows], average_length))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        (rows, impacts) of term.
+        '''
+        if term + 1 >= len(self.offsets):
+            return self.rows[:0], self.impacts[:0]
+        start, end = self.offsets[term], self.offsets[term + 1]
+        return self.rows[start:end], self.impacts[start:end]
+
+    def triples(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        terms = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+        return terms, self.rows, self.tfs
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.rows.nbytes + self.tfs.nbytes + self.impacts.nbytes
+
+
+class LexicalIndex:
+    '''
+    Incremental in-memory BM25 index over chunk ids, kept next to the FAISS
+    index so exact names, places and codenames the dense embedding blurs can
+    still be matched.
+
+    Postings live in two CSR segments of int32 rows, uint16 term frequencies
+    and float32 BM25 impacts (the term weight before idf): a main one and a
+    small delta that is merged into the main one once it reaches MERGE_RATIO
+    of its size, so adding chunks costs amortized O(new postings) and never
+    happens while searching. The postings of the latest chunks wait unsorted
+    until there are PENDING_POSTINGS of them. A query adds idf * impact of
+    its terms' postings into a score array instead of looping over
+    documents. Impacts are normalised by the average chunk length when their
+    segment was built. Removed chunks are masked out and dropped at the next
+    merge; until then they still count in the document frequencies.
+    '''
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self._main = _Segment.empty()
+        self._delta = _Segment.empty()
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []  # (terms, rows, tfs) not in a segment yet
+        self._pending_postings = 0
+        self._chunk_ids = np.empty(0, dtype=np.int64)  # row -> chunk id
+        self._lengths = np.empty(0, dtype=np.int32)    # row -> tokens
+        self._alive = np.empty(0, dtype=bool)
+        self._rows: Dict[int, int] = {}                # chunk id -> row
+        self._df = np.empty(0, dtype=np.int32)         # term -> documents containing it
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, chunk_ids: Sequence[int], texts: Sequence[str]) -> None:
+        '''
+        Indexes texts under chunk_ids (ids already indexed are skipped).
+        '''
+        first_row = len(self._chunk_ids)
+        new_ids, lengths, terms, rows, tfs = [], [], [], [], []
+        for chunk_id, text in zip(chunk_ids, texts):
+            if chunk_id in self._rows:
+                continue
+            row = first_row + len(new_ids)
+            counts: Dict[int, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                term = self.vocabulary.setdefault(token, len(self.vocabulary))
+                counts[term] = counts.get(term, 0) + 1
+            self._rows[chunk_id] = row
+            new_ids.append(chunk_id)
+            lengths.append(len(tokens))
+            terms.extend(counts)
+            rows.extend([row] * len(counts))
+            tfs.extend(min(tf, 0xFFFF) for tf in counts.values())
+        if not new_ids:
+            return
+        self._chunk_ids = np.concatenate([self._chunk_ids, np.array(new_ids, dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.array(lengths, dtype=np.int32)])
+        self._alive = np.concatenate([self._alive, np.ones(len(new_ids), dtype=bool)])
+        self._total_length += sum(lengths)
+        terms = np.array(terms, dtype=np.int64)
+        if len(self._df) < len(self.vocabulary):
+            self._df = np.concatenate([self._df, np.zeros(len(self.vocabulary) - len(self._df), dtype=np.int32)])
+        self._df += np.bincount(terms, minlength=len(self._df)).astype(np.int32)
+        self._pending.append((terms, np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.uint16)))
+        self._pending_postings += len(terms)
+        if self._pending_postings >= PENDING_POSTINGS:
+            self._flush()
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        for chunk_id in chunk_ids:
+            row = self._rows.pop(chunk_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self._total_length -= int(self._lengths[row])
+
+    def _flush(self) -> None:
+        # Folds the pending postings into the delta segment, and the delta into
+        # the main segment when it has grown large enough.
+        if not self._pending:
+            return
+        parts = [self._delta.triples()] + self._pending
+        self._pending, self._pending_postings = [], 0
+        terms, rows, tfs = (np.concatenate(column) for column in zip(*parts))
+        if len(terms) >= MERGE_RATIO * len(self._main):
+            self._merge(terms, rows, tfs)
+        else:
+            self._delta = _Segment.build(terms, rows, tfs, len(self.vocabulary), self._lengths,
+                                         self._average_length())
+
+    def _merge(self, terms: np.ndarray, rows: np.ndarray, tfs: np.ndarray) -> None:
+        main_terms, main_rows, main_tfs = self._main.triples()
+        terms = np.concatenate([main_terms, terms])
+        rows = np.concatenate([main_rows, rows])
+        tfs = np.concatenate([main_tfs, tfs])
+        # Drop removed chunks and renumber the rows that are left.
+        keep = self._alive[rows]
+        renumber = np.cumsum(self._alive) - 1
+        terms, rows, tfs = terms[keep], renumber[rows[keep]], tfs[keep]
+        self._chunk_ids = self._chunk_ids[self._alive]
+        self._lengths = self._lengths[self._alive]
+        self._alive = np.ones(len(self._chunk_ids), dtype=bool)
+        self._rows = {int(chunk_id): row for row, chunk_id in enumerate(self._chunk_ids)}
+        self._df = np.bincount(terms, minlength=len(self.vocabulary)).astype(np.int32)
+        self._main = _Segment.build(terms, rows, tfs, len(self.vocabulary), self._lengths, self._average_length())
+        self._delta = _Segment.empty()
+
+    def _average_length(self) -> float:
+        return self._total_length / max(len(self._rows), 1)
+
+    def compact(self) -> None:
+        '''
+        Merges everything into the main segment and drops removed chunks.
+        '''
+        self._flush()
+        self._merge(*self._delta.triples())
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        BM25 top-k for query as (chunk ids, scores), best first; only chunks
+        sharing at least one term with the query are returned.
+        '''
+        terms = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        n_docs = len(self._rows)
+        if not terms or not n_docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        terms = list(terms)
+        df = self._df[terms]
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        scores = np.zeros(len(self._chunk_ids), dtype=np.float32)
+        for term, term_idf in zip(terms, idf):
+            for segment in (self._main, self._delta):
+                rows, impacts = segment.postings(term)
+                if len(rows):
+                    # A document has one posting per term and segment, so rows are unique here.
+                    scores[rows] += term_idf * impacts
+        if self._pending:
+            pending_terms, pending_rows, pending_tfs = (np.concatenate(column) for column in zip(*self._pending))
+            matches = np.isin(pending_terms, terms)
+            if matches.any():
+                rows = pending_rows[matches]
+                idf_of = np.zeros(len(self._df), dtype=np.float32)
+                idf_of[terms] = idf
+                weights = idf_of[pending_terms[matches]] * _impacts(pending_tfs[matches], self._lengths[rows],
+                                                                    self._average_length())
+                scores += np.bincount(rows, weights, minlength=len(scores)).astype(np.float32)
+        scores[~self._alive] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return self._chunk_ids[candidates], scores[candidates].astype(np.float32)
+
+    def nbytes(self) -> int:
+        arrays = (self._chunk_ids, self._lengths, self._alive, self._df)
+        return (self._main.nbytes() + self._delta.nbytes() + sum(array.nbytes for array in arrays)
+                + sum(len(terms) * 14 for terms, _, _ in self._pending)
+                + 80 * (len(self.vocabulary) + len(self._rows)))  # dict entries, roughly
+
+    def save(self, path: str) -> None:
+        self.compact()
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, "wb") as file:
+            np.savez(file, vocabulary="\n".join(vocabulary), offsets=self._main.offsets, rows=self._main.rows,
+                     tfs=self._main.tfs, chunk_ids=self._chunk_ids, lengths=self._lengths)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        index = cls()
+        with np.load(path) as data:
+            words = str(data["vocabulary"])
+            index.vocabulary = {word: term for term, word in enumerate(words.split("\n"))} if words else {}
+            offsets, rows, tfs = data["offsets"], data["rows"], data["tfs"]
+            index._chunk_ids = data["chunk_ids"]
+            index._lengths = data["lengths"]
+        index._alive = np.ones(len(index._chunk_ids), dtype=bool)
+        index._rows = {int(chunk_id): row for row, chunk_id in enumerate(index._chunk_ids)}
+        index._df = np.diff(offsets).astype(np.int32)
+        index._total_length = int(index._lengths.sum())
+        impacts = _impacts(tfs, index._lengths[rows], index._average_length())
+        index._main = _Segment(offsets, rows, tfs, impacts)
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int,
+                           rrf_k: int = RRF_K) -> List[Tuple[int, float]]:
+    '''
+    Fuses ranked id lists (best first, -1 entries ignored) into the top k
+    (id, score) pairs, where an id scores sum(1 / (rrf_k + rank)) over the
+    lists it appears in (rank starting at 1).
+    '''
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            chunk_id = int(chunk_id)
+            if chunk_id >= 0:
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def fuse(dense_ids: np.ndarray, lexical: Optional[Sequence[np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    RRF of each query's dense ranking (a row of faiss search ids) with its
+    lexical ranking, in faiss.Index.search's format: (n, k) arrays of scores
+    and ids, -1 padded. Scores are negated RRF scores, so lower is closer as
+    with L2 distances.
+    '''
+    n = len(dense_ids)
+    scores = np.full((n, k), np.inf, dtype=np.float32)
+    ids = np.full((n, k), -1, dtype=np.int64)
+    for row in range(n):
+        rankings = [dense_ids[row]] + ([lexical[row]] if lexical is not None else [])
+        for column, (chunk_id, score) in enumerate(reciprocal_rank_fusion(rankings, k)):
+            scores[row, column], ids[row, column] = -score, chunk_id
+    return scores, ids
@@ -0,0 +1,170 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+import bisect
+import threading
+import time
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional; spans are only exported when it is installed
+    otel_trace = None
+
+# Stages of NewsPipeline, in pipeline order.
+STAGES = ("fetch", "scrape", "dedupe", "chunk", "embed", "index", "retrieve", "lexical", "rerank", "prompt", "generate")
+COUNTERS = {
+    "items": "Items processed (pages, articles, chunks, hits or stream chunks)",
+    "bytes": "Bytes of text or HTML processed",
+    "cache_hits": "Items served from a cache",
+    "failures": "Items that failed without raising (e.g. 'Failed to retrieve the webpage.')",
+    "skipped": "Items dropped on purpose (near-duplicates)",
+    "errors": "Spans that ended with an exception",
+}
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    '''
+    One timed run of a stage. Counts are added with add() while it is open.
+    '''
+    __slots__ = ("stage", "counts", "started", "duration")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.counts: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def add(self, **counts: int) -> None:
+        for name, value in counts.items():
+            if name not in COUNTERS:
+                raise ValueError(f"Unknown span counter '{name}', expected one of {sorted(COUNTERS)}")
+            self.counts[name] = self.counts.get(name, 0) + value
+
+
+class Metrics:
+    '''
+    In-process registry of per-stage counters and latency histograms,
+    rendered in the Prometheus text exposition format.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def inc(self, name: str, stage: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name, stage] = self._counters.get((name, stage), 0) + value
+
+    def observe(self, name: str, stage: str, value: float,
+                buckets: Tuple[float, ...] = DURATION_BUCKETS, help: str = "") -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, stage))
+            if histogram is None:
+                histogram = self._histograms[name, stage] = _Histogram(buckets)
+                self._help.setdefault(name, help)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[Span]:
+        '''
+        Times the block as one run of stage and records the counts added to
+        the yielded Span; also exported as an OpenTelemetry span when available.
+        '''
+        span = Span(stage)
+        otel_span = None
+        if otel_trace is not None:
+            otel_span = otel_trace.get_tracer("news_pipeline").start_span(f"news.{stage}", attributes={
+                key: value for key, value in attributes.items() if isinstance(value, (str, int, float, bool))
+            })
+        try:
+            yield span
+        except Exception:  # not cancellation or a closed generator
+            span.add(errors=1)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.started
+            self.observe("news_stage_duration_seconds", stage, span.duration,
+                         help="Duration of one run of a pipeline stage")
+            for name, value in span.counts.items():
+                self.inc(f"news_stage_{name}_total", stage, value)
+            if otel_span is not None:
+                for name, value in span.counts.items():
+                    otel_span.set_attribute(f"news.{name}", value)
+                otel_span.end()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        '''
+        {stage: {"runs", "seconds", <counter>...}} for logging and benchmarks.
+        '''
+        with self._lock:
+            stats: Dict[str, Dict[str, float]] = {}
+            for (name, stage), histogram in self._histograms.items():
+                if name == "news_stage_duration_seconds":
+                    stats.setdefault(stage, {}).update(runs=histogram.count, seconds=histogram.sum)
+            for (name, stage), value in self._counters.items():
+                stats.setdefault(stage, {})[name[len("news_stage_"):-len("_total")]] = value
+            return stats
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# HELP {name} {self._help.get(name, '')}".rstrip())
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, stage), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            for name in sorted({name for name, _ in self._counters}):
+                counter = name[len("news_stage_"):-len("_total")]
+                lines.append(f"# HELP {name} {COUNTERS.get(counter, '')}".rstrip())
+                lines.append(f"# TYPE {name} counter")
+                for (metric, stage), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{{stage="{stage}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+METRICS = Metrics()
+
+
+def span(stage: str, **attributes):
+    return METRICS.span(stage, **attributes)
+
+
+def observe(name: str, stage: str, value: float, help: str = "") -> None:
+    METRICS.observe(name, stage, value, help=help)
+
+
+def render_prometheus() -> str:
+    return METRICS.render_prometheus()
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    return METRICS.snapshot()
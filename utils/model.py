@@ -1,23 +1,150 @@
-from groq import Groq
-from typing import List, Any
+from typing import TYPE_CHECKING, List, Any, AsyncIterator, Optional
 from  dotenv import load_dotenv
+import asyncio
+import logging
 import os
+import random
 
-async def get_model_response(messages: List[dict], model_id: str = "llama3-70b-8192", temperature: float = 0.2, top_p: float = 1.0, stream: bool = True) -> Any:
-    load_dotenv()
-    api_key = os.getenv('GROQ_API_KEY')
-    client = Groq(api_key=api_key)
+from utils.background import get_background_loop, submit
 
-    response_stream = client.chat.completions.create(
-        model=model_id,
-        messages=messages,
-        temperature=temperature,
-        top_p=top_p,
-        stream=stream,
-    )
+if TYPE_CHECKING:  # groq (and httpx under it) is imported with the first client
+    from groq import AsyncGroq
 
-    for chunk in response_stream:
-        yield chunk
+load_dotenv()
 
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))          # seconds per read/write
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
 
+logger = logging.getLogger(__name__)
 
+_client: Optional["AsyncGroq"] = None
+_DONE = object()
+
+
+def get_async_client() -> "AsyncGroq":
+    '''
+    The process-wide AsyncGroq client. It lives on the background loop so its
+    pooled keep-alive connections are reused by every request and session,
+    whichever loop they were started from. Retries are done by
+    get_model_response, not by the SDK.
+    '''
+    global _client
+    if _client is None:
+        import httpx
+        from groq import AsyncGroq, DefaultAsyncHttpxClient
+        timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        _client = AsyncGroq(
+            api_key=os.getenv('GROQ_API_KEY'),
+            timeout=timeout,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=16),
+            ),
+        )
+    return _client
+
+
+def _is_retryable(error: Exception) -> bool:
+    from groq import APIConnectionError, APIStatusError
+    if isinstance(error, APIConnectionError):  # includes timeouts
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in RETRY_STATUS
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    from groq import APIStatusError
+    retry_after = None
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+    except ValueError:
+        pass
+    # Full jitter, so sessions that failed together don't retry together.
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def _stream_completion(messages: List[dict], max_retries: int, **params) -> AsyncIterator[Any]:
+    '''
+    Streams chunks on the background loop. Requests are retried until the first
+    chunk arrives; after that a failure is raised, since the caller has
+    already seen part of the answer.
+    '''
+    from groq import APIConnectionError, APIStatusError
+    client = get_async_client()
+    attempt = 0
+    while True:
+        started = False
+        try:
+            response_stream = await client.chat.completions.create(messages=messages, **params)
+            try:
+                async for chunk in response_stream:
+                    started = True
+                    yield chunk
+            finally:
+                # Closes the HTTP response when the consumer stops early or is cancelled.
+                await response_stream.close()
+            return
+        except (APIConnectionError, APIStatusError) as e:
+            if started or attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = _retry_delay(attempt, e)
+            attempt += 1
+            logger.warning("LLM request failed (%s), retry %d/%d in %.2fs",
+                           e.__class__.__name__, attempt, max_retries, delay)
+            await asyncio.sleep(delay)
+
+
+async def get_model_response(messages: List[dict], model_id: str = "llama3-70b-8192", temperature: float = 0.2, top_p: float = 1.0, stream: bool = True,
+                             max_retries: int = LLM_MAX_RETRIES) -> Any:
+    '''
+    Streams chat completion chunks without blocking the caller's event loop.
+
+    The request runs on the background loop with the shared client; chunks
+    are handed to the caller's loop as they arrive, so generations of several
+    sessions interleave. Closing or cancelling the consumer cancels the request.
+    '''
+    params = dict(model=model_id, temperature=temperature, top_p=top_p, stream=stream)
+    loop = asyncio.get_running_loop()
+    if loop is get_background_loop():
+        chunks = _stream_completion(messages, max_retries, **params)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def hand_over(item) -> None:
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    async def pump() -> None:
+        chunks = _stream_completion(messages, max_retries, **params)
+        try:
+            async for chunk in chunks:
+                hand_over(chunk)
+            hand_over(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            hand_over(e)
+        finally:
+            await chunks.aclose()
+
+    pumping = submit(pump())
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        pumping.cancel()
@@ -0,0 +1,121 @@
+from typing import TYPE_CHECKING, Callable, Dict, Union
+import logging
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:  # sentence_transformers pulls in torch; it is imported when a model is loaded
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+EMBEDDING_MODEL_ID = 'all-MiniLM-L6-v2'
+RERANK_MODEL_ID = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+logger = logging.getLogger(__name__)
+
+_models: Dict[str, Union["SentenceTransformer", "CrossEncoder"]] = {}
+_stats: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def resident_memory_mb() -> float:
+    '''
+    Current resident set size of the process in MB (peak RSS where /proc is unavailable).
+    '''
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_embedding_model(model_id: str = EMBEDDING_MODEL_ID) -> "SentenceTransformer":
+    '''
+    Returns the process-wide instance of model_id, loading it on first use.
+    Every NewsPipeline and Streamlit session shares the same weights.
+    '''
+    def load(model_id: str) -> "SentenceTransformer":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_id)
+    return _get(model_id, load)
+
+
+def get_cross_encoder(model_id: str = RERANK_MODEL_ID) -> "CrossEncoder":
+    '''
+    Returns the process-wide cross-encoder model_id (see utils.rerank), loading it on first use.
+    '''
+    def load(model_id: str) -> "CrossEncoder":
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_id)
+    return _get(model_id, load)
+
+
+def _get(model_id: str, load: Callable[[str], Union["SentenceTransformer", "CrossEncoder"]]):
+    model = _models.get(model_id)
+    if model is not None:
+        return model
+
+    with _lock:
+        if model_id not in _models:
+            rss_before = resident_memory_mb()
+            start = time.perf_counter()
+            _models[model_id] = load(model_id)
+            _stats[model_id] = {
+                "model_id": model_id,
+                "load_seconds": time.perf_counter() - start,
+                "resident_mb": resident_memory_mb() - rss_before,
+            }
+            logger.info("Loaded model '%s' in %.2fs (+%.0f MB resident)",
+                        model_id, _stats[model_id]["load_seconds"], _stats[model_id]["resident_mb"])
+        return _models[model_id]
+
+
+def warmup(model_id: str = EMBEDDING_MODEL_ID) -> dict:
+    '''
+    Loads model_id and runs one encode so the first real request does not pay
+    for weight loading or lazy kernel initialisation. With NEWS_RERANK=1 the
+    shared reranker's cross-encoder is warmed up too, which also seeds its
+    cost estimate (see Reranker.warmup). Returns the embedding model's load stats.
+    '''
+    model = get_embedding_model(model_id)
+    start = time.perf_counter()
+    model.encode(["warmup"], convert_to_numpy=True)
+    _stats[model_id]["warmup_seconds"] = time.perf_counter() - start
+    _stats[model_id]["process_rss_mb"] = resident_memory_mb()
+    logger.info("Warmed up '%s' in %.2fs (process RSS %.0f MB)", model_id,
+                _stats[model_id]["warmup_seconds"], _stats[model_id]["process_rss_mb"])
+
+    from utils.rerank import RERANK_ENABLED, get_reranker  # utils.rerank imports this module
+    if RERANK_ENABLED:
+        reranker = get_reranker()
+        start = time.perf_counter()
+        ms_per_pair = reranker.warmup()
+        if reranker.model_id in _stats:
+            _stats[reranker.model_id].update(warmup_seconds=time.perf_counter() - start, ms_per_pair=ms_per_pair)
+    return dict(_stats[model_id])
+
+
+def model_id_of(model) -> str:
+    '''
+    The id embeddings of model are cached and indexed under: its id if it
+    is a shared model, else its model_id attribute, else its class.
+    '''
+    for model_id, shared in list(_models.items()):
+        if shared is model:
+            return model_id
+    return getattr(model, "model_id", None) or f"{type(model).__module__}.{type(model).__qualname__}"
+
+
+def model_stats() -> Dict[str, dict]:
+    return {model_id: dict(stats) for model_id, stats in _stats.items()}
+
+
+def is_loaded(model_id: str = EMBEDDING_MODEL_ID) -> bool:
+    return model_id in _models
@@ -1,30 +1,100 @@
-from GoogleNews import GoogleNews
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterator, List
+import copy
 
+if TYPE_CHECKING:  # GoogleNews and pandas are imported when the first search runs
+    import pandas as pd
 
-def get_google_news(user_request):
+# 'date' is kept for citations, 'datetime' (the parsed publication time) for expiry.
+UNUSED_COLUMNS = ['media', 'desc', 'img']
+
+
+class GoogleNewsBackend:
+    '''
+    Thin wrapper over GoogleNews that fetches individual result pages.
+    GoogleNews keeps request state on the instance, so every page is fetched
+    on a shallow copy and pages can be requested from several threads.
     '''
-    Function is used to get recent 7 days news link based on user request
 
-    Input: user_request<str>
-    Returns: df<pd.DataFrame>
+    def __init__(self, period: str = '7d'):
+        from GoogleNews import GoogleNews
+        self._googlenews = GoogleNews(period=period)
+
+    def search(self, user_request: str) -> List[Dict]:
+        self._googlenews.search(user_request)
+        return list(self._googlenews.result())
+
+    def page(self, page: int) -> List[Dict]:
+        return copy.copy(self._googlenews).page_at(page)
+
+
+def iter_google_news(user_request: str, limit: int = 100, max_pages: int = 49,
+                     concurrency: int = 4, backend=None) -> Iterator["pd.DataFrame"]:
     '''
-    googlenews = GoogleNews(period='7d')
-    googlenews.search(user_request)
+    Yields batches of unique (by title) news results as their pages arrive.
 
-    all_results = []
-    for i in range(1, 50):
-        googlenews.getpage(i)
-        result = googlenews.result()
+    Up to `concurrency` result pages are fetched at once. Pagination stops as
+    soon as `limit` unique results were yielded, a page comes back empty or
+    max_pages is reached.
+    '''
+    import pandas as pd
+    backend = backend or GoogleNewsBackend()
+    seen_titles = set()
+    remaining = limit
 
-        if result:
-            all_results.extend(result)
+    def unique(results: List[Dict]) -> List[Dict]:
+        nonlocal remaining
+        batch = []
+        for result in results:
+            if remaining <= 0:
+                break
+            if result.get('title') in seen_titles:
+                continue
+            seen_titles.add(result.get('title'))
+            batch.append(result)
+            remaining -= 1
+        return batch
 
-        if len(all_results) >= 100:
-            break
+    def frame(batch: List[Dict]) -> "pd.DataFrame":
+        return pd.DataFrame(batch).drop(columns=UNUSED_COLUMNS, errors='ignore')
 
-    df = pd.DataFrame(all_results).drop_duplicates(
-        subset=['title'], keep='last').head(100)
-    df.reset_index(drop=True, inplace=True)
-    data = df.drop(columns = ['media', 'date', 'datetime', 'desc', 'img'])
+    batch = unique(backend.search(user_request))
+    if batch:
+        yield frame(batch)
+
+    pending = {}
+    next_page = 1
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while remaining > 0:
+            while len(pending) < concurrency and next_page <= max_pages:
+                pending[next_page] = pool.submit(backend.page, next_page)
+                next_page += 1
+            if not pending:
+                break
+
+            # Consume in page order so results keep Google's ranking.
+            results = pending.pop(min(pending)).result()
+            if not results:
+                break
+            batch = unique(results)
+            if batch:
+                yield frame(batch)
+    finally:
+        # Pages still in flight are not needed any more; don't wait for them.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def get_google_news(user_request, backend=None):
+    '''
+    Function is used to get recent 7 days news link based on user request
+
+    Input: user_request<str>
+    Returns: df<pd.DataFrame>
+    '''
+    batches = list(iter_google_news(user_request, backend=backend))
+    import pandas as pd
+    if not batches:
+        return pd.DataFrame(columns=['title', 'date', 'datetime', 'link'])
+    data = pd.concat(batches, ignore_index=True)
     return data
@@ -0,0 +1,138 @@
+from collections import Counter
+from contextlib import contextmanager
+from html import escape
+from typing import Dict, Iterator, Optional
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+
+from utils.article_cache import CACHE_DIR
+
+# Requests slower than this many seconds get a flame graph; 0 (the default) disables profiling.
+PROFILE_SLOW_SECONDS = float(os.getenv("NEWS_PROFILE_SLOW_SECONDS", "0"))
+PROFILE_INTERVAL = float(os.getenv("NEWS_PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    '''
+    Samples the stacks of every thread each `interval` seconds from a
+    background thread and counts them as folded stacks
+    ("thread;outer;...;inner" -> samples), the input format of flame graphs.
+    '''
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="news-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+
+def write_folded(stacks: Counter, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+
+
+def render_flamegraph(stacks: Counter, title: str = "", width: int = 1200, row_height: int = 16) -> str:
+    '''
+    Renders folded stacks as a self-contained SVG flame graph (hover a frame
+    for its name and share of samples).
+    '''
+    root: Dict = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+    total = max(root["count"], 1)
+
+    rects = []
+    depth_seen = [0]
+
+    def layout(node: Dict, x: float, depth: int) -> None:
+        depth_seen[0] = max(depth_seen[0], depth)
+        for name, child in sorted(node["children"].items()):
+            w = child["count"] / total * width
+            if w >= 0.5:
+                rects.append((x, depth, w, name, child["count"]))
+                layout(child, x, depth + 1)
+            x += w
+
+    layout(root, 0.0, 0)
+    height = (depth_seen[0] + 2) * row_height
+    svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'font-family="monospace" font-size="11">',
+           f'<text x="4" y="{row_height - 4}">{escape(title)} ({total} samples)</text>']
+    for x, depth, w, name, count in rects:
+        y = height - (depth + 1) * row_height
+        hue = 20 + zlib.crc32(name.encode("utf-8")) % 40
+        label = escape(name[:int(w / 7)]) if w > 21 else ""
+        svg.append(f'<g><title>{escape(name)} ({count} samples, {100 * count / total:.1f}%)</title>'
+                   f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" '
+                   f'fill="hsl({hue},90%,60%)"/><text x="{x + 2:.1f}" y="{y + row_height - 4}">{label}</text></g>')
+    svg.append("</svg>")
+    return "\n".join(svg)
+
+
+@contextmanager
+def profile_if_slow(name: str, threshold: float = PROFILE_SLOW_SECONDS,
+                    interval: float = PROFILE_INTERVAL) -> Iterator[Optional[SamplingProfiler]]:
+    '''
+    Samples the block when threshold > 0 and, if it takes at least threshold
+    seconds, writes its stacks to PROFILE_DIR as <name>-<time>.folded and a
+    .svg flame graph. A no-op when threshold is 0.
+    '''
+    if threshold <= 0:
+        yield None
+        return
+    profiler = SamplingProfiler(interval).start()
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        stacks = profiler.stop()
+        elapsed = time.perf_counter() - start
+        if elapsed >= threshold and stacks:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            slug = re.sub(r"[^\w-]+", "_", name)[:60]
+            base = os.path.join(PROFILE_DIR, f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}")
+            write_folded(stacks, base + ".folded")
+            with open(base + ".svg", "w", encoding="utf-8") as file:
+                file.write(render_flamegraph(stacks, f"{name}: {elapsed:.2f}s"))
+            logger.warning("Slow request '%s' took %.2fs; flame graph written to %s.svg", name, elapsed, base)
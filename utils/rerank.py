@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from utils.extract_document import Hit
+from utils.metrics import observe, span
+from utils.model_registry import RERANK_MODEL_ID, get_cross_encoder
+
+# NEWS_RERANK=1 has NewsPipeline rerank with the shared cross-encoder by default.
+RERANK_ENABLED = os.getenv("NEWS_RERANK", "0") == "1"
+RERANK_BUDGET_MS = float(os.getenv("NEWS_RERANK_BUDGET_MS", "150"))
+RERANK_CANDIDATES = int(os.getenv("NEWS_RERANK_CANDIDATES", "30"))
+# Cost assumed per (query, chunk) pair before the first forward pass was timed:
+# ms-marco-MiniLM-L-6 on one CPU core, chunks truncated at 512 tokens.
+DEFAULT_MS_PER_PAIR = 4.0
+# Share of the budget planned for, leaving room for the batch overhead and jitter.
+BUDGET_HEADROOM = 0.8
+# A chunk-sized passage (~1600 characters, see utils.chunking) to time the model on.
+_WARMUP_PASSAGE = "Officials said the operation was launched early on Wednesday morning. " * 23
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class Reranker:
+    '''
+    Re-orders retrieved chunks by a cross-encoder's (query, chunk) relevance.
+
+    rerank() scores every candidate that is not cached yet in one batched
+    forward pass, within budget_ms per query: from a running estimate of the
+    cost per pair it plans how many of the closest uncached candidates fit,
+    drops the rest of the shortlist, and leaves the dense order untouched
+    when fewer than min_pairs would fit. Scores are cached per (query, chunk
+    text) for follow-ups and retries; stats() reports how often reranking
+    ran, was shrunk or skipped, and what it cost.
+
+    model is anything with CrossEncoder.predict(pairs); it defaults to the
+    shared model_id, loaded on first use.
+    '''
+
+    def __init__(self, model=None, model_id: str = RERANK_MODEL_ID, budget_ms: float = RERANK_BUDGET_MS,
+                 candidates: int = RERANK_CANDIDATES, min_pairs: int = 4, cache_size: int = 20_000,
+                 ms_per_pair: float = DEFAULT_MS_PER_PAIR):
+        self.model = model
+        self.model_id = model_id
+        self.budget_ms = budget_ms
+        self.candidates = candidates
+        self.min_pairs = min_pairs
+        self.cache_size = cache_size
+        self.ms_per_pair = ms_per_pair
+        self._cache: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "reranked": 0, "shrunk": 0, "skipped": 0,
+                          "pairs_scored": 0, "cache_hits": 0}
+        self._total_ms = 0.0
+
+    def _cached(self, key: Tuple[str, bytes]) -> Optional[float]:
+        score = self._cache.get(key)
+        if score is not None:
+            self._cache.move_to_end(key)
+        return score
+
+    def _plan(self, n_uncached: int) -> int:
+        # How many uncached pairs fit into the budget.
+        return min(n_uncached, int(BUDGET_HEADROOM * self.budget_ms / max(self.ms_per_pair, 1e-3)))
+
+    def rerank(self, query: str, hits: Sequence[Hit], k: int) -> List[Hit]:
+        '''
+        The k best of hits (closest first, as retrieved) by cross-encoder
+        score. Hit.score becomes the negated score, so lower is still closer.
+        '''
+        with span("rerank") as stage:
+            keys = [(query, _digest(hit.text)) for hit in hits]
+            with self._lock:
+                self._counters["queries"] += 1
+                scores: Dict[int, float] = {}
+                for i, key in enumerate(keys):
+                    score = self._cached(key)
+                    if score is not None:
+                        scores[i] = score
+                uncached = [i for i in range(len(hits)) if i not in scores]
+                fits = self._plan(len(uncached))
+                if len(hits) <= 1:
+                    return list(hits[:k])
+                if uncached and fits < min(self.min_pairs, len(uncached)):
+                    self._counters["skipped"] += 1
+                    stage.add(skipped=1)
+                    # Lower the estimate a little on every skip, so a few slow passes
+                    # (e.g. under load) do not switch reranking off for good.
+                    self.ms_per_pair *= 0.95
+                    logger.debug("Skipped reranking %d candidates: ~%.1f ms per pair, budget %.0f ms",
+                                 len(uncached), self.ms_per_pair, self.budget_ms)
+                    return list(hits[:k])
+                if fits < len(uncached):
+                    # Drop the uncached candidates the dense ranking put last.
+                    self._counters["shrunk"] += 1
+                    keep = sorted(set(scores) | set(uncached[:fits]))
+                    hits, keys = [hits[i] for i in keep], [keys[i] for i in keep]
+                    scores = {new: scores[old] for new, old in enumerate(keep) if old in scores}
+                    uncached = [i for i in range(len(hits)) if i not in scores]
+                self._counters["cache_hits"] += len(scores)
+
+            if uncached:
+                model = self.model if self.model is not None else get_cross_encoder(self.model_id)
+                start = time.perf_counter()
+                predicted = model.predict([(query, hits[i].text) for i in uncached], batch_size=len(uncached),
+                                          show_progress_bar=False)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                observe("news_rerank_seconds", "rerank", elapsed_ms / 1000,
+                        help="Time of the cross-encoder forward pass of one query")
+                with self._lock:
+                    # Smoothed, so one slow pass (e.g. the first, warming up) does not disable reranking.
+                    self.ms_per_pair = 0.7 * self.ms_per_pair + 0.3 * elapsed_ms / len(uncached)
+                    self._counters["pairs_scored"] += len(uncached)
+                    self._total_ms += elapsed_ms
+                    for i, score in zip(uncached, predicted):
+                        scores[i] = float(score)
+                        self._cache[keys[i]] = float(score)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            with self._lock:
+                self._counters["reranked"] += 1
+            stage.add(items=len(hits), cache_hits=len(hits) - len(uncached))
+
+        order = sorted(range(len(hits)), key=lambda i: -scores[i])[:k]
+        return [hits[i]._replace(score=-scores[i]) for i in order]
+
+    def warmup(self) -> float:
+        '''
+        Loads the model, runs it once, then times a forward pass over min_pairs
+        chunk-sized pairs and seeds the cost estimate with it, so the first
+        queries are planned from this machine's speed rather than
+        DEFAULT_MS_PER_PAIR. Returns the measured ms per pair.
+        '''
+        model = self.model if self.model is not None else get_cross_encoder(self.model_id)
+        # The first pass pays for lazy initialisation and would overstate the cost.
+        model.predict([("warmup", "warmup")], show_progress_bar=False)
+        pairs = [("warmup query", _WARMUP_PASSAGE)] * self.min_pairs
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        ms_per_pair = (time.perf_counter() - start) * 1000 / len(pairs)
+        with self._lock:
+            self.ms_per_pair = ms_per_pair
+        logger.info("Warmed up reranker '%s': %.1f ms per pair", self.model_id, ms_per_pair)
+        return ms_per_pair
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            ran = stats["reranked"]
+            stats.update({
+                "run_rate": ran / stats["queries"] if stats["queries"] else 0.0,
+                "total_ms": self._total_ms,
+                "mean_ms": self._total_ms / ran if ran else 0.0,
+                "ms_per_pair": self.ms_per_pair,
+                "budget_ms": self.budget_ms,
+                "cache_entries": len(self._cache),
+            })
+            return stats
+
+
+_default_reranker: Optional[Reranker] = None
+_default_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    '''
+    The process-wide Reranker, so every session shares its score cache and cost estimate.
+    '''
+    global _default_reranker
+    with _default_lock:
+        if _default_reranker is None:
+            _default_reranker = Reranker()
+        return _default_reranker
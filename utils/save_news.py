@@ -1,12 +1,15 @@
 import os
 from utils.news_fetcher import get_google_news
 from utils.scraper import download_latest_news
+from utils.dedup import deduplicate
 
 
 
 def save_news(user_request):
     data = get_google_news(user_request)
     data = download_latest_news(data)
+    data, dropped = deduplicate(data)
+    print(f"Dropped {dropped} near-duplicate articles.")
     folder_name = "NEWS_data"
     os.makedirs(folder_name, exist_ok=True)
 
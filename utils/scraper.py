@@ -1,43 +1,202 @@
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
 import re
 import time
+import threading
 import requests
 import random
+from requests.adapters import HTTPAdapter
 
-def download_latest_news(data):
-    latest_links = [re.split("&ved", link)[0] for link in data['link']]
+from utils.article_cache import ArticleCache
+from utils.constants import FAILED_DESCRIPTION
+from utils.html_extract import Extractor, get_extractor
+from utils.metrics import span
 
-    description = []
-    summary_details = []
+# Backend picked by NEWS_EXTRACTOR ("lxml" by default, "main" drops boilerplate).
+DEFAULT_EXTRACTOR = get_extractor()
 
-    for idx, link in enumerate(latest_links):
 
-        try:
-            response = requests.get(link, timeout=10)
+class HostThrottle:
+    '''
+    Per-host politeness delay. Every request to a host reserves the next free
+    slot for that host, so requests to the same site are spaced by a random
+    delay in [min_delay, max_delay] while different sites are fetched in parallel.
+    '''
 
-            if response.status_code == 200:
-                html_content = response.text
-            else:
-                print(
-                    f"Failed to retrieve: {link} (Status code: {response.status_code})")
-                description.append("Failed to retrieve the webpage.")
-                continue
+    def __init__(self, min_delay: float = 1.0, max_delay: float = 3.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
 
-            soup = BeautifulSoup(html_content, "html.parser")
-            paragraphs = soup.find_all("p")
+    def wait(self, link: str) -> None:
+        host = urlsplit(link).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + random.uniform(self.min_delay, self.max_delay)
+        if slot > now:
+            time.sleep(slot - now)
 
-            page_description = " ".join([p.get_text() for p in paragraphs])
-            description.append(page_description)
-            if idx <= 5:
-                summary_details.append(page_description)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error retrieving {idx}: {e}")
-            description.append("Failed to retrieve the webpage.")
-            continue
+def make_session(pool_size: int = 16) -> requests.Session:
+    '''
+    Session with a keep-alive connection pool sized for pool_size concurrent workers.
+    '''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-        time.sleep(random.uniform(1, 3))
 
+def clean_link(link: str) -> str:
+    return re.split("&ved", link)[0]
+
+
+def extract_description(html_content: str, extractor: Optional[Extractor] = None) -> str:
+    return (extractor or DEFAULT_EXTRACTOR).extract(html_content)
+
+
+class Page(NamedTuple):
+    link: str
+    html: Optional[str]   # set when the page still has to be extracted
+    text: Optional[str]   # set for cached pages and failures
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def fetch_page(link: str, session: requests.Session, throttle: Optional[HostThrottle] = None,
+               cache: Optional[ArticleCache] = None) -> Page:
+    '''
+    Network half of fetch_description: returns the raw page, or its text when
+    it was served from cache (fresh, or revalidated with If-None-Match/
+    If-Modified-Since) or could not be retrieved.
+    '''
+    with span("fetch") as stage:
+        page = _fetch_page(link, session, throttle, cache)
+        failed = page.text == FAILED_DESCRIPTION
+        stage.add(items=1, bytes=len(page.html or ""), failures=int(failed),
+                  cache_hits=int(page.html is None and not failed))
+        return page
+
+
+def _fetch_page(link: str, session: requests.Session, throttle: Optional[HostThrottle],
+                cache: Optional[ArticleCache]) -> Page:
+    cached = cache.get(link) if cache is not None else None
+    if cached is not None and cached.extractor != DEFAULT_EXTRACTOR.name:
+        # Text of another NEWS_EXTRACTOR: fetch the page unconditionally, as a
+        # 304 would only keep that text.
+        cached = None
+    if cached is not None and cache.is_fresh(cached):
+        return Page(link, None, cached.text)
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    if throttle is not None:
+        throttle.wait(link)
+
+    try:
+        response = session.get(link, timeout=10, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            cache.touch(link)
+            return Page(link, None, cached.text)
+
+        if response.status_code != 200:
+            print(
+                f"Failed to retrieve: {link} (Status code: {response.status_code})")
+            return Page(link, None, FAILED_DESCRIPTION)
+
+        return Page(link, response.text, None,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error retrieving {link}: {e}")
+        return Page(link, None, FAILED_DESCRIPTION)
+
+
+def extract_page(page: Page, cache: Optional[ArticleCache] = None) -> str:
+    '''
+    CPU half of fetch_description: extracts the paragraph text of a fetched
+    page and stores it in cache.
+    '''
+    if page.text is not None:
+        return page.text
+    with span("scrape") as stage:
+        page_description = extract_description(page.html)
+        failed = page_description == FAILED_DESCRIPTION or not page_description.strip()
+        stage.add(items=1, bytes=len(page.html), failures=int(failed))
+    if cache is not None:
+        cache.put(page.link, page_description, page.etag, page.last_modified, DEFAULT_EXTRACTOR.name)
+    return page_description
+
+
+def fetch_description(link: str, session: requests.Session, throttle: Optional[HostThrottle] = None,
+                      cache: Optional[ArticleCache] = None) -> str:
+    '''
+    Downloads a single article and returns its paragraph text, or
+    FAILED_DESCRIPTION when the page could not be retrieved.
+
+    With a cache, fresh entries are returned without a request and stale ones
+    are revalidated with If-None-Match/If-Modified-Since.
+    '''
+    return extract_page(fetch_page(link, session, throttle, cache), cache)
+
+
+def _interleave_by_host(links: List[str]) -> List[int]:
+    '''
+    Orders link positions round-robin across hosts, so workers waiting on one
+    host's politeness delay do not starve the other hosts.
+    '''
+    by_host: Dict[str, List[int]] = {}
+    for idx, link in enumerate(links):
+        by_host.setdefault(urlsplit(link).netloc.lower(), []).append(idx)
+
+    order = []
+    queues = list(by_host.values())
+    for rank in range(max((len(q) for q in queues), default=0)):
+        order.extend(q[rank] for q in queues if rank < len(q))
+    return order
+
+
+def download_latest_news(data, max_workers: int = 16, min_host_delay: float = 1.0,
+                         max_host_delay: float = 3.0, session: Optional[requests.Session] = None,
+                         cache: Optional[ArticleCache] = None):
+    '''
+    Downloads every link in data['link'] concurrently and stores the paragraph
+    text in data['description'], in the same order as the links.
+
+    At most max_workers requests are in flight at once over a shared keep-alive
+    session, and requests to the same host are spaced by min_host_delay..max_host_delay
+    seconds. Links found in cache are served from disk.
+    '''
+    latest_links = [clean_link(link) for link in data['link']]
+
+    owns_session = session is None
+    if owns_session:
+        session = make_session(max_workers)
+    throttle = HostThrottle(min_host_delay, max_host_delay)
+
+    description = [FAILED_DESCRIPTION] * len(latest_links)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            order = _interleave_by_host(latest_links)
+            futures = {
+                idx: pool.submit(fetch_description, latest_links[idx], session, throttle, cache)
+                for idx in order
+            }
+            for idx, future in futures.items():
+                description[idx] = future.result()
+    finally:
+        if owns_session:
+            session.close()
 
     data["description"] = description
     return data
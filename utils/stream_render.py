@@ -0,0 +1,72 @@
+from typing import AsyncIterator, Callable, List, NamedTuple
+import asyncio
+import time
+
+
+class RenderStats(NamedTuple):
+    text: str
+    chunks: int           # stream items received
+    render_calls: int
+    rendered_bytes: int   # total size of everything passed to render
+    seconds: float
+    first_chunk_seconds: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+
+async def render_stream(stream: AsyncIterator[str], render: Callable[[str, bool], None],
+                        fps: float = 15.0, flush_bytes: int = 2048) -> RenderStats:
+    '''
+    Consumes a stream of text chunks as fast as it produces them and renders
+    the accumulated text at most `fps` times per second, or sooner once
+    flush_bytes of new text are waiting.
+
+    render(text, done) gets the full text so far; done is True for the last
+    call, which always shows the complete text. Returns the text and
+    counters for the answer.
+    '''
+    parts: List[str] = []
+    counts = {"chunks": 0, "pending": 0, "calls": 0, "bytes": 0}
+    start = time.perf_counter()
+    first_chunk = None
+
+    def flush(done: bool = False) -> None:
+        text = "".join(parts)
+        if len(parts) > 1:
+            parts[:] = [text]
+        render(text, done)
+        counts["pending"] = 0
+        counts["calls"] += 1
+        counts["bytes"] += len(text.encode("utf-8"))
+
+    async def consume() -> None:
+        nonlocal first_chunk
+        try:
+            async for chunk in stream:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                parts.append(chunk)
+                counts["chunks"] += 1
+                counts["pending"] += len(chunk)
+                if counts["pending"] >= flush_bytes:
+                    flush()
+        finally:
+            # Stops the upstream generation when rendering is cancelled.
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+    consumer = asyncio.ensure_future(consume())
+    try:
+        while not consumer.done():
+            await asyncio.wait({consumer}, timeout=1.0 / fps)
+            if counts["pending"] and not consumer.done():
+                flush()
+        consumer.result()  # re-raise stream errors
+    finally:
+        consumer.cancel()
+
+    flush(done=True)
+    return RenderStats("".join(parts), counts["chunks"], counts["calls"], counts["bytes"],
+                       time.perf_counter() - start, first_chunk or 0.0)
@@ -0,0 +1,415 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.article_cache import CACHE_DIR
+from utils.chunk_store import ChunkStore
+from utils.embedding import (INDEX_MODE, RERANK_FACTOR, build_index, choose_index_kind, code_size, effective_mode,
+                             needs_rerank, rerank_exact)
+from utils.lexical_index import LexicalIndex, fuse
+from utils.metrics import span
+from utils.model_registry import EMBEDDING_MODEL_ID
+
+if TYPE_CHECKING:  # imported on first use, like in utils.embedding
+    import faiss
+
+TOPIC_DIR = os.path.join(CACHE_DIR, "topics")
+NEWS_WINDOW = 7 * 24 * 3600  # get_google_news searches the last 7 days
+
+logger = logging.getLogger(__name__)
+
+_rebuild_pool: Optional[ThreadPoolExecutor] = None
+_rebuild_pool_lock = threading.Lock()
+
+
+def _get_rebuild_pool() -> ThreadPoolExecutor:
+    '''
+    One thread that retrains topic indexes, so that training (minutes for a
+    large pq index) never runs on the caller's thread or event loop, and
+    several topics do not train at once.
+    '''
+    global _rebuild_pool
+    with _rebuild_pool_lock:
+        if _rebuild_pool is None:
+            _rebuild_pool = ThreadPoolExecutor(1, thread_name_prefix="index-rebuild")
+        return _rebuild_pool
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+
+def topic_key(topic: str, model_id: str = EMBEDDING_MODEL_ID) -> str:
+    '''
+    Identifies a topic's index: its normalized name, tagged with the
+    embedding model when that is not the default one.
+    '''
+    topic = normalize_topic(topic)
+    return topic if model_id == EMBEDDING_MODEL_ID else f"{topic} [{model_id}]"
+
+
+def _topic_dirname(key: str) -> str:
+    slug = re.sub(r"[^\w-]+", "-", key)[:48] or "topic"
+    return f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]}"
+
+
+def _with_ids(index: "faiss.Index") -> "faiss.Index":
+    '''
+    index, storing vectors under caller-given chunk ids. IVF lists keep the
+    ids themselves; IndexIDMap2 would assume that removing vectors renumbers
+    the rest, as flat indexes do, and mix up the ids of IVF indexes.
+    '''
+    import faiss
+    return faiss.IndexIDMap2(index) if isinstance(index, faiss.IndexFlatCodes) else index
+
+
+class TopicIndex:
+    '''
+    FAISS index of one news topic that lives on disk and grows incrementally.
+
+    Chunk vectors are stored in an IndexIDMap2 under stable int64 chunk ids, so
+    new articles are added and expired articles removed without a rebuild. The
+    index file is opened memory-mapped; chunk texts and article metadata live
+    next to it in a memory-mapped ChunkStore (chunks.store), the rest in
+    meta.json. Chunk ids of one article are consecutive.
+
+    search() has the same signature as faiss.Index.search and returns chunk ids,
+    so a TopicIndex can be passed wherever the pipeline expects an index, with
+    self.chunks as the matching id -> text mapping, self.chunk_sources as id ->
+    link and self.articles as link -> ArticleMeta (title, date, ...).
+
+    mode is how the index stores vectors (see utils.embedding.INDEX_MODES).
+    In the lossy int8 and pq modes the ChunkStore also keeps the exact vectors
+    and search() re-ranks a RERANK_FACTOR times larger shortlist with them.
+    The quantizer is retrained from those vectors whenever the topic has
+    doubled since it was trained, and pq starts out as int8 until there are
+    enough vectors to train its codebooks. Likewise the index moves from flat
+    to IVF once the topic outgrows exact search (see choose_index_kind), and
+    its coarse quantizer is retrained as the topic doubles. Such rebuilds run
+    in the background (self.rebuilding) while the old index keeps serving.
+
+    self.lexical is a BM25 index over the same chunk ids; search() fuses its
+    ranking with the dense one when given the query texts.
+
+    model_id is the embedding model the vectors come from. Topics of other
+    models than the default are stored separately, under topic_key.
+    '''
+
+    def __init__(self, topic: str, root: str = TOPIC_DIR, mode: str = INDEX_MODE,
+                 model_id: str = EMBEDDING_MODEL_ID):
+        self.topic = normalize_topic(topic)
+        self.model_id = model_id
+        self.key = topic_key(topic, model_id)
+        self.path = os.path.join(root, _topic_dirname(self.key))
+        effective_mode(mode, 0)  # validates mode
+        self.mode = mode
+        self.index: Optional["faiss.Index"] = None
+        self.index_mode = "float32"  # mode of the index as built, see effective_mode
+        self.index_kind = "flat"     # "flat" or "ivf", see choose_index_kind
+        self.trained_on = 0
+        self.rebuilding: Optional[Future] = None  # pending rebuild, see _sync_index_mode
+        self._use_store(ChunkStore())
+        self.lexical = LexicalIndex()
+        self.alternates: Dict[str, List[str]] = {}  # link -> other sources of the same story
+        self.next_id = 0
+        self.version = 0
+        self.updated_at = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def _index_file(self) -> str:
+        return os.path.join(self.path, "index.faiss")
+
+    @property
+    def _meta_file(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _store_file(self) -> str:
+        return os.path.join(self.path, "chunks.store")
+
+    @property
+    def _lexical_file(self) -> str:
+        return os.path.join(self.path, "lexical.npz")
+
+    def _use_store(self, store: ChunkStore) -> None:
+        self.store = store
+        self.chunks = store
+        self.chunk_sources = store.sources
+        self.articles = store.articles
+
+    def _load_legacy_articles(self, articles: Dict[str, dict]) -> None:
+        # meta.json of older versions held the chunk texts; their chunks overlap,
+        # so each is stored separately, one per line.
+        for link, article in articles.items():
+            text, spans = "", []
+            for chunk in article["chunks"]:
+                spans.append((len(text), len(text) + len(chunk)))
+                text += chunk + "\n"
+            first_id = article["chunk_ids"][0] if article["chunk_ids"] else 0
+            self.store.add_article(link, article["title"], text, spans, first_id, article["first_seen"])
+            if article.get("alternates"):
+                self.alternates[link] = list(article["alternates"])
+
+    @classmethod
+    def open(cls, topic: str, root: str = TOPIC_DIR, mode: str = INDEX_MODE,
+             model_id: str = EMBEDDING_MODEL_ID) -> "TopicIndex":
+        '''
+        Opens the stored index for topic, or an empty one if it was never built.
+        An index stored in another mode is converted in the background.
+        '''
+        topic_index = cls(topic, root, mode, model_id)
+        if not os.path.exists(topic_index._meta_file):
+            return topic_index
+
+        start = time.perf_counter()
+        with open(topic_index._meta_file, "r", encoding="utf-8") as file:
+            meta = json.load(file)
+        topic_index.next_id = meta["next_id"]
+        topic_index.version = meta["version"]
+        topic_index.updated_at = meta["updated_at"]
+        topic_index.index_mode = meta.get("index_mode", "float32")
+        topic_index.trained_on = meta.get("trained_on", 0)
+        topic_index.index_kind = meta.get("index_kind", "flat")
+        if "articles" in meta:
+            topic_index._load_legacy_articles(meta["articles"])
+        elif os.path.exists(topic_index._store_file):
+            topic_index._use_store(ChunkStore.load(topic_index._store_file))
+            topic_index.alternates = meta.get("alternates", {})
+
+        if os.path.exists(topic_index._index_file):
+            import faiss
+            try:
+                # Memory-mapped IVF lists are read-only, so only flat indexes are mapped.
+                flags = faiss.IO_FLAG_MMAP if topic_index.index_kind == "flat" else 0
+                topic_index.index = faiss.read_index(topic_index._index_file, flags)
+            except RuntimeError:
+                topic_index.index = faiss.read_index(topic_index._index_file)
+        if os.path.exists(topic_index._lexical_file):
+            topic_index.lexical = LexicalIndex.load(topic_index._lexical_file)
+        if len(topic_index.lexical) != len(topic_index.store):
+            # Written before the lexical index existed (or by an interrupted save).
+            topic_index.lexical = LexicalIndex()
+            ids = list(topic_index.store)
+            topic_index.lexical.add(ids, [topic_index.store[chunk_id] for chunk_id in ids])
+        with topic_index._lock:
+            # Last, as the rebuild saves the whole topic when done.
+            topic_index._sync_index_mode()
+        logger.info("Opened topic index '%s' (%d chunks) in %.1f ms", topic_index.key,
+                    len(topic_index.chunks), (time.perf_counter() - start) * 1000)
+        return topic_index
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def _sync_index_mode(self) -> None:
+        '''
+        Schedules a rebuild of the index from the exact vectors when it is not in
+        the mode or kind it should have, or its quantizer was trained on less than
+        half the vectors. Callers hold self._lock; the rebuild runs in the background.
+        '''
+        if self.index is None or (self.rebuilding is not None and not self.rebuilding.done()):
+            return
+        if not self.ntotal:
+            # Nothing to retrain on; the empty index keeps its mode.
+            if not needs_rerank(self.mode):
+                self.store.clear_vectors()
+            return
+        target = effective_mode(self.mode, self.ntotal)
+        kind = choose_index_kind(self.ntotal, removable=True)
+        trained = needs_rerank(target) or kind == "ivf"
+        undertrained = trained and self.ntotal >= 2 * self.trained_on
+        if (target == self.index_mode and kind == self.index_kind and not undertrained
+                and needs_rerank(self.mode) == bool(self.store.dim)):
+            return
+        ids = self.store.live_ids()
+        self.rebuilding = _get_rebuild_pool().submit(self._rebuild, ids, self._exact_vectors(ids), target, kind)
+
+    def _rebuild(self, ids: np.ndarray, vectors: np.ndarray, target: str, kind: str) -> None:
+        '''
+        Trains a target-mode index of kind on a snapshot of the vectors without
+        holding the lock, then catches it up with the chunks added and removed
+        meanwhile, swaps it in and saves the topic.
+        '''
+        try:
+            start = time.perf_counter()
+            index = _with_ids(build_index(vectors, kind, removable=True, mode=self.mode))
+            index.add_with_ids(vectors, ids)
+            trained = time.perf_counter() - start
+            with self._lock:
+                live = self.store.live_ids()
+                added, kept = np.setdiff1d(live, ids), np.isin(ids, live)
+                if not kept.all():
+                    index.remove_ids(ids[~kept])
+                    ids, vectors = ids[kept], vectors[kept]
+                if len(added):
+                    added_vectors = self._exact_vectors(added)
+                    index.add_with_ids(added_vectors, added)
+                    ids, vectors = np.concatenate([ids, added]), np.concatenate([vectors, added_vectors])
+                if needs_rerank(self.mode) and not self.store.dim:
+                    self.store.set_vectors(ids, vectors)
+                elif not needs_rerank(self.mode) and self.store.dim:
+                    self.store.clear_vectors()
+                # Not a version change: the same chunks stay retrievable.
+                self.index, self.index_mode, self.index_kind, self.trained_on = index, target, kind, index.ntotal
+                logger.info("Rebuilt topic index '%s' as %s %s over %d vectors in %.2fs (+%d, -%d meanwhile)",
+                            self.key, kind, target, len(kept), trained, len(added), len(kept) - kept.sum())
+                self.rebuilding = None
+                self.save()
+        except Exception:
+            logger.exception("Rebuilding topic index '%s' failed; keeping the current index", self.key)
+
+    def _exact_vectors(self, ids: np.ndarray) -> np.ndarray:
+        if self.store.dim:
+            return np.ascontiguousarray(self.store.vectors(ids), dtype=np.float32)
+        if self.index_kind != "ivf":
+            return self.index.reconstruct_batch(ids)
+        import faiss
+        # IVF lists can only be read back by id through a direct map, which in
+        # turn cannot remove a batch of ids, so it is dropped again.
+        self.index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        try:
+            return self.index.reconstruct_batch(ids)
+        finally:
+            self.index.set_direct_map_type(faiss.DirectMap.NoMap)
+
+    def known_links(self) -> Set[str]:
+        links = set(self.articles)
+        for alternates in self.alternates.values():
+            links.update(alternates)
+        return links
+
+    def add_alternate(self, link: str, alternate: str) -> None:
+        '''
+        Records alternate as another source of the (near-identical) article at link.
+        '''
+        with self._lock:
+            if link not in self.articles:
+                raise KeyError(link)
+            alternates = self.alternates.setdefault(link, [])
+            if alternate not in alternates:
+                # Not a version change: retrieval results stay the same.
+                alternates.append(alternate)
+
+    def memory_bytes(self) -> int:
+        '''
+        Approximate memory held by the topic: raw vectors, the chunk store
+        and its link index, and the lexical index.
+        '''
+        with self._lock:
+            vectors = self.ntotal * code_size(self.index_mode, self.index.d) if self.index is not None else 0
+            # ~100 bytes of dict entry, str and int per article in the link index.
+            return vectors + self.store.nbytes() + 100 * len(self.articles) + self.lexical.nbytes()
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.time() - self.updated_at > max_age
+
+    def add_article(self, link: str, title: str, text: str, spans: Sequence[Tuple[int, int]],
+                    embeddings: np.ndarray, date: str = "", published: Optional[float] = None) -> List[int]:
+        '''
+        Adds one article, its chunks text[start:end] for (start, end) in spans
+        and their vectors; returns the new chunk ids. published is the
+        article's publication time (a timestamp) where known, see expire().
+        '''
+        with self._lock, span("index") as stage:
+            if link in self.articles:
+                return list(self.articles[link].chunk_ids)
+            stage.add(items=len(spans), bytes=len(text))
+            # Until a pending rebuild swaps them in, a converted topic has no exact vectors yet.
+            exact = embeddings if self.store.dim or (needs_rerank(self.mode) and not len(self.store)) else None
+            ids = list(self.store.add_article(link, title, text, spans, self.next_id, time.time(), date, exact,
+                                              published))
+            self.next_id += len(spans)
+            if spans:
+                if self.index is None:
+                    self.index_kind = choose_index_kind(len(embeddings), removable=True)
+                    self.index = _with_ids(build_index(embeddings, self.index_kind, removable=True, mode=self.mode))
+                    self.index_mode = effective_mode(self.mode, len(embeddings))
+                    self.trained_on = len(embeddings)
+                self.index.add_with_ids(np.ascontiguousarray(embeddings, dtype=np.float32),
+                                        np.array(ids, dtype=np.int64))
+                self.lexical.add(ids, [text[start:end] for start, end in spans])
+            self.version += 1
+            return ids
+
+    def remove_articles(self, links: List[str]) -> int:
+        with self._lock:
+            ids = []
+            for link in links:
+                ids.extend(self.store.remove_article(link))
+                self.alternates.pop(link, None)
+            if ids and self.index is not None:
+                self.index.remove_ids(np.array(ids, dtype=np.int64))
+            self.lexical.remove(ids)
+            if ids:
+                self.version += 1
+            return len(ids)
+
+    def expire(self, max_age: float = NEWS_WINDOW) -> int:
+        '''
+        Removes articles published more than max_age seconds ago, i.e. those
+        that have fallen out of the Google News search window. Articles of
+        unknown date count as published when they were first seen.
+        '''
+        cutoff = time.time() - max_age
+        with self._lock:
+            old = [link for link, article in self.articles.items() if article.published < cutoff]
+        return self.remove_articles(old)
+
+    def search(self, query_embedding: np.ndarray, k: int,
+               queries: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        faiss.Index.search over the topic. With queries (the text of each
+        query embedding), the dense and BM25 top 2k are fused by reciprocal
+        rank and the scores are negated RRF scores instead of L2 distances.
+        '''
+        with self._lock:
+            if self.index is None:
+                n = len(query_embedding)
+                return np.full((n, k), np.inf, dtype=np.float32), np.full((n, k), -1, dtype=np.int64)
+            depth = 2 * k if queries is not None else k
+            if not needs_rerank(self.index_mode):
+                distances, ids = self.index.search(query_embedding, depth)
+            else:
+                _, candidates = self.index.search(query_embedding, depth * RERANK_FACTOR)
+                distances, ids = rerank_exact(query_embedding, candidates, self.store.vectors, depth)
+            if queries is None:
+                return distances, ids
+            with span("lexical") as stage:
+                lexical = [self.lexical.search(query, depth)[0] for query in queries]
+                stage.add(items=sum(map(len, lexical)))
+            return fuse(ids, lexical, k)
+
+    def save(self) -> None:
+        '''
+        Writes index and metadata atomically, so a reader never sees a half-written topic.
+        A rebuild it schedules is saved again once done.
+        '''
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            self.updated_at = time.time()
+            self._sync_index_mode()
+            if self.index is not None:
+                import faiss
+                faiss.write_index(self.index, self._index_file + ".tmp")
+                os.replace(self._index_file + ".tmp", self._index_file)
+            self.store.save(self._store_file)
+            self.lexical.save(self._lexical_file + ".tmp")
+            os.replace(self._lexical_file + ".tmp", self._lexical_file)
+            meta = {
+                "topic": self.topic, "model_id": self.model_id, "next_id": self.next_id, "version": self.version,
+                "updated_at": self.updated_at, "alternates": self.alternates,
+                "index_mode": self.index_mode, "index_kind": self.index_kind, "trained_on": self.trained_on,
+            }
+            with open(self._meta_file + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(meta, file)
+            os.replace(self._meta_file + ".tmp", self._meta_file)
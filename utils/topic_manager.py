@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Sequence, Tuple
+import asyncio
+import logging
+import os
+import threading
+
+import numpy as np
+
+from utils.background import submit
+from utils.ingest import IngestProgress, ingest_topic
+from utils.model_registry import model_id_of
+from utils.topic_index import TOPIC_DIR, TopicIndex, normalize_topic, topic_key
+
+TOPIC_MEMORY_MB = float(os.getenv("NEWS_TOPIC_MEMORY_MB", "1024"))
+
+logger = logging.getLogger(__name__)
+
+
+class TopicHandle:
+    '''
+    Read-only view of a shared TopicIndex, as handed out to pipelines.
+
+    chunks, chunk_sources and articles are live read-only mappings, so a
+    handle sees articles the ingestion adds after it was handed out.
+    '''
+
+    def __init__(self, topic_index: TopicIndex):
+        self._topic_index = topic_index
+        self.chunks = MappingProxyType(topic_index.chunks)
+        self.chunk_sources = MappingProxyType(topic_index.chunk_sources)
+        self.articles = MappingProxyType(topic_index.articles)
+
+    @property
+    def topic(self) -> str:
+        return self._topic_index.topic
+
+    @property
+    def key(self) -> str:
+        return self._topic_index.key
+
+    @property
+    def version(self) -> int:
+        return self._topic_index.version
+
+    @property
+    def ntotal(self) -> int:
+        return self._topic_index.ntotal
+
+    def is_stale(self, max_age: float) -> bool:
+        return self._topic_index.is_stale(max_age)
+
+    def search(self, query_embedding: np.ndarray, k: int,
+               queries: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        return self._topic_index.search(query_embedding, k, queries)
+
+
+class OpenedTopic(NamedTuple):
+    handle: TopicHandle
+    progress: Optional[IngestProgress]  # None when the stored index was fresh
+    ingestion: Optional[Future]
+
+
+class _Entry:
+    def __init__(self):
+        self.loaded: Future = Future()
+        self.progress: Optional[IngestProgress] = None
+        self.ingestion: Optional[Future] = None
+
+    @property
+    def ingesting(self) -> bool:
+        return self.ingestion is not None and not self.ingestion.done()
+
+
+class TopicManager:
+    '''
+    Process-wide registry of topic indexes shared by every session.
+
+    Topics are keyed by their normalized name and the embedding model (see
+    topic_key), so pipelines with different encoders never share an index.
+    Loading a topic from disk and
+    refreshing it are single-flighted: concurrent requests for the same topic
+    wait for the one load and join the one running ingestion. Once the
+    approximate memory of the loaded topics exceeds memory_budget_mb, the
+    least recently used topics that are not ingesting are dropped. Sessions
+    that still hold a handle keep theirs until they let it go.
+
+    news_backend and host_delay are handed to every ingestion (see ingest_topic).
+    '''
+
+    def __init__(self, memory_budget_mb: float = TOPIC_MEMORY_MB, root: str = TOPIC_DIR,
+                 news_backend=None, host_delay: Tuple[float, float] = (1.0, 3.0)):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.root = root
+        self.news_backend = news_backend
+        self.host_delay = host_delay
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"loads": 0, "shared": 0, "ingestions": 0, "joined": 0, "evicted": 0}
+
+    async def _load(self, topic: str, model_id: str) -> Tuple[_Entry, TopicIndex]:
+        key = topic_key(topic, model_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+                self._counters["loads"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counters["shared"] += 1
+
+        if owner:
+            try:
+                topic_index = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: TopicIndex.open(topic, self.root, model_id=model_id))
+            except BaseException as e:
+                with self._lock:
+                    self._entries.pop(key, None)
+                entry.loaded.set_exception(e)
+                raise
+            entry.loaded.set_result(topic_index)
+            self._enforce_budget()
+        return entry, await asyncio.wrap_future(entry.loaded)
+
+    async def open(self, user_request: str, embed_model, refresh_interval: float,
+                   ready_after: int, deadline: float) -> OpenedTopic:
+        '''
+        Returns a handle on the topic's index and, unless it was refreshed in
+        the last refresh_interval seconds, the progress of the ingestion
+        refreshing it (started now or already running for another session).
+        '''
+        topic = normalize_topic(user_request)
+        entry, topic_index = await self._load(topic, model_id_of(embed_model))
+        key = topic_index.key
+
+        started = None
+        with self._lock:
+            if entry.ingesting:
+                self._counters["joined"] += 1
+                logger.info("Joining the running ingestion of '%s'", key)
+            elif topic_index.is_stale(refresh_interval):
+                self._counters["ingestions"] += 1
+                entry.progress = IngestProgress()
+                entry.ingestion = started = submit(ingest_topic(
+                    topic_index, user_request, entry.progress, embed_model,
+                    ready_after=ready_after, deadline=deadline,
+                    news_backend=self.news_backend, host_delay=self.host_delay,
+                ))
+            else:
+                logger.info("Topic index is fresh (%d chunks), skipping news refresh.", topic_index.ntotal)
+                return OpenedTopic(TopicHandle(topic_index), None, None)
+            opened = OpenedTopic(TopicHandle(topic_index), entry.progress, entry.ingestion)
+        if started is not None:
+            # Outside the lock: a future that is already done runs the callback
+            # right here, and _enforce_budget takes the lock itself.
+            started.add_done_callback(lambda _: self._enforce_budget())
+        return opened
+
+    def _enforce_budget(self) -> None:
+        with self._lock:
+            loaded = [(key, entry.loaded.result()) for key, entry in self._entries.items()
+                      if entry.loaded.done() and entry.loaded.exception() is None]
+            sizes = {key: topic_index.memory_bytes() for key, topic_index in loaded}
+            total = sum(sizes.values())
+            # Oldest first; the most recently used topic always stays.
+            for key, _ in loaded[:-1]:
+                if total <= self.memory_budget:
+                    break
+                if self._entries[key].ingesting:
+                    continue
+                del self._entries[key]
+                total -= sizes[key]
+                self._counters["evicted"] += 1
+                logger.info("Evicted topic '%s' (%.1f MB) to stay within %.0f MB", key,
+                            sizes[key] / 2 ** 20, self.memory_budget / 2 ** 20)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.loaded.result().memory_bytes() for entry in self._entries.values()
+                       if entry.loaded.done() and entry.loaded.exception() is None)
+
+    def stats(self) -> dict:
+        stats = dict(self._counters)
+        with self._lock:
+            stats["topics"] = len(self._entries)
+            stats["ingesting"] = sum(entry.ingesting for entry in self._entries.values())
+        stats["memory_mb"] = self.memory_bytes() / 2 ** 20
+        stats["memory_budget_mb"] = self.memory_budget / 2 ** 20
+        return stats
+
+
+_default_manager: Optional[TopicManager] = None
+_default_lock = threading.Lock()
+
+
+def get_topic_manager() -> TopicManager:
+    '''
+    Process-wide topic manager shared by every NewsPipeline.
+    '''
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = TopicManager()
+        return _default_manager